@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+레코드 표현 벤치마크
+dict 레코드 + json.dumps 체크섬(기존 방식)과 SheetRecord(튜플 + 공유 레이아웃)의
+메모리 사용량과 변환/해시 시간 비교 (네트워크 불필요)
+
+사용법:
+    python benchmarks/bench_records.py [--rows 10000 50000] [--cols 20]
+"""
+
+import argparse
+import gc
+import hashlib
+import json
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sheet_records import build_records, get_layout
+
+
+# 합성 시트 생성
+def make_sheet(rows, cols, seed=0):
+    """[빈 행, 헤더 행, 데이터 행...] 형태의 합성 시트 값"""
+    rng = random.Random(seed)
+    headers = ["부서명", "용역명"] + [f"컬럼{i}" for i in range(cols - 2)]
+    values = [[""] * cols, headers]
+    for i in range(rows):
+        values.append(
+            [f"부서{i % 37}", f"용역-{i}"] +
+            [rng.choice(["", "진행", "완료", f"{rng.randint(0, 10**6):,}원", "2025.01.01"])
+             for _ in range(cols - 2)]
+        )
+    return values
+
+
+# 기존 방식: 행마다 dict + json.dumps
+def legacy_build(all_values):
+    headers = all_values[1]
+    records = []
+    for row in all_values[2:]:
+        if not any(cell.strip() for cell in row if cell):
+            continue
+        record = {}
+        for idx, header in enumerate(headers):
+            record[header] = row[idx] if idx < len(row) else ""
+        if not record.get(headers[1], "").strip():
+            continue
+        records.append(record)
+    return records
+
+
+def legacy_hash(records, headers):
+    for row in records:
+        key = f"{row.get(headers[0], '')}-{row.get(headers[1], '')}"
+        hashlib.md5(key.encode('utf-8')).hexdigest()
+        content = json.dumps(row, sort_keys=True, ensure_ascii=False)
+        hashlib.md5(content.encode('utf-8')).hexdigest()
+
+
+# SheetRecord 방식
+def compact_build(all_values):
+    layout = get_layout(all_values[1])
+    records, _ = build_records(all_values[2:], 3, layout, required_index=1)
+    return records
+
+
+def compact_hash(records, headers):
+    for record in records:
+        record.row_hash
+        record.checksum
+
+
+def measure_memory(build, all_values):
+    """레코드 목록이 차지하는 메모리 (bytes)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build(all_values)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return after - before
+
+
+def measure_time(func, repeat=3):
+    """가장 빠른 실행 시간 (초)"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(rows, cols):
+    all_values = make_sheet(rows, cols)
+    headers = all_values[1]
+
+    results = {}
+    for name, build, hash_all in (
+        ("dict + json", legacy_build, legacy_hash),
+        ("SheetRecord", compact_build, compact_hash),
+    ):
+        memory = measure_memory(build, all_values)
+        build_time = measure_time(lambda: build(all_values))
+        # 해시는 매번 새 레코드로 측정 (SheetRecord는 한 번 계산한 값을 캐시하므로)
+        hash_time = measure_time(lambda: hash_all(build(all_values), headers)) - build_time
+        results[name] = (memory, build_time, hash_time)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='레코드 표현 벤치마크')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--cols', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'행 수':>8} {'방식':<12} {'메모리(MB)':>11} {'변환(ms)':>10} {'해시(ms)':>10}")
+    for rows in args.rows:
+        results = run(rows, args.cols)
+        for name, (memory, build_time, hash_time) in results.items():
+            print(f"{rows:>8} {name:<12} {memory / 2**20:>11.1f} "
+                  f"{build_time * 1000:>10.1f} {hash_time * 1000:>10.1f}")
+
+        legacy, compact = results["dict + json"], results["SheetRecord"]
+        print(f"{'':>8} {'절감':<12} {1 - compact[0] / legacy[0]:>11.0%} "
+              f"{1 - compact[1] / legacy[1]:>10.0%} {1 - compact[2] / legacy[2]:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
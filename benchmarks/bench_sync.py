@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+동기화 파이프라인 벤치마크
+합성 시트(메모리 worksheet)와 지연 시간을 흉내 내는 sbdb sink로
+fetch_sheet_data -> detect_changes -> render_changes -> apply_changes -> 상태 저장 전체를 측정 (네트워크 / 인증 불필요)
+
+크기마다 두 단계를 실행한다.
+- initial: 빈 상태에서 모든 행을 추가
+- incremental: 일부 행을 수정 / 추가 / 삭제한 시트로 다시 동기화
+각 크기는 별도 프로세스에서 실행하므로 최대 RSS가 크기별로 측정된다.
+
+사용법:
+    python benchmarks/bench_sync.py [--rows 1000 10000 100000] [--cols 20]
+        [--change-ratio 0.05] [--add-ratio 0.01] [--delete-ratio 0.01]
+        [--latency-ms 0] [--workers 1] [--state-backend json|sqlite] [--write-mode split|upsert]
+        [--compact-every 100] [--sink memory|worker] [--worker-processes 1]
+
+--sink worker는 메모리 sink 대신 가짜 sbdb worker(sbdb_worker.py --fake, 같은 지연 시간)와
+JSON-lines로 주고받는다. (프로세스 간 통신 / pipelining 비용 포함)
+"""
+
+import argparse
+import contextlib
+import itertools
+import multiprocessing
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # Windows: 최대 RSS를 측정하지 않음
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from bench_records import make_sheet
+from run_metrics import RunMetrics
+from sbdb_sink import WORKER_SCRIPT, WorkerSink
+from state_store import DEFAULT_COMPACT_EVERY, JsonStateStore, SqliteStateStore
+import sync_google_sheet_incremental as sync
+
+_RANGE = re.compile(r"([A-Z]*)(\d+):([A-Z]*)(\d*)$")
+
+
+class MemoryWorksheet:
+    """gspread Worksheet 대신 쓰는 메모리 시트 (get_all_values / get / row_count)"""
+
+    title = "benchmark"
+    id = 0
+
+    def __init__(self, values):
+        self.values = values
+
+    @property
+    def row_count(self):
+        return len(self.values)
+
+    def get_all_values(self):
+        return self.values
+
+    def get(self, cell_range):
+        # "A3:Z100" / "3:100" 형태의 범위만 지원 (컬럼 범위는 무시하고 전체 컬럼 반환)
+        first_row, last_row = _RANGE.match(cell_range).group(2, 4)
+        return self.values[int(first_row) - 1:int(last_row) if last_row else None]
+
+
+class LatencySink:
+    """sbdb 호출마다 latency초 대기하는 메모리 sink (묶음 요청은 묶음당 한 번 대기)"""
+
+    name = "benchmark"
+    accepts_embeddings = False
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.documents = {}
+        self.by_row_hash = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _store(self, doc_id, title, content, metadata):
+        with self.lock:
+            self.documents[doc_id] = (title, content)
+            if metadata and metadata.get('row_hash'):
+                self.by_row_hash[metadata['row_hash']] = doc_id
+
+    def save(self, title, content, tags, embedding=None, metadata=None):
+        self._wait()
+        doc_id = f"doc-{next(self.ids)}"
+        self._store(doc_id, title, content, metadata)
+        return True, doc_id, None
+
+    def update(self, doc_id, title, content, embedding=None, regenerate_embedding=True, metadata=None):
+        self._wait()
+        self._store(doc_id, title, content, metadata)
+        return True, None
+
+    def delete(self, doc_id):
+        self._wait()
+        with self.lock:
+            self.documents.pop(doc_id, None)
+        return True, None
+
+    def delete_many(self, doc_ids, batch_size=None):
+        self._wait()
+        with self.lock:
+            for doc_id in doc_ids:
+                self.documents.pop(doc_id, None)
+        return {}
+
+    def upsert_many(self, documents, batch_size=None):
+        self._wait()
+        results = {}
+        for doc in documents:
+            row_hash = doc['row_hash']
+            doc_id = doc.get('doc_id') or self.by_row_hash.get(row_hash) or f"doc-{next(self.ids)}"
+            self._store(doc_id, doc['title'], doc['content'], doc['metadata'])
+            results[row_hash] = (True, doc_id, None)
+        return results
+
+    def close(self):
+        pass
+
+
+# 시트 변경
+def mutate_sheet(values, change_ratio, add_ratio, delete_ratio, seed=1):
+    """데이터 행 일부를 수정 / 삭제하고 새 행을 추가한 시트 값"""
+    rng = random.Random(seed)
+    header_rows, rows = values[:2], [list(row) for row in values[2:]]
+    cols = len(values[1])
+
+    for row in rng.sample(rows, int(len(rows) * change_ratio)):
+        row[-1] = f"수정-{rng.randint(0, 10**6)}"
+
+    deleted = set(rng.sample(range(len(rows)), int(len(rows) * delete_ratio)))
+    rows = [row for i, row in enumerate(rows) if i not in deleted]
+
+    for i in range(int(len(values[2:]) * add_ratio)):
+        rows.append([f"부서{i % 37}", f"신규용역-{i}"] + ["추가"] * (cols - 2))
+
+    return header_rows + rows
+
+
+def create_bench_sink(options):
+    """--sink에 맞는 sink (worker면 가짜 sbdb worker 프로세스)"""
+    if options['sink'] == 'worker':
+        return WorkerSink(
+            {'sbdb_worker_processes': options['worker_processes']},
+            worker_cmd=[sys.executable, str(WORKER_SCRIPT), "--fake",
+                        "--fake-latency-ms", str(options['latency_ms'])]
+        )
+    return LatencySink(options['latency_ms'] / 1000)
+
+
+def open_store(options, directory):
+    if options['state_backend'] == 'sqlite':
+        return SqliteStateStore(Path(directory) / "sync_state.db")
+    return JsonStateStore(Path(directory) / "sync_state.json", compact_every=options['compact_every'])
+
+
+def state_size(directory):
+    """상태 파일(sync_state.* 전체) 크기 (bytes)"""
+    return sum(path.stat().st_size for path in Path(directory).glob("sync_state.*"))
+
+
+def peak_rss():
+    """이 프로세스의 최대 RSS (bytes, 측정할 수 없으면 None)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# 동기화 1회
+def sync_once(values, directory, options, sink):
+    """시트 값 한 벌을 fetch -> detect -> apply -> save 로 동기화 -> 결과 dict"""
+    config = {'tags': ['벤치마크'], 'write_mode': options['write_mode']}
+    metrics = RunMetrics()
+    worksheet = MemoryWorksheet(values)
+
+    # 행마다 출력하는 진행 로그는 측정에서 제외하지 않되 화면에는 쓰지 않음
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+
+        with metrics.span('load_state'):
+            store = open_store(options, directory)
+            sync_state = store.load()
+
+        with metrics.span('fetch'):
+            records, headers, _ = sync.fetch_sheet_data(worksheet, metrics=metrics)
+
+        seen_hashes = set()
+        with metrics.span('diff'):
+            changes = sync.detect_changes(records, headers, sync_state, detect_deletes=False,
+                                          seen_hashes=seen_hashes)
+            changes['deleted'] = sync.find_deleted_rows(sync_state, seen_hashes)
+
+        with metrics.span('render'):
+            sync.render_changes(changes, headers)
+            sync.record_same_renders(changes, headers, store)
+
+        with metrics.span('write'):
+            success, fail = sync.apply_changes(changes, headers, config, sink, store,
+                                               workers=options['workers'], metrics=metrics)
+
+        with metrics.span('save_state'):
+            sync_state['total_rows'] = len(records)
+            store.save()
+        store.close()
+
+        elapsed = time.perf_counter() - start
+
+    return {
+        'rows': len(records),
+        'changes': len(changes['new']) + len(changes['updated']) + len(changes['deleted']),
+        'failed': fail,
+        'seconds': elapsed,
+        'stages': {name: stage['seconds'] for name, stage in metrics.stages.items()},
+    }
+
+
+# 크기 하나 (별도 프로세스에서 실행)
+def run_size(rows, options):
+    values = make_sheet(rows, options['cols'])
+    changed = mutate_sheet(values, options['change_ratio'], options['add_ratio'], options['delete_ratio'])
+    sink = create_bench_sink(options)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = []
+        for phase, sheet in (("initial", values), ("incremental", changed)):
+            result = sync_once(sheet, directory, options, sink)
+            result['phase'] = phase
+            result['state_bytes'] = state_size(directory)
+            results.append(result)
+    sink.close()
+
+    peak = peak_rss()
+    for result in results:
+        result['peak_rss'] = peak
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='동기화 파이프라인 벤치마크 (오프라인)')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--cols', type=int, default=20)
+    parser.add_argument('--change-ratio', type=float, default=0.05, help='수정할 행 비율')
+    parser.add_argument('--add-ratio', type=float, default=0.01, help='추가할 행 비율')
+    parser.add_argument('--delete-ratio', type=float, default=0.01, help='삭제할 행 비율')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='sbdb 호출 1회의 지연 시간 (ms)')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--state-backend', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--write-mode', choices=['split', 'upsert'], default='split')
+    parser.add_argument('--compact-every', type=int, default=DEFAULT_COMPACT_EVERY,
+                        help='json 상태의 journal 압축 주기 (0이면 실행 종료 시에만)')
+    parser.add_argument('--sink', choices=['memory', 'worker'], default='memory',
+                        help='sbdb sink (worker: 가짜 sbdb worker 프로세스)')
+    parser.add_argument('--worker-processes', type=int, default=1, help='--sink worker의 worker 프로세스 수')
+    args = parser.parse_args()
+
+    options = {key: getattr(args, key) for key in (
+        'cols', 'change_ratio', 'add_ratio', 'delete_ratio', 'latency_ms', 'workers',
+        'state_backend', 'write_mode', 'compact_every', 'sink', 'worker_processes')}
+
+    print(f"{'행 수':>8} {'단계':<12} {'변경':>7} {'실패':>5} {'시간(s)':>8} {'행/초':>9} "
+          f"{'fetch':>7} {'diff':>7} {'render':>7} {'write':>7} {'save':>7} {'RSS(MB)':>8} {'상태(KB)':>9}")
+
+    # 크기마다 새 프로세스 (최대 RSS가 앞선 크기의 영향을 받지 않도록)
+    context = multiprocessing.get_context('spawn')
+    for rows in args.rows:
+        with context.Pool(1) as pool:
+            results = pool.apply(run_size, (rows, options))
+
+        for result in results:
+            stages = result['stages']
+            rss = f"{result['peak_rss'] / 2**20:.1f}" if result['peak_rss'] else "-"
+            print(f"{rows:>8} {result['phase']:<12} {result['changes']:>7} {result['failed']:>5} "
+                  f"{result['seconds']:>8.2f} "
+                  f"{result['rows'] / result['seconds']:>9.0f} "
+                  f"{stages.get('fetch', 0):>7.2f} {stages.get('diff', 0):>7.2f} {stages.get('render', 0):>7.2f} "
+                  f"{stages.get('write', 0):>7.2f} {stages.get('save_state', 0):>7.2f} "
+                  f"{rss:>8} {result['state_bytes'] / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Document Render Module
+시트 행 -> sbdb 문서(제목 + Markdown 내용) 렌더링 + 렌더링 해시
+
+행마다 문서를 한 번만 렌더링해 변경 항목(item)에 보관하고 임베딩 / 저장 / 수정이 함께 쓴다.
+렌더링 해시는 sync_state의 행 상태에 기록되어, 체크섬이 바뀌었어도 렌더링한 문서가
+지난번 저장한 문서와 바이트 단위로 같으면 (예: 빈 칸에 공백만 들어간 경우) sbdb 쓰기를 건너뛴다.
+"""
+
+import hashlib
+
+CATEGORY_TAG = "입찰참여"
+TITLE_LIMIT = 50
+
+
+# 문서 제목 생성
+def build_title(row_data, headers, index):
+    """한 행의 데이터로 문서 제목 생성"""
+    # 부서명 (첫 번째 컬럼)
+    department = row_data.get(headers[0], "").strip() if len(headers) > 0 else ""
+    # 용역명 (두 번째 컬럼)
+    project_name = row_data.get(headers[1], "").strip() if len(headers) > 1 else ""
+
+    # 타이틀 생성: [입찰참여] 카테고리 + 부서명 + 용역명 (50자 제한)
+    if department and project_name:
+        title_base = f"{department} - {project_name}"
+    elif department:
+        title_base = department
+    elif project_name:
+        title_base = project_name
+    else:
+        title_base = "입찰정보"
+
+    # 용역명이 너무 길면 50자로 자르기
+    if len(title_base) > TITLE_LIMIT:
+        title_base = title_base[:TITLE_LIMIT - 3] + "..."
+
+    return f"[{CATEGORY_TAG}] {title_base} (#{index})"
+
+
+# 문서 제목/내용 생성
+def build_document(row_data, headers, index):
+    """한 행의 데이터로 문서 제목과 Markdown 내용 생성 -> (제목, 내용)
+
+    비어 있거나 공백뿐인 값은 내용에 넣지 않는다.
+    """
+    title = build_title(row_data, headers, index)
+
+    content_lines = [f"# {title}", ""]
+
+    for header in headers:
+        value = row_data.get(header, "")
+        if value is not None and str(value).strip():
+            content_lines.append(f"- **{header}**: {value}")
+
+    return title, "\n".join(content_lines)
+
+
+# 렌더링 해시
+def render_hash(title, content):
+    """렌더링한 문서(제목 + 내용)의 짧은 해시"""
+    data = title.encode('utf-8') + b"\0" + content.encode('utf-8')
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+# 변경 항목 렌더링
+def render_item(item, headers):
+    """변경 항목의 문서를 렌더링 (한 번만, item['document'] / item['render_hash']에 보관) -> (제목, 내용)"""
+    document = item.get('document')
+    if document is None:
+        document = build_document(item['data'], headers, item['index'])
+        item['document'] = document
+        item['render_hash'] = render_hash(*document)
+    return document
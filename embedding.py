@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Embedding Module
+문서 임베딩을 배치 단위로 생성 (OpenAI / 테스트용 로컬 임베더)
+"""
+
+import hashlib
+import math
+import os
+import struct
+
+from resilience import create_breaker, create_retry_policy, response_failure
+
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_BATCH_SIZE = 100
+OPENAI_EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
+
+
+class OpenAIEmbedder:
+    """OpenAI 임베딩 API (요청 1회에 여러 문서)"""
+
+    name = "openai"
+
+    def __init__(self, config):
+        # requests는 gspread 의존성으로 함께 설치됨
+        import requests
+
+        api_key = os.environ.get('OPENAI_API_KEY')
+        if not api_key:
+            raise RuntimeError("OPENAI_API_KEY 환경 변수가 없습니다.")
+
+        self.model = config.get('embedding_model', DEFAULT_EMBEDDING_MODEL)
+        self.timeout = config.get('sbdb_timeout', 60)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f"Bearer {api_key}",
+            'Content-Type': 'application/json',
+        })
+
+        # 429 / 5xx는 backoff 후 재시도 (속도 제한이면 breaker로 모든 호출 대기)
+        self.retry = create_retry_policy(config, create_breaker(config))
+
+    def embed_batch(self, texts):
+        """텍스트 목록 -> 같은 순서의 임베딩 목록"""
+        response = self.retry.call(
+            self.session.post,
+            OPENAI_EMBEDDINGS_URL,
+            json={'model': self.model, 'input': list(texts)},
+            timeout=self.timeout,
+            classify=response_failure
+        )
+        response.raise_for_status()
+        data = sorted(response.json()['data'], key=lambda item: item['index'])
+        return [item['embedding'] for item in data]
+
+    def close(self):
+        self.session.close()
+
+
+class LocalEmbedder:
+    """네트워크 없이 텍스트 해시로 고정 벡터를 만드는 테스트용 임베더"""
+
+    name = "local"
+
+    def __init__(self, config=None):
+        self.dimensions = (config or {}).get('local_embedding_dimensions', 64)
+        self.calls = 0
+
+    def _vector(self, text):
+        values = []
+        counter = 0
+        while len(values) < self.dimensions:
+            digest = hashlib.sha256(f"{counter}:{text}".encode('utf-8')).digest()
+            values.extend(v / 2**31 for v in struct.unpack('<8i', digest))
+            counter += 1
+
+        values = values[:self.dimensions]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def embed_batch(self, texts):
+        """텍스트 목록 -> 같은 순서의 임베딩 목록"""
+        self.calls += 1
+        return [self._vector(text) for text in texts]
+
+    def close(self):
+        pass
+
+
+EMBEDDER_BACKENDS = {
+    OpenAIEmbedder.name: OpenAIEmbedder,
+    LocalEmbedder.name: LocalEmbedder,
+}
+
+
+# 임베더 생성
+def create_embedder(config, backend=None):
+    """설정(embedding_backend)에 맞는 임베더 생성"""
+    backend = backend or config.get('embedding_backend', OpenAIEmbedder.name)
+
+    if backend not in EMBEDDER_BACKENDS:
+        raise ValueError(f"알 수 없는 임베딩 백엔드: {backend} "
+                         f"(사용 가능: {', '.join(EMBEDDER_BACKENDS)})")
+
+    return EMBEDDER_BACKENDS[backend](config)
+
+
+# 배치 임베딩
+def embed_contents(embedder, contents, batch_size=DEFAULT_BATCH_SIZE):
+    """contents를 batch_size개씩 묶어 임베딩 -> 같은 순서의 임베딩 목록"""
+    embeddings = []
+    for start in range(0, len(contents), batch_size):
+        batch = contents[start:start + batch_size]
+        embeddings.extend(embedder.embed_batch(batch))
+    return embeddings
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Reconcile Module
+sbdb 문서 목록으로 sync_state의 synced_rows를 다시 만들기 (--reconcile)
+
+sync_state가 없어졌거나 sbdb와 어긋났을 때, 카테고리 태그의 문서를 한 번에 조회해
+행 해시(metadata.row_hash)와 제목으로 색인하고 현재 시트 행과 짝을 맞춘다.
+짝이 맞은 행은 기존 문서 ID를 이어받고, 짝이 없는 문서(중복/삭제된 행)는
+삭제 대상으로 상태에 남겨 일반 삭제 감지가 처리하게 한다.
+"""
+
+import re
+
+# 삭제 대상으로 남기는 문서의 상태 키 접두사
+ORPHAN_PREFIX = "orphan:"
+
+_ROW_NUMBER_SUFFIX = re.compile(r"\s*\(#\d+\)$")
+
+
+# 제목 비교 키
+def title_key(title):
+    """문서 제목에서 행 번호 "(#n)"를 뗀 비교용 키 (행이 위아래로 움직여도 같은 키)"""
+    return _ROW_NUMBER_SUFFIX.sub("", title or "").strip()
+
+
+class DocumentIndex:
+    """sbdb 문서를 행 해시 / 제목 키로 색인 (한 문서는 한 행에만 연결)"""
+
+    def __init__(self, documents):
+        self.by_id = {}
+        self.by_hash = {}
+        self.by_title = {}
+
+        # id 순으로 넣어 같은 제목이 여러 개면 먼저 만든 문서부터 연결
+        for doc in sorted(documents, key=lambda d: d['id']):
+            self.by_id[doc['id']] = doc
+            if doc.get('row_hash'):
+                self.by_hash.setdefault(doc['row_hash'], []).append(doc['id'])
+            self.by_title.setdefault(title_key(doc['title']), []).append(doc['id'])
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def _take(self, bucket, key):
+        doc_ids = bucket.get(key)
+        while doc_ids:
+            doc = self.by_id.pop(doc_ids.pop(0), None)
+            if doc is not None:
+                return doc
+        return None
+
+    def claim(self, row_hash, title):
+        """행 해시가 같은 문서, 없으면 제목 키가 같은 문서를 꺼내기 -> 문서 또는 None"""
+        return self._take(self.by_hash, row_hash) or self._take(self.by_title, title_key(title))
+
+    def remaining(self):
+        """어느 행과도 연결되지 않은 문서 목록"""
+        return list(self.by_id.values())
+
+
+# 짝이 맞은 행의 상태 항목
+def matched_row(doc, row_number, title, checksum, column_checksums):
+    """문서 + 현재 행 -> synced_rows 항목
+
+    문서에 저장된 체크섬이 현재 행과 같으면 변경 없음으로, 다르거나 없으면
+    체크섬을 비워 다음 변경 감지에서 수정(임베딩 재생성)으로 처리되게 한다.
+    """
+    row = {
+        'row_number': row_number,
+        'title': title,
+        'doc_id': doc['id'],
+        'checksum': doc.get('checksum'),
+    }
+    if doc.get('checksum') == checksum:
+        row['column_checksums'] = column_checksums
+    return row
+
+
+# 남은 문서의 상태 항목
+def orphan_rows(documents):
+    """어느 행과도 연결되지 않은 문서 -> [(상태 키, 항목)] (삭제 감지에서 삭제됨)"""
+    return [(ORPHAN_PREFIX + doc['id'], {
+        'row_number': None,
+        'title': doc['title'],
+        'doc_id': doc['id'],
+        'checksum': None,
+    }) for doc in documents]
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Resilience Module
+시트 / sbdb 호출 재시도 (지수 backoff + jitter) + 공용 circuit breaker
+
+- 429 / 5xx 응답, 연결 오류, 시간 초과만 재시도하고 그 밖의 실패는 바로 돌려준다.
+- backend가 속도 제한(429)을 걸면 circuit breaker가 열려 같은 breaker를 쓰는
+  모든 worker가 Retry-After(없으면 cooldown) 동안 함께 멈춘다.
+- 연속 실패가 failure_threshold번 쌓여도 cooldown 동안 멈춘다.
+"""
+
+import random
+import re
+import threading
+import time
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+THROTTLE_STATUS = 429
+
+DEFAULT_RETRY_ATTEMPTS = 5
+DEFAULT_RETRY_BASE_DELAY = 1.0
+DEFAULT_RETRY_MAX_DELAY = 60.0
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_COOLDOWN = 30.0
+
+# 재시도할 네트워크 예외 (requests / urllib3 / 내장 예외 이름)
+RETRYABLE_ERRORS = ('ConnectionError', 'Timeout', 'ConnectTimeout', 'ReadTimeout',
+                    'ChunkedEncodingError', 'ProtocolError', 'TimeoutError')
+
+# sbdb 스크립트 출력에서 속도 제한 / 일시 오류를 찾는 패턴
+# 상태 코드는 HTTP 응답 문맥(HTTP 429, status_code=503, Error code: 429, 503 Service Unavailable)에서만 찾는다.
+# (traceback의 "line 429" 같은 숫자를 속도 제한으로 보지 않도록)
+STATUS_CONTEXT = r"(?:\bHTTP(?:/[\d.]+| error)?|\bstatus(?:[ _]?code)?|\berror[ _]?code|\"code\")\W{0,3}"
+THROTTLE_OUTPUT = re.compile(
+    rf"{STATUS_CONTEXT}429\b|too many requests|rate.?limit(?:ed|.?exceeded|.?reached)",
+    re.IGNORECASE
+)
+TRANSIENT_OUTPUT = re.compile(
+    rf"{STATUS_CONTEXT}(?:500|502|503|504)\b"
+    r"|\b(?:500 internal server error|502 bad gateway|503 service unavailable|504 gateway time-?out)"
+    r"|timed? ?out|temporarily unavailable|connection (?:reset|refused|aborted)",
+    re.IGNORECASE
+)
+
+
+class CircuitBreaker:
+    """여러 worker가 공유하는 차단기 (열려 있는 동안 모든 호출이 대기)"""
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_THRESHOLD, cooldown=DEFAULT_BREAKER_COOLDOWN,
+                 sleep=time.sleep):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.opened = 0
+        self.lock = threading.Lock()
+        self._sleep = sleep
+
+    def wait(self):
+        """차단기가 닫힐 때까지 대기"""
+        while True:
+            with self.lock:
+                remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            self._sleep(remaining)
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+
+    def record_failure(self, throttled=False, retry_after=None):
+        """실패 기록 (속도 제한이거나 연속 실패가 쌓이면 차단기 열기)"""
+        with self.lock:
+            self.failures += 1
+            if throttled or self.failures >= self.failure_threshold:
+                until = time.monotonic() + (retry_after or self.cooldown)
+                if until > self.open_until:
+                    self.open_until = until
+                    self.opened += 1
+                self.failures = 0
+
+
+class RetryPolicy:
+    """지수 backoff + full jitter 재시도 (breaker가 있으면 호출 전에 대기)"""
+
+    def __init__(self, attempts=DEFAULT_RETRY_ATTEMPTS, base_delay=DEFAULT_RETRY_BASE_DELAY,
+                 max_delay=DEFAULT_RETRY_MAX_DELAY, breaker=None, sleep=time.sleep):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.retries = 0
+        self._sleep = sleep
+
+    def backoff(self, attempt, retry_after=None):
+        """attempt번째 실패 후 대기 시간 (0 ~ base * 2^attempt 사이 임의 값, Retry-After 이상)"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(delay, retry_after or 0)
+
+    def call(self, func, *args, classify=None, retry_errors=True, **kwargs):
+        """func 실행, 일시적인 실패면 backoff 후 다시 시도 -> 마지막 결과
+
+        classify(result)가 (속도 제한 여부, Retry-After 초)를 돌려주면 실패 결과로 보고 재시도하고,
+        None이면 결과를 그대로 돌려준다. 재시도할 수 없는 예외는 바로 전달한다.
+        retry_errors=False면 예외(연결 오류 / 시간 초과)는 재시도하지 않는다.
+        (요청이 처리되었는지 알 수 없는 insert가 중복되지 않도록)
+        """
+        for attempt in range(self.attempts):
+            if self.breaker:
+                self.breaker.wait()
+
+            last_attempt = attempt == self.attempts - 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                failure = error_failure(e) if retry_errors else None
+                if failure is None:
+                    raise
+                if self.breaker:
+                    self.breaker.record_failure(*failure)
+                if last_attempt:
+                    raise
+            else:
+                failure = classify(result) if classify else None
+                if failure is None:
+                    if self.breaker:
+                        self.breaker.record_success()
+                    return result
+                if self.breaker:
+                    self.breaker.record_failure(*failure)
+                if last_attempt:
+                    return result
+
+            self.retries += 1
+            self._sleep(self.backoff(attempt, failure[1]))
+
+
+# HTTP 응답 분류
+def response_failure(response):
+    """재시도할 HTTP 응답이면 (속도 제한 여부, Retry-After 초), 아니면 None"""
+    status = getattr(response, 'status_code', None)
+    if status not in RETRYABLE_STATUS:
+        return None
+    return status == THROTTLE_STATUS, retry_after_seconds(response)
+
+
+# 속도 제한 응답 분류
+def throttle_failure(response):
+    """속도 제한(429) 응답이면 (True, Retry-After 초), 아니면 None (처리되지 않은 것이 확실한 실패만)"""
+    if getattr(response, 'status_code', None) != THROTTLE_STATUS:
+        return None
+    return True, retry_after_seconds(response)
+
+
+# 예외 분류
+def error_failure(error):
+    """재시도할 예외면 (속도 제한 여부, Retry-After 초), 아니면 None
+
+    응답이 달린 예외(requests.HTTPError, gspread APIError)는 상태 코드로,
+    그 밖에는 연결 오류 / 시간 초과만 재시도한다.
+    """
+    response = getattr(error, 'response', None)
+    if response is not None and getattr(response, 'status_code', None) is not None:
+        return response_failure(response)
+
+    if any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__):
+        return False, None
+    return None
+
+
+# 스크립트 실행 결과 분류
+def process_failure(result):
+    """sbdb 스크립트가 일시적인 오류로 실패했으면 (속도 제한 여부, None), 아니면 None"""
+    if result.returncode == 0:
+        return None
+    # 응답을 받지 못한 호출(worker 종료 / 응답 시간 초과)은 출력과 관계없이 일시적 오류
+    if getattr(result, 'transient', False):
+        return False, None
+
+    output = f"{result.stderr or ''}\n{result.stdout or ''}"
+    if THROTTLE_OUTPUT.search(output):
+        return True, None
+    if TRANSIENT_OUTPUT.search(output):
+        return False, None
+    return None
+
+
+# 스크립트 속도 제한 분류
+def process_throttle_failure(result):
+    """sbdb 스크립트가 속도 제한으로 실패했으면 (True, None), 아니면 None"""
+    if result.returncode == 0:
+        return None
+    return (True, None) if THROTTLE_OUTPUT.search(f"{result.stderr or ''}\n{result.stdout or ''}") else None
+
+
+# Retry-After 헤더
+def retry_after_seconds(response):
+    """Retry-After 헤더(초)를 숫자로 (없거나 날짜 형식이면 None)"""
+    value = (getattr(response, 'headers', None) or {}).get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+# 재시도 정책 생성
+def create_retry_policy(config, breaker=None):
+    """설정(retry_attempts / retry_base_delay / retry_max_delay)으로 재시도 정책 생성"""
+    return RetryPolicy(
+        attempts=config.get('retry_attempts', DEFAULT_RETRY_ATTEMPTS),
+        base_delay=config.get('retry_base_delay', DEFAULT_RETRY_BASE_DELAY),
+        max_delay=config.get('retry_max_delay', DEFAULT_RETRY_MAX_DELAY),
+        breaker=breaker,
+    )
+
+
+# circuit breaker 생성
+def create_breaker(config):
+    """설정(breaker_threshold / breaker_cooldown)으로 circuit breaker 생성"""
+    return CircuitBreaker(
+        failure_threshold=config.get('breaker_threshold', DEFAULT_BREAKER_THRESHOLD),
+        cooldown=config.get('breaker_cooldown', DEFAULT_BREAKER_COOLDOWN),
+    )
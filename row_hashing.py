@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Row Hashing Module
+행 고유 ID / 내용 체크섬 / 컬럼 체크섬 해시 방식 (교체 가능)
+
+- md5: 기존 방식. ID는 "부서명-용역명"의 MD5, 체크섬은 json.dumps(row, sort_keys=True)의 MD5
+       (이름에 하이픈이 들어가면 서로 다른 행의 ID가 겹칠 수 있음)
+- blake2b: 필드 길이 목록 + 필드 값을 이어 붙인 길이 접두 인코딩을 BLAKE2b로 해시 (기본값)
+- xxh3: blake2b와 같은 인코딩을 xxHash(XXH3-128)로 해시 (xxhash 패키지 필요)
+
+길이 접두 인코딩은 "길이1,길이2,...;값1값2..." 형태라 값 안의 구분자와 충돌하지 않으며,
+str.join / map만으로 만들어지므로 행마다 파이썬 루프나 JSON 직렬화가 없다.
+
+해시 방식을 바꾸면 sync_state의 행 키와 체크섬이 모두 달라지므로,
+migrate_state_hashes로 현재 시트 행을 기준으로 기존 항목을 새 키로 옮긴다.
+"""
+
+import hashlib
+import json
+from json.encoder import encode_basestring
+from operator import itemgetter
+
+DEFAULT_SCHEME = "blake2b"
+LEGACY_SCHEME = "md5"
+
+
+# 길이 접두 인코딩
+def encode_fields(values):
+    """필드 목록 -> "길이1,길이2,...;값1값2..." UTF-8 바이트 (구분자 충돌 없음)"""
+    values = [v if isinstance(v, str) else str(v) for v in values]
+    return (",".join(map(str, map(len, values))) + ";" + "".join(values)).encode('utf-8')
+
+
+class LegacyMd5Scheme:
+    """기존 MD5 + JSON 방식 (기존 sync_state 호환용)"""
+
+    name = LEGACY_SCHEME
+
+    def prepare(self, headers):
+        """레이아웃별 준비 데이터: 헤더 이름순 위치 + 미리 인코딩한 '"헤더": ' 조각"""
+        order = tuple(sorted(range(len(headers)), key=headers.__getitem__))
+        keys = tuple(json.dumps(headers[pos], ensure_ascii=False) + ": " for pos in order)
+        return order, keys
+
+    def row_hash(self, values):
+        if len(values) >= 2:
+            key = f"{values[0]}-{values[1]}"
+        else:
+            key = "-".join(str(v) for v in values)
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def checksum(self, prepared, values):
+        # json.dumps(row, sort_keys=True, ensure_ascii=False)와 바이트 단위로 같은 문자열
+        order, keys = prepared
+        parts = [key + (encode_basestring(values[pos]) if isinstance(values[pos], str)
+                        else json.dumps(values[pos], ensure_ascii=False))
+                 for key, pos in zip(keys, order)]
+        content = "{" + ", ".join(parts) + "}"
+        return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+    def column_checksum(self, value):
+        return hashlib.md5(str(value).encode('utf-8')).hexdigest()[:12]
+
+
+class LengthPrefixedScheme:
+    """길이 접두 필드 인코딩 + 빠른 해시 함수"""
+
+    def __init__(self, name, digest):
+        self.name = name
+        # digest(bytes, 바이트 수) -> hex 문자열
+        self._digest = digest
+
+    def prepare(self, headers):
+        """레이아웃별 준비 데이터: 헤더 이름순으로 값을 꺼내는 getter + 인코딩한 헤더 목록"""
+        order = sorted(range(len(headers)), key=headers.__getitem__)
+        if len(order) == 1:
+            single = order[0]
+            getter = lambda values: (values[single],)
+        elif order:
+            getter = itemgetter(*order)
+        else:
+            getter = lambda values: ()
+        header_prefix = encode_fields([headers[pos] for pos in order])
+        return getter, header_prefix
+
+    def row_hash(self, values):
+        fields = values[:2] if len(values) >= 2 else values
+        return self._digest(encode_fields(fields), 16)
+
+    def checksum(self, prepared, values):
+        getter, header_prefix = prepared
+        return self._digest(header_prefix + b"|" + encode_fields(getter(values)), 8)
+
+    def column_checksum(self, value):
+        return self._digest(value.encode('utf-8') if isinstance(value, str) else str(value).encode('utf-8'), 6)
+
+
+def _blake2b_digest(data, size):
+    return hashlib.blake2b(data, digest_size=size).hexdigest()
+
+
+def _xxh3_digest(data, size):
+    # xxhash는 선택 의존성 (hash_scheme이 xxh3일 때만 필요)
+    import xxhash
+    return xxhash.xxh3_128_hexdigest(data)[:size * 2]
+
+
+SCHEMES = {
+    LEGACY_SCHEME: LegacyMd5Scheme(),
+    "blake2b": LengthPrefixedScheme("blake2b", _blake2b_digest),
+    "xxh3": LengthPrefixedScheme("xxh3", _xxh3_digest),
+}
+
+
+# 해시 방식 조회
+def get_scheme(name=None):
+    """이름으로 해시 방식 조회 (없으면 기본값)"""
+    name = name or DEFAULT_SCHEME
+
+    if name not in SCHEMES:
+        raise ValueError(f"알 수 없는 해시 방식: {name} (사용 가능: {', '.join(SCHEMES)})")
+
+    if name == "xxh3":
+        try:
+            import xxhash  # noqa: F401
+        except ImportError:
+            raise ValueError("hash_scheme 'xxh3'를 사용하려면 xxhash 패키지가 필요합니다. "
+                             "(pip install xxhash)")
+
+    return SCHEMES[name]
+
+
+# 해시 방식 마이그레이션
+def migrate_state_hashes(records, store, old_scheme, new_scheme):
+    """현재 시트 레코드를 기준으로 이전 해시 방식의 상태 항목을 새 키로 옮기기 -> 옮긴 행 수
+
+    records는 new_scheme 레이아웃으로 만든 SheetRecord 목록이다.
+    내용이 그대로인 행은 새 체크섬/컬럼 체크섬으로 바꾸고,
+    내용이 바뀐 행은 체크섬을 비워 다음 변경 감지에서 수정(임베딩 재생성)으로 처리되게 한다.
+    시트에 없는 이전 항목은 그대로 남아 삭제 감지에서 처리된다.
+    """
+    if old_scheme.name == new_scheme.name:
+        return 0
+
+    rows = store.state['synced_rows']
+    moves = []
+    claimed = set()
+    targets = set()
+    prepared = {}
+
+    for record in records:
+        values = record.values_tuple
+        old_hash = old_scheme.row_hash(values)
+        new_hash = record.row_hash
+
+        if old_hash in claimed or new_hash in targets or new_hash in rows:
+            continue
+
+        entry = rows.get(old_hash)
+        if entry is None:
+            continue
+
+        entry = dict(entry)
+        layout = record.layout
+        if id(layout) not in prepared:
+            prepared[id(layout)] = old_scheme.prepare(layout.headers)
+        old_checksum = old_scheme.checksum(prepared[id(layout)], values)
+
+        if entry.get('checksum') == old_checksum:
+            entry['checksum'] = record.checksum
+            entry['column_checksums'] = record.column_checksums()
+        else:
+            entry['checksum'] = None
+            entry.pop('column_checksums', None)
+
+        claimed.add(old_hash)
+        targets.add(new_hash)
+        moves.append((old_hash, new_hash, entry))
+
+    if moves:
+        store.rekey_rows(moves)
+
+    return len(moves)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Run Metrics Module
+동기화 단계별 소요 시간 + sbdb 호출 지연 시간 집계 -> 실행 보고서(sync_report.json)
+
+- span(이름): 단계(connect / fetch / parse / diff / embed / write ...) 소요 시간을 누적
+- timed(작업, 함수): 함수 호출 지연 시간을 작업별로 기록 (save / update / delete ...)
+- report(): p50 / p95 / max 지연 시간과 처리량을 담은 JSON 보고서
+- merge_latency_history(): 작업별 평균 지연 시간을 sync_state의 latency_history에 누적 (--plan 예상 시간)
+worker 스레드에서 호출해도 되도록 기록은 잠금으로 보호한다.
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+from state_store import write_json_atomic
+
+REPORT_FILE = "sync_report.json"
+
+# latency_history 평균에 반영하는 이전 호출 수 상한 (최근 실행의 비중이 줄어들지 않도록)
+HISTORY_WEIGHT_LIMIT = 1000
+
+
+# 백분위수
+def percentile(sorted_values, fraction):
+    """정렬된 값 목록의 백분위수 (가장 가까운 순위 방식)"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class RunMetrics:
+    """실행 한 번의 단계별 시간 / 작업별 지연 시간 / 결과 정보"""
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.latencies = {}
+        self.info = {}
+        self.report_path = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """with 블록의 소요 시간을 단계 name에 누적"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+    def add_stage(self, name, seconds):
+        with self.lock:
+            stage = self.stages.setdefault(name, {'seconds': 0.0, 'count': 0})
+            stage['seconds'] += seconds
+            stage['count'] += 1
+
+    def observe(self, operation, seconds):
+        """작업 1회의 지연 시간 기록"""
+        with self.lock:
+            self.latencies.setdefault(operation, []).append(seconds)
+
+    def timed(self, operation, func):
+        """호출할 때마다 지연 시간을 기록하는 함수로 감싸기"""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(operation, time.perf_counter() - start)
+        return wrapper
+
+    def timed_iter(self, name, iterable):
+        """반복할 때마다 다음 항목을 꺼내는 시간을 단계 name에 누적 (청크 추출용)"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_stage(name, time.perf_counter() - start)
+                return
+            self.add_stage(name, time.perf_counter() - start)
+            yield item
+
+    def report(self):
+        """실행 보고서 dict (시간은 초, 지연 시간은 밀리초)"""
+        duration = time.perf_counter() - self.started
+
+        with self.lock:
+            stages = {name: {'seconds': round(stage['seconds'], 4), 'count': stage['count']}
+                      for name, stage in self.stages.items()}
+            operations = {}
+            for operation, values in self.latencies.items():
+                values = sorted(values)
+                operations[operation] = {
+                    'count': len(values),
+                    'total_seconds': round(sum(values), 4),
+                    'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                    'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+                    'max_ms': round(values[-1] * 1000, 2),
+                }
+
+        rows = self.info.get('rows') or 0
+
+        return {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'duration_seconds': round(duration, 4),
+            'rows_per_second': round(rows / duration, 2) if duration > 0 and rows else None,
+            **self.info,
+            'stages': stages,
+            'operations': operations,
+        }
+
+    def merge_latency_history(self, history):
+        """이번 실행의 작업별 지연 시간을 누적 평균 {작업: {count, mean_ms}}에 합치기 -> history"""
+        with self.lock:
+            for operation, values in self.latencies.items():
+                if not values:
+                    continue
+                entry = history.get(operation) or {'count': 0, 'mean_ms': 0.0}
+                weight = min(entry['count'], HISTORY_WEIGHT_LIMIT)
+                mean_ms = (entry['mean_ms'] * weight + sum(values) * 1000) / (weight + len(values))
+                history[operation] = {'count': entry['count'] + len(values), 'mean_ms': round(mean_ms, 2)}
+        return history
+
+    def write(self, path=None):
+        """보고서를 JSON 파일로 원자적으로 저장 (path가 없으면 report_path)"""
+        write_json_atomic(path or self.report_path, self.report())
+
+
+# 선택적 단계 측정
+def maybe_span(metrics, name):
+    """metrics가 있으면 span, 없으면 아무것도 하지 않는 context manager"""
+    return metrics.span(name) if metrics else nullcontext()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+sbdb Batch Runner
+NDJSON으로 받은 sbdb 스크립트 호출 여러 개를 한 프로세스에서 차례로 실행
+
+입력 한 줄: {"script": "save_document.py", "argv": ["--content", "...", "--title", "..."]}
+출력 한 줄: {"returncode": 0, "stdout": "...", "stderr": "..."} (입력 순서대로, 한 줄씩 바로 출력)
+
+스크립트는 runpy로 __main__처럼 실행하므로 인터프리터 시작과 import는 묶음당 한 번뿐이고,
+문서 내용은 명령행이 아니라 stdin / 파일로 전달되어 명령행 길이 제한이나 따옴표 처리 문제가 없다.
+
+사용법:
+    python sbdb_batch.py --scripts-dir DIR [batch.ndjson]   (파일이 없으면 stdin에서 읽음)
+"""
+
+import argparse
+import io
+import json
+import runpy
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+
+
+class _Capture(io.BytesIO):
+    """스크립트 출력 버퍼 (스크립트가 sys.stdout을 다시 감싼 wrapper가 정리되면서 닫아도 내용 유지)"""
+
+    def close(self):
+        pass
+
+
+# 스크립트 1회 실행
+def run_script(path, argv):
+    """스크립트를 명령행 인수 argv로 실행 -> {returncode, stdout, stderr}"""
+    # 스크립트가 sys.stdout.buffer를 다시 감싸도 출력을 모을 수 있도록 바이트 버퍼 사용
+    out_buffer, err_buffer = _Capture(), _Capture()
+    out = io.TextIOWrapper(out_buffer, encoding='utf-8', errors='replace', write_through=True)
+    err = io.TextIOWrapper(err_buffer, encoding='utf-8', errors='replace', write_through=True)
+
+    saved_argv = sys.argv
+    sys.argv = [str(path)] + [str(arg) for arg in argv]
+    returncode = 0
+
+    try:
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                runpy.run_path(str(path), run_name="__main__")
+            except SystemExit as e:
+                if isinstance(e.code, int):
+                    returncode = e.code
+                elif e.code is not None:
+                    print(e.code, file=sys.stderr)
+                    returncode = 1
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+    finally:
+        sys.argv = saved_argv
+
+    return {
+        'returncode': returncode,
+        'stdout': out_buffer.getvalue().decode('utf-8', errors='replace'),
+        'stderr': err_buffer.getvalue().decode('utf-8', errors='replace'),
+    }
+
+
+# 묶음 실행
+def run_batch(lines, scripts_dir, output):
+    """NDJSON 줄마다 스크립트를 실행하고 결과를 output에 한 줄씩 쓰기 -> 실패한 호출 수"""
+    failed = 0
+    for line in lines:
+        if not line.strip():
+            continue
+
+        try:
+            request = json.loads(line)
+            script = scripts_dir / Path(request['script']).name
+        except (ValueError, KeyError, TypeError) as e:
+            result = {'returncode': 1, 'stdout': "", 'stderr': f"잘못된 요청: {e}"}
+        else:
+            result = run_script(script, request.get('argv', []))
+
+        if result['returncode'] != 0:
+            failed += 1
+        # ASCII로만 출력 (콘솔 인코딩과 관계없이 읽을 수 있도록)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sbdb 스크립트 호출 묶음 실행 (NDJSON)')
+    parser.add_argument('--scripts-dir', required=True, help='sbdb 스크립트 폴더')
+    parser.add_argument('batch_file', nargs='?', help='NDJSON 파일 (없으면 stdin)')
+    args = parser.parse_args()
+
+    scripts_dir = Path(args.scripts_dir)
+    # python 스크립트.py로 실행할 때처럼 스크립트 폴더의 모듈을 import할 수 있게
+    sys.path.insert(0, str(scripts_dir))
+
+    output = sys.stdout
+    if args.batch_file:
+        with open(args.batch_file, 'r', encoding='utf-8') as f:
+            run_batch(f, scripts_dir, output)
+    else:
+        run_batch(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), scripts_dir, output)
+
+
+if __name__ == "__main__":
+    main()
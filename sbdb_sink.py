@@ -0,0 +1,909 @@
+#!/usr/bin/env python3
+"""
+sbdb Sink Module
+sbdb 문서 저장/수정/삭제 백엔드 (subprocess / direct)
+
+- subprocess: 기존 방식. sbdb 스킬 스크립트를 문서마다 별도 인터프리터로 실행
+              (sbdb_batch: 문서 내용을 명령행 대신 NDJSON으로 넘기고 묶음을 인터프리터 1개로 실행)
+- worker: sbdb 스크립트를 상주 프로세스(sbdb_worker.py) 안에서 실행. 요청 ID가 붙은 JSON-lines로
+          요청을 이어서 보내고(pipelining) 인터프리터 시작 / import 비용은 처음 한 번만 든다.
+- direct: Supabase REST / OpenAI 임베딩 API를 프로세스 안에서 직접 호출
+          (import 1회, HTTP 세션 재사용)
+
+여러 문서 삭제는 delete_many(ID 목록) / delete_by_tag(태그)로 한 번에 요청한다.
+direct는 ID 묶음마다 요청 1회, subprocess는 문서마다 스크립트를 실행한다.
+(sbdb_batch면 묶음마다 sbdb_batch.py 프로세스 1개)
+
+문서 목록은 iter_documents(태그)로 페이지 단위로 받아 문서를 하나씩 돌려준다.
+(id, title, tags, checksum, row_hash만 조회하며 개수 제한 없이 끝까지 읽음)
+
+direct는 sbdb_db_name을 문서 테이블의 sbdb_db_column 컬럼(기본 db_name)에 기록하고
+조회 / 태그 삭제도 그 DB의 문서로 한정한다. (컬럼이 비어 있는 이전 direct 문서도 포함하며
+수정할 때 채운다) 컬럼이 없으면 시작하지 않는다.
+
+direct는 문서 metadata에 행 해시/체크섬({row_hash, checksum})을 함께 저장하여
+상태 파일 없이도 문서와 시트 행을 다시 연결할 수 있게 한다. (--reconcile)
+
+upsert_many는 행 해시를 기준으로 문서를 저장/수정한다 (write_mode: upsert).
+direct는 묶음마다 기존 문서 조회 1회 + 새 문서 insert 1회 + 기존 문서마다 PATCH로 처리하고,
+이미 저장된 행을 다시 보내도 문서가 중복되지 않는다. 행 해시가 metadata에 없는 문서는
+상태의 문서 ID로 찾아 수정하면서 지금 행 해시를 기록한다.
+
+모든 요청은 resilience의 재시도 정책(지수 backoff + jitter)과 sink마다 하나인
+circuit breaker를 거친다. 새 문서 insert는 속도 제한(429)일 때만 다시 보낸다.
+"""
+
+import itertools
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as ResultTimeout
+from pathlib import Path
+
+from embedding import create_embedder
+from resilience import (create_breaker, create_retry_policy, process_failure, process_throttle_failure,
+                        response_failure, throttle_failure)
+
+# sbdb 스킬 스크립트 기본 경로
+DEFAULT_SCRIPTS_DIR = r"C:\Users\hjj\.claude\skills\sbdb\scripts"
+
+DEFAULT_TABLE = "documents"
+
+# sbdb 스크립트의 --db-name(sbdb_db_name)이 기록되는 문서 테이블 컬럼
+DEFAULT_DB_COLUMN = "db_name"
+
+# 삭제 요청 1회당 문서 수
+DEFAULT_DELETE_BATCH_SIZE = 100
+
+# upsert 요청 1회당 문서 수
+DEFAULT_UPSERT_BATCH_SIZE = 100
+
+# 문서 목록 페이지 크기
+DEFAULT_PAGE_SIZE = 500
+
+# subprocess 묶음 실행기 (sbdb_batch)
+BATCH_RUNNER = Path(__file__).parent / "sbdb_batch.py"
+
+# 상주 worker (sbdb_backend: worker)
+WORKER_SCRIPT = Path(__file__).parent / "sbdb_worker.py"
+
+
+# 목록 항목 정리
+def document_summary(doc):
+    """목록 조회 결과 -> {id, title, tags, checksum, row_hash} (본문/임베딩은 버림)"""
+    metadata = doc.get('metadata') or {}
+    return {
+        'id': str(doc['id']),
+        'title': doc.get('title'),
+        'tags': doc.get('tags') or [],
+        'checksum': doc.get('checksum') or metadata.get('checksum'),
+        'row_hash': doc.get('row_hash') or metadata.get('row_hash'),
+    }
+
+
+# 문서 ID 추출
+def extract_doc_id(output):
+    """save_document.py 출력에서 문서 ID 추출"""
+    match = re.search(r'ID:\s*([a-f0-9-]+)', output)
+    if match:
+        return match.group(1)
+    return None
+
+
+# 스크립트 실행 결과
+def process_result(result):
+    """update / delete 스크립트 실행 결과 -> (성공 여부, 오류)"""
+    return result.returncode == 0, result.stderr if result.returncode != 0 else None
+
+
+# 저장 스크립트 실행 결과
+def save_result(result):
+    """save_document.py 실행 결과 -> (성공 여부, 문서 ID, 오류)"""
+    if result.returncode == 0:
+        # 문서 ID 추출 (출력에서)
+        return True, extract_doc_id(result.stdout), None
+    return False, None, result.stderr
+
+
+class SubprocessSink:
+    """sbdb 스킬 스크립트를 subprocess로 실행하는 백엔드 (호환용)
+
+    sbdb_batch를 켜면 스크립트 호출을 NDJSON으로 묶음 실행기(sbdb_batch.py)의 stdin에 넘긴다.
+    문서 내용이 명령행에 들어가지 않고, 묶음(upsert_many / delete_many)은 인터프리터 1개로 처리한다.
+    """
+
+    name = "subprocess"
+    # 임베딩은 sbdb 스크립트가 직접 생성하므로 미리 계산한 임베딩을 받지 않음
+    accepts_embeddings = False
+
+    def __init__(self, config):
+        self.config = config
+        self.scripts_dir = Path(config.get('sbdb_scripts_dir', DEFAULT_SCRIPTS_DIR))
+        self.db_name = config.get('sbdb_db_name', 'company')
+        self.batch = config.get('sbdb_batch', False)
+        # 모든 worker가 같은 breaker를 공유 (속도 제한이면 함께 대기)
+        self.retry = create_retry_policy(config, create_breaker(config))
+
+    def _script(self, name):
+        return str(self.scripts_dir / name)
+
+    def _run(self, cmd, idempotent=True):
+        # 새 문서 저장(idempotent=False)은 속도 제한으로 실패했을 때만 다시 실행
+        return self.retry.call(
+            subprocess.run,
+            cmd,
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            classify=process_failure if idempotent else process_throttle_failure,
+            retry_errors=idempotent
+        )
+
+    def _invoke_batch(self, calls):
+        """묶음 실행기 1회 실행 -> 호출마다 CompletedProcess (실행기가 도중에 멈추면 나머지는 실패)"""
+        payload = "".join(json.dumps({'script': script, 'argv': args}, ensure_ascii=False) + "\n"
+                          for script, args, _ in calls)
+        cmd = ["python", str(BATCH_RUNNER), "--scripts-dir", str(self.scripts_dir)]
+
+        results = []
+        try:
+            process = subprocess.run(cmd, input=payload, capture_output=True, text=True, encoding='utf-8')
+            error = process.stderr or f"종료 코드 {process.returncode}"
+            for line in process.stdout.splitlines():
+                # 스크립트가 stdout 파일에 직접 쓴 줄은 건너뜀 (결과 줄만 읽음)
+                if line.startswith('{"returncode"'):
+                    output = json.loads(line)
+                    results.append(subprocess.CompletedProcess(
+                        cmd, output['returncode'], output['stdout'], output['stderr']))
+        except Exception as e:
+            error = str(e)
+
+        for script, args, _ in calls[len(results):]:
+            results.append(subprocess.CompletedProcess(cmd, 1, "", f"묶음 실행기 중단: {error}"))
+        return results[:len(calls)]
+
+    def _run_batch(self, calls):
+        """스크립트 호출 여러 개를 묶음 실행기로 -> 호출마다 CompletedProcess
+
+        calls: [(스크립트 이름, 인수 목록, idempotent)]
+        일시적인 오류로 실패한 호출만 모아 다시 실행한다. (새 문서 저장은 속도 제한일 때만)
+        """
+        results = [None] * len(calls)
+        pending = list(range(len(calls)))
+
+        def run_pending():
+            outputs = self._invoke_batch([calls[i] for i in pending])
+            failures = []
+            for i, output in zip(list(pending), outputs):
+                results[i] = output
+                failure = (process_failure if calls[i][2] else process_throttle_failure)(output)
+                if failure:
+                    failures.append((i, failure))
+            pending[:] = [i for i, _ in failures]
+            # 하나라도 속도 제한이면 묶음 전체를 속도 제한으로 보고 대기
+            return (any(failure[0] for _, failure in failures), None) if failures else None
+
+        self.retry.call(run_pending, classify=lambda failure: failure)
+        return results
+
+    def _call(self, script, args, idempotent=True):
+        """스크립트 1회 실행 (sbdb_batch면 묶음 실행기로, 내용이 명령행에 들어가지 않음)"""
+        if self.batch:
+            return self._run_batch([(script, args, idempotent)])[0]
+        return self._run(["python", self._script(script)] + args, idempotent)
+
+    def _save_call(self, title, content, tags):
+        return "save_document.py", [
+            "--content", content,
+            "--title", title,
+            "--tags", ",".join(tags),
+            "--db-name", self.db_name,
+            "--type", "text"
+        ], False
+
+    def _update_call(self, doc_id, title, content, regenerate_embedding=True):
+        args = [doc_id, "--content", content, "--title", title]
+        if regenerate_embedding:
+            args.append("--regenerate-embedding")
+        return "update_document.py", args, True
+
+    def _delete_call(self, doc_id):
+        return "delete_document.py", [doc_id, "--confirm"], True
+
+    def save(self, title, content, tags, embedding=None, metadata=None):
+        """문서 저장 -> (성공 여부, 문서 ID, 오류) (metadata는 스크립트가 받지 않으므로 무시)"""
+        try:
+            return save_result(self._call(*self._save_call(title, content, tags)))
+        except Exception as e:
+            return False, None, str(e)
+
+    def update(self, doc_id, title, content, embedding=None, regenerate_embedding=True, metadata=None):
+        """문서 수정 -> (성공 여부, 오류) (metadata는 스크립트가 받지 않으므로 무시)"""
+        try:
+            return process_result(self._call(*self._update_call(doc_id, title, content, regenerate_embedding)))
+        except Exception as e:
+            return False, str(e)
+
+    def delete(self, doc_id):
+        """문서 삭제 -> (성공 여부, 오류)"""
+        try:
+            return process_result(self._call(*self._delete_call(doc_id)))
+        except Exception as e:
+            return False, str(e)
+
+    def delete_many(self, doc_ids, batch_size=None):
+        """여러 문서 삭제 -> {실패한 문서 ID: 오류}
+
+        스크립트가 ID 1개씩만 받으므로 문서마다 스크립트를 실행한다.
+        sbdb_batch면 batch_size개씩 묶음 실행기 1개로 실행한다.
+        """
+        doc_ids = list(doc_ids)
+        if self.batch:
+            batch_size = batch_size or DEFAULT_DELETE_BATCH_SIZE
+            outcomes = []
+            for start in range(0, len(doc_ids), batch_size):
+                batch = doc_ids[start:start + batch_size]
+                outputs = self._run_batch([self._delete_call(doc_id) for doc_id in batch])
+                outcomes.extend(zip(batch, map(process_result, outputs)))
+        else:
+            outcomes = [(doc_id, self.delete(doc_id)) for doc_id in doc_ids]
+
+        return {doc_id: error or "삭제 실패" for doc_id, (success, error) in outcomes if not success}
+
+    def upsert_many(self, documents, batch_size=None):
+        """행 해시 기준 문서 저장/수정 -> {행 해시: (성공 여부, 문서 ID, 오류)}
+
+        스크립트로는 행 해시로 문서를 찾을 수 없으므로, 상태에 있는 문서 ID(doc_id)가
+        있으면 수정하고 없으면 새로 저장한다. sbdb_batch면 batch_size개씩 묶음 실행기 1개로 실행한다.
+        """
+        if not self.batch:
+            return {doc['row_hash']: self._upsert_one(doc) for doc in documents}
+
+        batch_size = batch_size or DEFAULT_UPSERT_BATCH_SIZE
+        documents = list(documents)
+        results = {}
+
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            calls = [self._update_call(doc['doc_id'], doc['title'], doc['content'],
+                                       doc.get('regenerate_embedding', True))
+                     if doc.get('doc_id') else self._save_call(doc['title'], doc['content'], doc['tags'])
+                     for doc in batch]
+            for doc, output in zip(batch, self._run_batch(calls)):
+                if doc.get('doc_id'):
+                    success, error = process_result(output)
+                    results[doc['row_hash']] = (success, doc['doc_id'], error)
+                else:
+                    results[doc['row_hash']] = save_result(output)
+
+        return results
+
+    def _upsert_one(self, doc):
+        if doc.get('doc_id'):
+            success, error = self.update(doc['doc_id'], doc['title'], doc['content'],
+                                         regenerate_embedding=doc.get('regenerate_embedding', True))
+            return success, doc['doc_id'], error
+        return self.save(doc['title'], doc['content'], doc['tags'])
+
+    def iter_documents(self, tag, page_size=DEFAULT_PAGE_SIZE):
+        """태그가 있는 문서를 하나씩 반환 ({id, title, tags, checksum, row_hash})
+
+        list_documents.py는 offset/cursor를 받지 않으므로 --limit을 page_size씩 늘려
+        다시 조회하고, 이미 돌려준 문서는 건너뛴다. 결과가 limit보다 적으면 끝이다.
+        """
+        seen = set()
+        limit = page_size
+
+        while True:
+            result = self._call("list_documents.py", [
+                "--tag", tag,
+                "--limit", str(limit),
+                "--json"
+            ])
+            if result.returncode != 0:
+                raise RuntimeError(f"문서 조회 실패: {result.stderr}")
+
+            documents = json.loads(result.stdout)
+            for doc in documents:
+                summary = document_summary(doc)
+                if summary['id'] not in seen:
+                    seen.add(summary['id'])
+                    yield summary
+
+            if len(documents) < limit:
+                return
+            limit += page_size
+
+    def delete_by_tag(self, tag, batch_size=None):
+        """태그가 있는 문서 모두 삭제 -> (삭제된 문서 ID 목록, {실패한 문서 ID: 오류})"""
+        doc_ids = [doc['id'] for doc in self.iter_documents(tag)]
+        failures = self.delete_many(doc_ids, batch_size)
+        return [doc_id for doc_id in doc_ids if doc_id not in failures], failures
+
+    def close(self):
+        pass
+
+
+class WorkerLost(RuntimeError):
+    """worker가 종료되어(응답 해석 실패 / 시간 초과로 종료 포함) 응답을 받지 못한 요청"""
+
+
+# 응답을 받지 못한 호출 결과
+def lost_result(cmd, message):
+    """응답을 받지 못한 호출의 실패 결과 (transient로 표시해 메시지와 관계없이 일시적 오류로 분류)"""
+    result = subprocess.CompletedProcess(cmd, 1, "", message)
+    result.transient = True
+    return result
+
+
+class _WorkerProcess:
+    """실행 중인 worker 프로세스 1개와 그 프로세스에 보낸 요청들"""
+
+    def __init__(self, process):
+        self.process = process
+        # 요청 ID -> Future (응답을 받으면 빠짐)
+        self.pending = {}
+        # 보낼 요청 줄 (쓰는 스레드가 차례로 stdin에 씀, None이면 stdin을 닫음)
+        self.outbox = queue.Queue()
+        self.alive = True
+
+
+class WorkerClient:
+    """sbdb_worker.py 프로세스 1개와의 연결
+
+    요청마다 ID를 붙여 보내고, 응답을 읽는 스레드가 ID로 요청의 Future를 찾아 결과를 넣는다.
+    요청은 쓰는 스레드가 stdin에 쓰므로 worker가 멈춰 파이프가 가득 차도 submit은 막히지 않는다.
+    worker가 종료되거나 응답 줄을 해석할 수 없으면 남은 요청은 모두 실패하고, 다음 요청 때 다시 띄운다.
+    """
+
+    def __init__(self, cmd, timeout=None):
+        self.cmd = cmd
+        # close에서 worker가 남은 요청을 끝내기를 기다리는 최대 시간 (초)
+        self.timeout = timeout
+        self.ids = itertools.count(1)
+        self.worker = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        process = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   text=True, encoding='utf-8')
+        self.worker = _WorkerProcess(process)
+        threading.Thread(target=self._read, args=(self.worker,), daemon=True).start()
+        threading.Thread(target=self._write, args=(self.worker,), daemon=True).start()
+
+    def _write(self, worker):
+        while True:
+            line = worker.outbox.get()
+            if line is None:
+                break
+            try:
+                worker.process.stdin.write(line)
+                worker.process.stdin.flush()
+            except (OSError, ValueError):
+                # worker 종료: 보내지 못한 요청은 응답을 읽는 스레드가 실패 처리
+                return
+        try:
+            worker.process.stdin.close()
+        except (OSError, ValueError):
+            pass
+
+    def _read(self, worker):
+        error = None
+        for line in worker.process.stdout:
+            # 스크립트가 stdout 파일에 직접 쓴 줄은 건너뜀 (응답 줄만 읽음)
+            if not line.startswith('{"id"'):
+                continue
+            try:
+                response = json.loads(line)
+                request_id = response['id']
+                result = subprocess.CompletedProcess(
+                    self.cmd, response['returncode'], response['stdout'], response['stderr'])
+            except (ValueError, KeyError, TypeError) as e:
+                # 어느 요청의 응답인지 알 수 없으므로 worker를 끝내고 남은 요청을 모두 실패 처리
+                error = f"sbdb worker 응답 해석 실패: {e}"
+                worker.process.kill()
+                break
+            with self.lock:
+                future = worker.pending.pop(request_id, None)
+            if future is not None:
+                future.set_result(result)
+
+        # worker 종료: 응답을 받지 못한 요청은 실패
+        with self.lock:
+            worker.alive = False
+            lost = list(worker.pending.values())
+            worker.pending.clear()
+        worker.outbox.put(None)
+        returncode = worker.process.wait()
+        for future in lost:
+            future.set_exception(WorkerLost(error or f"sbdb worker 종료 (코드 {returncode})로 응답을 받지 못함"))
+
+    def submit(self, script, args):
+        """요청 보내기 -> Future (결과는 CompletedProcess)"""
+        future = Future()
+        request_id = next(self.ids)
+        line = json.dumps({'id': request_id, 'script': script, 'argv': args}, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.worker is None or not self.worker.alive:
+                self._start()
+            self.worker.pending[request_id] = future
+            self.worker.outbox.put(line)
+        return future
+
+    def kill(self):
+        """응답이 없는 worker 종료 (남은 요청은 실패하고, 다음 요청 때 다시 띄움)"""
+        with self.lock:
+            worker = self.worker
+        if worker is not None and worker.process.poll() is None:
+            worker.process.kill()
+
+    def close(self):
+        """stdin을 닫아 worker가 남은 요청을 처리하고 끝나기를 기다림 (timeout이 지나면 종료)"""
+        with self.lock:
+            worker = self.worker
+        if worker is None:
+            return
+        worker.outbox.put(None)
+        try:
+            worker.process.wait(self.timeout)
+        except subprocess.TimeoutExpired:
+            worker.process.kill()
+            worker.process.wait()
+
+
+class WorkerSink(SubprocessSink):
+    """sbdb 스크립트를 상주 worker 프로세스로 실행하는 백엔드
+
+    요청마다 인터프리터를 띄우지 않고 worker(sbdb_worker.py)에 JSON-lines로 보낸다.
+    묶음(upsert_many / delete_many)은 응답을 기다리지 않고 한꺼번에 보내며(pipelining),
+    sbdb_worker_processes개의 worker에 번갈아 보낸다. sbdb_worker_fake면 스크립트 없이 성공 응답만 받는다.
+    응답은 요청마다 sbdb_timeout초까지 기다리고, 넘으면 그 worker를 종료하고 다음 요청 때 다시 띄운다.
+    """
+
+    name = "worker"
+
+    def __init__(self, config, worker_cmd=None):
+        super().__init__(config)
+        self.batch = True
+        self.timeout = config.get('sbdb_timeout', 60)
+
+        if worker_cmd is None:
+            worker_cmd = ["python", str(WORKER_SCRIPT)]
+            if config.get('sbdb_worker_fake'):
+                worker_cmd.append("--fake")
+            else:
+                worker_cmd += ["--scripts-dir", str(self.scripts_dir)]
+
+        self.clients = [WorkerClient(worker_cmd, self.timeout)
+                        for _ in range(max(1, config.get('sbdb_worker_processes', 1)))]
+        self.next_client = itertools.cycle(self.clients)
+        self.lock = threading.Lock()
+
+    def _invoke_batch(self, calls):
+        """호출을 모두 보낸 뒤 응답을 모음 -> 호출마다 CompletedProcess
+
+        worker는 요청을 차례로 처리하므로 앞 응답을 받은 뒤부터 sbdb_timeout초씩 기다린다.
+        """
+        submitted = []
+        for script, args, _ in calls:
+            with self.lock:
+                client = next(self.next_client)
+            submitted.append((client, client.submit(script, args)))
+
+        results = []
+        for client, future in submitted:
+            try:
+                results.append(future.result(timeout=self.timeout))
+            except ResultTimeout:
+                # 멈춘 worker는 종료 (그 worker의 남은 요청도 실패하고, 다음 요청 때 다시 띄움)
+                client.kill()
+                results.append(lost_result(client.cmd, f"sbdb worker 응답 시간 초과 ({self.timeout}초)"))
+            except WorkerLost as e:
+                results.append(lost_result(client.cmd, str(e)))
+            except Exception as e:
+                results.append(subprocess.CompletedProcess(client.cmd, 1, "", f"sbdb worker 오류: {e}"))
+        return results
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+
+
+class DirectSink:
+    """Supabase REST / OpenAI API를 직접 호출하는 백엔드 (HTTP 세션 재사용)"""
+
+    name = "direct"
+    accepts_embeddings = True
+
+    def __init__(self, config, embedding_backend=None):
+        # requests는 gspread 의존성으로 함께 설치됨 (direct 백엔드에서만 필요)
+        import requests
+
+        supabase_url = os.environ.get('SUPABASE_URL')
+        supabase_key = os.environ.get('SUPABASE_KEY')
+
+        missing = [name for name, value in (
+            ('SUPABASE_URL', supabase_url),
+            ('SUPABASE_KEY', supabase_key),
+        ) if not value]
+        if missing:
+            raise RuntimeError(f"direct 백엔드 환경 변수 누락: {', '.join(missing)}")
+
+        self.config = config
+        self.table = config.get('sbdb_table', DEFAULT_TABLE)
+        self.table_url = f"{supabase_url.rstrip('/')}/rest/v1/{self.table}"
+        self.timeout = config.get('sbdb_timeout', 60)
+        self.db_column = config.get('sbdb_db_column', DEFAULT_DB_COLUMN)
+        self.db_name = config.get('sbdb_db_name', 'company')
+
+        # Supabase 세션 (연결 재사용)
+        self.session = requests.Session()
+        self.session.headers.update({
+            'apikey': supabase_key,
+            'Authorization': f"Bearer {supabase_key}",
+            'Content-Type': 'application/json',
+        })
+
+        # 모든 worker가 같은 breaker를 공유 (속도 제한이면 함께 대기)
+        self.retry = create_retry_policy(config, create_breaker(config))
+
+        # 미리 계산한 임베딩이 없을 때 사용 (처음 필요할 때 생성: 목록 조회 / 삭제만 하면 API 키가 필요 없음)
+        self.embedding_backend = embedding_backend
+        self._embedder = None
+        self.embedder_lock = threading.Lock()
+
+        self._check_db_column()
+
+    @property
+    def embedder(self):
+        with self.embedder_lock:
+            if self._embedder is None:
+                self._embedder = create_embedder(self.config, self.embedding_backend)
+            return self._embedder
+
+    def _check_db_column(self):
+        """sbdb_db_name을 기록할 컬럼이 테이블에 있는지 확인 (없으면 문서가 어느 DB인지 남지 않으므로 시작하지 않음)"""
+        response = self._request('GET', params={'select': self.db_column, 'limit': 0})
+        if not response.ok:
+            raise RuntimeError(f"sbdb_db_name을 기록할 컬럼 '{self.db_column}'을(를) 테이블 '{self.table}'에서 "
+                               f"조회할 수 없습니다. sbdb_db_column 설정을 확인하세요. ({self._error(response)})")
+
+    def _db_condition(self):
+        # sbdb_db_name의 문서 + DB 컬럼이 비어 있는 이전 direct 문서 (PostgREST 논리 조건)
+        return f"or({self.db_column}.eq.{json.dumps(self.db_name, ensure_ascii=False)},{self.db_column}.is.null)"
+
+    def _db_filter(self):
+        return {'and': f"({self._db_condition()})"}
+
+    def _embed(self, content):
+        return self.embedder.embed_batch([content])[0]
+
+    def _request(self, method, idempotent=True, **kwargs):
+        # 새 문서 insert(idempotent=False)는 처리되지 않은 것이 확실한 429만 다시 보냄
+        return self.retry.call(
+            self.session.request,
+            method,
+            self.table_url,
+            timeout=self.timeout,
+            classify=response_failure if idempotent else throttle_failure,
+            retry_errors=idempotent,
+            **kwargs
+        )
+
+    def _error(self, response):
+        return f"HTTP {response.status_code}: {response.text[:500]}"
+
+    def _tag_filter(self, tag):
+        # tags 배열에 태그가 포함된 문서 (PostgREST cs 연산자)
+        return f"cs.{{{json.dumps(tag, ensure_ascii=False)}}}"
+
+    def save(self, title, content, tags, embedding=None, metadata=None):
+        """문서 저장 -> (성공 여부, 문서 ID, 오류)"""
+        try:
+            payload = {
+                'title': title,
+                'content': content,
+                'tags': tags,
+                'type': 'text',
+                'embedding': embedding if embedding is not None else self._embed(content),
+                self.db_column: self.db_name,
+            }
+            if metadata is not None:
+                payload['metadata'] = metadata
+            response = self._request(
+                'POST',
+                idempotent=False,
+                json=payload,
+                headers={'Prefer': 'return=representation'}
+            )
+
+            if response.ok:
+                rows = response.json()
+                return True, str(rows[0]['id']) if rows else None, None
+            return False, None, self._error(response)
+
+        except Exception as e:
+            return False, None, str(e)
+
+    def update(self, doc_id, title, content, embedding=None, regenerate_embedding=True, metadata=None):
+        """문서 수정 -> (성공 여부, 오류)"""
+        try:
+            payload = {
+                'title': title,
+                'content': content,
+                self.db_column: self.db_name,
+            }
+            if metadata is not None:
+                payload['metadata'] = metadata
+            if regenerate_embedding:
+                payload['embedding'] = embedding if embedding is not None else self._embed(content)
+
+            response = self._request(
+                'PATCH',
+                params={'id': f"eq.{doc_id}"},
+                json=payload
+            )
+            return response.ok, None if response.ok else self._error(response)
+
+        except Exception as e:
+            return False, str(e)
+
+    def delete(self, doc_id):
+        """문서 삭제 -> (성공 여부, 오류)"""
+        try:
+            response = self._request(
+                'DELETE',
+                params={'id': f"eq.{doc_id}"}
+            )
+            return response.ok, None if response.ok else self._error(response)
+
+        except Exception as e:
+            return False, str(e)
+
+    def delete_many(self, doc_ids, batch_size=None):
+        """여러 문서 삭제 -> {실패한 문서 ID: 오류}
+
+        batch_size개씩 묶어 id=in.(...) 요청 1회로 삭제하고,
+        묶음 요청이 실패하면 그 묶음만 문서별로 다시 삭제하여 실패한 ID를 가려낸다.
+        """
+        batch_size = batch_size or DEFAULT_DELETE_BATCH_SIZE
+        doc_ids = list(doc_ids)
+        failures = {}
+
+        for start in range(0, len(doc_ids), batch_size):
+            batch = doc_ids[start:start + batch_size]
+            try:
+                response = self._request(
+                    'DELETE',
+                    params={'id': f"in.({','.join(batch)})"}
+                )
+                if response.ok:
+                    continue
+            except Exception:
+                pass
+
+            for doc_id in batch:
+                success, error = self.delete(doc_id)
+                if not success:
+                    failures[doc_id] = error
+
+        return failures
+
+    def _find_existing(self, documents):
+        """행 해시 또는 상태의 문서 ID로 기존 문서 조회 (요청 1회) -> {행 해시: 문서 ID}
+
+        metadata에 지금 행 해시가 없는 문서(subprocess 백엔드 / 이전 해시 방식으로 만든 문서)는
+        상태에 있는 문서 ID(doc_id)로 찾는다. 행 해시로 찾은 문서가 우선이다.
+        여러 소스가 한 테이블을 쓰면 (source_tag) 행 해시는 그 소스 태그가 있는 문서에서만 찾는다.
+        (행 해시는 부서명 + 용역명뿐이라 연도별 시트처럼 소스끼리 겹칠 수 있음)
+        """
+        hash_condition = f"metadata->>row_hash.in.({','.join(doc['row_hash'] for doc in documents)})"
+        if self.config.get('source_tag'):
+            hash_condition = f"and({hash_condition},tags.{self._tag_filter(self.config['source_tag'])})"
+        conditions = [hash_condition]
+        doc_ids = [doc['doc_id'] for doc in documents if doc.get('doc_id')]
+        if doc_ids:
+            conditions.append(f"id.in.({','.join(doc_ids)})")
+
+        response = self._request(
+            'GET',
+            params={
+                'select': 'id,row_hash:metadata->>row_hash',
+                'and': f"({self._db_condition()},or({','.join(conditions)}))",
+            }
+        )
+        if not response.ok:
+            raise RuntimeError(f"기존 문서 조회 실패: {self._error(response)}")
+
+        rows = response.json()
+        by_hash = {row['row_hash']: str(row['id']) for row in rows if row['row_hash']}
+        found_ids = {str(row['id']) for row in rows}
+
+        existing = {}
+        for doc in documents:
+            doc_id = by_hash.get(doc['row_hash'])
+            if doc_id is None and doc.get('doc_id') in found_ids:
+                doc_id = doc['doc_id']
+            if doc_id is not None:
+                existing[doc['row_hash']] = doc_id
+        return existing
+
+    def _embed_missing(self, documents, embeddings):
+        """미리 계산된 임베딩이 없는 문서의 임베딩을 한 번에 생성해 embeddings({행 해시: 벡터})에 추가"""
+        missing = [doc for doc in documents if doc['embedding'] is None and doc['row_hash'] not in embeddings]
+        if missing:
+            vectors = self.embedder.embed_batch([doc['content'] for doc in missing])
+            embeddings.update(zip((doc['row_hash'] for doc in missing), vectors))
+
+    def _update_existing(self, doc_id, doc, embeddings):
+        """기존 문서를 보낸 컬럼만 수정 -> (성공 여부, 문서 ID, 오류), 문서가 없어졌으면 None"""
+        payload = {
+            'title': doc['title'],
+            'content': doc['content'],
+            'metadata': doc['metadata'],
+            self.db_column: self.db_name,
+        }
+        if doc['regenerate_embedding']:
+            payload['embedding'] = doc['embedding'] if doc['embedding'] is not None else embeddings[doc['row_hash']]
+
+        response = self._request(
+            'PATCH',
+            params={'id': f"eq.{doc_id}", 'select': 'id'},
+            json=payload,
+            headers={'Prefer': 'return=representation'}
+        )
+        if not response.ok:
+            return False, doc_id, self._error(response)
+        # 수정된 행이 없으면 조회 후 지워진 문서
+        return (True, doc_id, None) if response.json() else None
+
+    def _insert_new(self, documents, embeddings):
+        """새 문서 insert (요청 1회) -> {행 해시: (성공 여부, 문서 ID, 오류)}"""
+        payloads = [{
+            'title': doc['title'],
+            'content': doc['content'],
+            'tags': doc['tags'],
+            'type': 'text',
+            'embedding': doc['embedding'] if doc['embedding'] is not None else embeddings[doc['row_hash']],
+            'metadata': doc['metadata'],
+            self.db_column: self.db_name,
+        } for doc in documents]
+
+        response = self._request(
+            'POST',
+            idempotent=False,
+            params={'select': 'id,row_hash:metadata->>row_hash'},
+            json=payloads,
+            headers={'Prefer': 'return=representation'}
+        )
+        if not response.ok:
+            error = self._error(response)
+            return {doc['row_hash']: (False, None, error) for doc in documents}
+        return {row['row_hash']: (True, str(row['id']), None) for row in response.json()}
+
+    def _upsert_batch(self, documents):
+        existing = self._find_existing(documents)
+
+        # 임베딩이 필요한데 미리 계산되지 않은 문서는 한 번에 생성
+        embeddings = {}
+        self._embed_missing([doc for doc in documents
+                             if doc['regenerate_embedding'] or doc['row_hash'] not in existing], embeddings)
+
+        results = {}
+        inserts = [doc for doc in documents if doc['row_hash'] not in existing]
+
+        # 기존 문서는 PATCH로 수정 (upsert로 보내면 그사이 지워진 문서가 일부 컬럼만 있는 행으로 다시 생김)
+        for doc in documents:
+            if doc['row_hash'] not in existing:
+                continue
+            outcome = self._update_existing(existing[doc['row_hash']], doc, embeddings)
+            if outcome is None:
+                # 조회 후 지워진 문서는 태그 / 종류까지 갖춘 새 문서로 저장
+                inserts.append(doc)
+            else:
+                results[doc['row_hash']] = outcome
+
+        if inserts:
+            self._embed_missing(inserts, embeddings)
+            results.update(self._insert_new(inserts, embeddings))
+
+        return results
+
+    def upsert_many(self, documents, batch_size=None):
+        """행 해시 기준 문서 저장/수정 -> {행 해시: (성공 여부, 문서 ID, 오류)}
+
+        documents: [{row_hash, doc_id, title, content, tags, metadata, embedding, regenerate_embedding}]
+        sbdb에 같은 행 해시(metadata.row_hash)의 문서나 상태의 문서 ID(doc_id)인 문서가 있으면
+        수정(metadata의 행 해시도 갱신), 없으면 새로 만든다. (조회한 뒤 지워진 문서도 새로 만듦)
+        """
+        batch_size = batch_size or DEFAULT_UPSERT_BATCH_SIZE
+        documents = list(documents)
+        results = {}
+
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            try:
+                results.update(self._upsert_batch(batch))
+            except Exception as e:
+                for doc in batch:
+                    results[doc['row_hash']] = (False, None, str(e))
+
+        return results
+
+    def iter_documents(self, tag, page_size=DEFAULT_PAGE_SIZE):
+        """태그가 있는 문서를 하나씩 반환 ({id, title, tags, checksum, row_hash})
+
+        id 순으로 정렬해 마지막 id 이후를 다음 페이지로 읽으므로(keyset)
+        중간에 문서가 추가/삭제되어도 건너뛰거나 중복되지 않는다.
+        """
+        last_id = None
+
+        while True:
+            params = {
+                'select': 'id,title,tags,checksum:metadata->>checksum,row_hash:metadata->>row_hash',
+                'tags': self._tag_filter(tag),
+                'order': 'id.asc',
+                'limit': page_size,
+                **self._db_filter(),
+            }
+            if last_id is not None:
+                params['id'] = f"gt.{last_id}"
+
+            response = self._request('GET', params=params)
+            if not response.ok:
+                raise RuntimeError(f"문서 조회 실패: {self._error(response)}")
+
+            documents = response.json()
+            for doc in documents:
+                yield document_summary(doc)
+
+            if len(documents) < page_size:
+                return
+            last_id = documents[-1]['id']
+
+    def delete_by_tag(self, tag, batch_size=None):
+        """태그가 있는 문서 모두 삭제 (요청 1회) -> (삭제된 문서 ID 목록, {실패한 문서 ID: 오류})"""
+        response = self._request(
+            'DELETE',
+            params={
+                'tags': self._tag_filter(tag),
+                'select': 'id',
+                **self._db_filter(),
+            },
+            headers={'Prefer': 'return=representation'}
+        )
+        if not response.ok:
+            raise RuntimeError(f"태그 삭제 실패: {self._error(response)}")
+
+        return [str(row['id']) for row in response.json()], {}
+
+    def close(self):
+        self.session.close()
+        if self._embedder is not None:
+            self._embedder.close()
+
+
+SINK_BACKENDS = {
+    SubprocessSink.name: SubprocessSink,
+    WorkerSink.name: WorkerSink,
+    DirectSink.name: DirectSink,
+}
+
+
+# Sink 생성
+def create_sink(config, backend=None, embedding_backend=None):
+    """설정(sbdb_backend)에 맞는 sbdb 백엔드 생성 (embedding_backend: 임베딩을 직접 만드는 백엔드가 쓸 임베더)"""
+    backend = backend or config.get('sbdb_backend', SubprocessSink.name)
+
+    if backend not in SINK_BACKENDS:
+        raise ValueError(f"알 수 없는 sbdb 백엔드: {backend} "
+                         f"(사용 가능: {', '.join(SINK_BACKENDS)})")
+
+    sink_class = SINK_BACKENDS[backend]
+    if sink_class.accepts_embeddings:
+        return sink_class(config, embedding_backend=embedding_backend)
+    return sink_class(config)
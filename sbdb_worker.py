@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+sbdb Worker
+sbdb 스크립트를 실행하는 상주 프로세스 (stdin / stdout JSON-lines 프로토콜)
+
+요청 한 줄: {"id": 1, "script": "save_document.py", "argv": ["--content", "...", ...]}
+응답 한 줄: {"id": 1, "returncode": 0, "stdout": "...", "stderr": "..."}
+
+요청 ID로 응답을 찾으므로 클라이언트는 응답을 기다리지 않고 요청을 계속 보낼 수 있다. (pipelining)
+인터프리터 시작과 import는 프로세스를 띄울 때 한 번뿐이고, sbdb 스크립트는 이 프로세스 안에서만 실행되어
+동기화 프로세스와 분리된다. stdin이 닫히면 종료한다.
+
+--fake는 스크립트를 실행하지 않고 성공 응답만 돌려준다. (sbdb 없이 동기화 / 벤치마크 확인용)
+
+사용법:
+    python sbdb_worker.py --scripts-dir DIR
+    python sbdb_worker.py --fake [--fake-latency-ms 50]
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from sbdb_batch import run_script
+
+
+# 가짜 실행
+def fake_script(script, argv, latency=0.0):
+    """스크립트를 실행하지 않고 성공 결과 (save_document.py는 새 문서 ID 출력)"""
+    if latency:
+        time.sleep(latency)
+
+    if script == "save_document.py":
+        stdout = f"✅ 문서 저장 완료 ID: {uuid.uuid4()}\n"
+    elif script == "list_documents.py":
+        stdout = "[]\n"
+    else:
+        stdout = "✅ 완료\n"
+    return {'returncode': 0, 'stdout': stdout, 'stderr': ""}
+
+
+# 요청 처리
+def serve(lines, output, execute):
+    """요청 줄마다 execute(스크립트 이름, argv)를 실행하고 요청 ID와 함께 응답"""
+    for line in lines:
+        if not line.strip():
+            continue
+
+        try:
+            request = json.loads(line)
+            request_id = request['id']
+            script = Path(request['script']).name
+        except (ValueError, KeyError, TypeError) as e:
+            # ID를 알 수 없는 요청은 응답할 수 없으므로 로그만 남김
+            print(f"⚠️  잘못된 요청: {e}", file=sys.stderr)
+            continue
+
+        result = execute(script, request.get('argv', []))
+        # ASCII로만 출력 (콘솔 인코딩과 관계없이 읽을 수 있도록)
+        output.write(json.dumps({'id': request_id, **result}) + "\n")
+        output.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='sbdb 스크립트 상주 실행 (JSON-lines)')
+    parser.add_argument('--scripts-dir', help='sbdb 스크립트 폴더')
+    parser.add_argument('--fake', action='store_true', help='스크립트를 실행하지 않고 성공 응답만 반환')
+    parser.add_argument('--fake-latency-ms', type=float, default=0.0, help='--fake 요청 1회의 지연 시간 (ms)')
+    args = parser.parse_args()
+
+    if args.fake:
+        latency = args.fake_latency_ms / 1000
+
+        def execute(script, argv):
+            return fake_script(script, argv, latency)
+    else:
+        if not args.scripts_dir:
+            parser.error("--scripts-dir 또는 --fake가 필요합니다.")
+        scripts_dir = Path(args.scripts_dir)
+        # python 스크립트.py로 실행할 때처럼 스크립트 폴더의 모듈을 import할 수 있게
+        sys.path.insert(0, str(scripts_dir))
+
+        def execute(script, argv):
+            return run_script(scripts_dir / script, argv)
+
+    serve(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), sys.stdout, execute)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,60 @@
 #!/usr/bin/env python3
 """중복 문서 확인 스크립트"""
 
-import subprocess
+import argparse
 import json
+import sys
+from collections import Counter
+from pathlib import Path
+
+# 저장소 루트의 공용 모듈 사용
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sbdb_sink import DEFAULT_PAGE_SIZE, create_sink
+
+# 설정 파일 로드 (없으면 기본값)
+def load_config():
+    """저장소 루트의 config.json에서 sbdb 설정 읽기 (없으면 빈 설정)"""
+    config_path = Path(__file__).resolve().parent.parent / "config.json"
+
+    if not config_path.exists():
+        return {}
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def main():
-    # 문서 목록 조회
-    cmd = [
-        "python",
-        r"C:\Users\hjj\.claude\skills\sbdb\scripts\list_documents.py",
-        "--tag", "입찰참여",
-        "--json",
-        "--limit", "500"
-    ]
-
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        encoding='utf-8'
-    )
-
-    if result.returncode != 0:
-        print(f"오류: {result.stderr}")
+    parser = argparse.ArgumentParser(description='중복 문서 확인')
+    parser.add_argument('--tag', default='입찰참여', help='확인할 문서 태그 (기본: 입찰참여)')
+    parser.add_argument('--backend', choices=['subprocess', 'worker', 'direct'],
+                        help='sbdb 백엔드 (기본: config.json의 sbdb_backend 또는 subprocess)')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f'문서 목록 페이지 크기 (기본: {DEFAULT_PAGE_SIZE})')
+    args = parser.parse_args()
+
+    try:
+        sink = create_sink(load_config(), args.backend)
+    except Exception as e:
+        print(f"오류: {e}")
         return
 
+    # 문서 목록을 페이지 단위로 읽으며 타이틀 개수만 집계
+    title_counts = Counter()
     try:
-        docs = json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        print(f"JSON 파싱 오류: {e}")
-        print(f"출력: {result.stdout[:500]}")
+        for doc in sink.iter_documents(args.tag, args.page_size):
+            title_counts[doc['title']] += 1
+    except Exception as e:
+        print(f"오류: {e}")
         return
+    finally:
+        sink.close()
 
-    titles = [doc['title'] for doc in docs]
+    total = sum(title_counts.values())
 
-    print(f"전체 문서: {len(titles)}개")
-    print(f"고유 문서: {len(set(titles))}개")
-    print(f"중복 문서: {len(titles) - len(set(titles))}개")
+    print(f"전체 문서: {total}개")
+    print(f"고유 문서: {len(title_counts)}개")
+    print(f"중복 문서: {total - len(title_counts)}개")
 
     # 중복된 타이틀 찾기
-    title_counts = {}
-    for title in titles:
-        title_counts[title] = title_counts.get(title, 0) + 1
-
     duplicates = {title: count for title, count in title_counts.items() if count > 1}
 
     if duplicates:
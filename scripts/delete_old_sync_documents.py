@@ -4,76 +4,93 @@
 재동기화 전 기존 문서 정리용
 """
 
-import subprocess
 import json
 import sys
+from pathlib import Path
 
-def get_all_documents_with_tag(tag):
-    """특정 태그가 있는 모든 문서 ID 조회"""
-    cmd = [
-        "python",
-        r"C:\Users\hjj\.claude\skills\sbdb\scripts\list_documents.py",
-        "--tag", tag,
-        "--limit", "1000",  # 충분히 큰 수
-        "--json"
-    ]
+# 저장소 루트의 공용 모듈 사용
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sbdb_sink import DEFAULT_DELETE_BATCH_SIZE, DEFAULT_PAGE_SIZE, create_sink
 
+# 설정 파일 로드 (없으면 기본값)
+def load_config():
+    """저장소 루트의 config.json에서 sbdb 설정 읽기 (없으면 빈 설정)"""
+    config_path = Path(__file__).resolve().parent.parent / "config.json"
+
+    if not config_path.exists():
+        return {}
+
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def get_all_documents_with_tag(sink, tag, page_size=None):
+    """특정 태그가 있는 모든 문서 ID 조회 (페이지 단위로 끝까지 읽음)"""
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
-        )
-
-        if result.returncode == 0:
-            documents = json.loads(result.stdout)
-            return [doc['id'] for doc in documents]
-        else:
-            print(f"문서 조회 실패: {result.stderr}")
-            return []
+        return [doc['id'] for doc in sink.iter_documents(tag, page_size or DEFAULT_PAGE_SIZE)]
 
     except Exception as e:
-        print(f"오류 발생: {e}")
+        print(f"문서 조회 실패: {e}")
         return []
 
-def delete_document(doc_id):
-    """문서 삭제"""
-    cmd = [
-        "python",
-        r"C:\Users\hjj\.claude\skills\sbdb\scripts\delete_document.py",
-        doc_id,
-        "--confirm"
-    ]
+def delete_tagged_documents(sink, tag, batch_size=None):
+    """태그가 있는 문서를 한 번에 삭제하고 결과 출력"""
+    print(f"\n'{tag}' 태그가 있는 문서를 한 번에 삭제합니다...")
 
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
-        )
+        deleted, failures = sink.delete_by_tag(tag, batch_size)
+    except Exception as e:
+        print(f"❌ 삭제 실패: {e}")
+        sys.exit(1)
+    finally:
+        sink.close()
 
-        return result.returncode == 0
+    for doc_id, error in failures.items():
+        print(f"  ❌ 삭제 실패: {doc_id[:8]}... ({str(error).strip()[:100]})")
 
-    except Exception as e:
-        return False
+    print("\n" + "=" * 60)
+    print("삭제 완료")
+    print("=" * 60)
+    print(f"✅ 성공: {len(deleted)}개")
+    print(f"❌ 실패: {len(failures)}개")
+    print("=" * 60)
 
 def main():
     import argparse
     parser = argparse.ArgumentParser(description='구글시트 태그가 있는 모든 문서 삭제')
     parser.add_argument('--force', action='store_true', help='확인 없이 바로 삭제')
+    parser.add_argument('--backend', choices=['subprocess', 'worker', 'direct'],
+                        help='sbdb 백엔드 (기본: config.json의 sbdb_backend 또는 subprocess)')
+    parser.add_argument('--batch-size', type=int,
+                        help=f'삭제 요청 1회당 문서 수 (기본: {DEFAULT_DELETE_BATCH_SIZE})')
+    parser.add_argument('--page-size', type=int,
+                        help=f'문서 목록 페이지 크기 (기본: {DEFAULT_PAGE_SIZE})')
+    parser.add_argument('--by-tag', action='store_true',
+                        help='문서 목록 조회 없이 태그로 한 번에 삭제 (--force와 함께 사용)')
     args = parser.parse_args()
 
     tag = "구글시트"
+    config = load_config()
+
+    try:
+        sink = create_sink(config, args.backend)
+    except Exception as e:
+        print(f"❌ sbdb 백엔드 초기화 실패: {e}")
+        sys.exit(1)
 
     print("=" * 60)
     print("기존 문서 삭제 시작")
     print("=" * 60)
 
+    if args.by_tag:
+        if not args.force:
+            print("❌ --by-tag는 --force와 함께 사용해야 합니다.")
+            sys.exit(1)
+        delete_tagged_documents(sink, tag, args.batch_size or config.get('delete_batch_size'))
+        return
+
     # 1. 문서 ID 수집
     print(f"\n'{tag}' 태그가 있는 문서 조회 중...")
-    doc_ids = get_all_documents_with_tag(tag)
+    doc_ids = get_all_documents_with_tag(sink, tag, args.page_size)
 
     print(f"총 {len(doc_ids)}개 문서 발견")
 
@@ -90,19 +107,26 @@ def main():
     else:
         print(f"\n--force 옵션: 확인 없이 {len(doc_ids)}개 문서 삭제를 시작합니다.")
 
-    # 3. 문서 삭제
-    print(f"\n문서 삭제 중...")
-    success_count = 0
-    fail_count = 0
-
-    for idx, doc_id in enumerate(doc_ids):
-        success = delete_document(doc_id)
-        if success:
-            success_count += 1
-            print(f"  ✅ [{idx+1}/{len(doc_ids)}] 삭제 완료: {doc_id[:8]}...")
-        else:
-            fail_count += 1
-            print(f"  ❌ [{idx+1}/{len(doc_ids)}] 삭제 실패: {doc_id[:8]}...")
+    # 3. 문서 일괄 삭제
+    batch_size = args.batch_size or config.get('delete_batch_size', DEFAULT_DELETE_BATCH_SIZE)
+    print(f"\n문서 삭제 중... (요청 1회당 {batch_size}개)")
+    failures = {}
+
+    for start in range(0, len(doc_ids), batch_size):
+        batch = doc_ids[start:start + batch_size]
+        batch_failures = sink.delete_many(batch, batch_size)
+        failures.update(batch_failures)
+        done = start + len(batch)
+        print(f"  ✅ [{done}/{len(doc_ids)}] 삭제 완료: {len(batch) - len(batch_failures)}개"
+              + (f", 실패 {len(batch_failures)}개" if batch_failures else ""))
+
+    sink.close()
+
+    for doc_id, error in failures.items():
+        print(f"  ❌ 삭제 실패: {doc_id[:8]}... ({str(error).strip()[:100]})")
+
+    fail_count = len(failures)
+    success_count = len(doc_ids) - fail_count
 
     # 4. 결과 요약
     print("\n" + "=" * 60)
@@ -2,16 +2,39 @@
 """
 Google Sheets to sbdb Sync Script
 구글 시트 데이터를 자동으로 sbdb(Supabase Database)에 저장하는 스크립트
+
+--bootstrap: 증분 동기화를 처음 시작할 때 쓰는 전체 저장 모드.
+  시트를 청크 단위로 읽어 worker pool에서 묶음으로 저장하고(진행 막대 + 행/초 출력),
+  끝나면 증분 동기화(sync_google_sheet_incremental.py)가 그대로 이어 쓸 sync_state.json을 남긴다.
+  (설정은 증분 동기화와 같은 저장소 루트의 config.json)
 """
 
 import gspread
 from google.oauth2.service_account import Credentials
+import argparse
 import subprocess
 import json
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
+# 저장소 루트의 공용 모듈 사용
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from sheet_records import build_records, get_layout
+import sync_google_sheet_incremental as incremental
+from resilience import create_retry_policy
+from row_hashing import get_scheme
+from run_metrics import RunMetrics
+from sheet_sources import SheetConnector, sheet_cache, source_configs
+from state_store import STATE_BACKENDS
+
+# 부트스트랩 청크 크기 기본값 (config.json의 chunk_size가 없을 때)
+DEFAULT_BOOTSTRAP_CHUNK_SIZE = 500
+
+# 진행 막대 길이
+PROGRESS_WIDTH = 30
+
 # 설정 파일 로드
 def load_config():
     """config.json 파일에서 설정 읽기"""
@@ -80,47 +103,12 @@ def fetch_sheet_data(worksheet, test_mode=False, test_limit=5):
             print("⚠️  데이터가 충분하지 않습니다.")
             return [], []
 
-        # 두 번째 행을 헤더로 사용 (첫 행은 빈 행)
-        raw_headers = all_values[1]
-
-        # 빈 헤더 처리 및 중복 제거
-        headers = []
-        header_indices = []
-        seen = set()
-
-        for idx, header in enumerate(raw_headers):
-            # 빈 헤더는 건너뛰기
-            if not header or header.strip() == '':
-                continue
-
-            # 중복 헤더 처리 (번호 추가)
-            original_header = header.strip()
-            unique_header = original_header
-            counter = 1
-            while unique_header in seen:
-                unique_header = f"{original_header}_{counter}"
-                counter += 1
-
-            headers.append(unique_header)
-            header_indices.append(idx)
-            seen.add(unique_header)
-
-        # 데이터 행들을 딕셔너리 리스트로 변환
-        all_records = []
-        for row in all_values[2:]:  # 첫 행(빈 행) + 헤더 제외, 세 번째 행부터 데이터
-            # 빈 행 건너뛰기
-            if not any(cell.strip() for cell in row if cell):
-                continue
-
-            record = {}
-            for header, idx in zip(headers, header_indices):
-                # 인덱스가 row 길이를 넘지 않도록 확인
-                if idx < len(row):
-                    record[header] = row[idx]
-                else:
-                    record[header] = ""
-
-            all_records.append(record)
+        # 두 번째 행을 헤더로 사용 (첫 행은 빈 행), 빈/중복 헤더 정리
+        layout = get_layout(all_values[1])
+        headers = layout.headers
+
+        # 데이터 행들을 레코드로 변환 (세 번째 행부터 데이터, 빈 행 건너뛰기)
+        all_records, _ = build_records(all_values[2:], 3, layout)
 
         # 테스트 모드 또는 전체 모드
         if test_mode:
@@ -196,15 +184,215 @@ def save_to_sbdb(row_data, headers, config, index):
     except Exception as e:
         return False, str(e)
 
+# 진행 막대
+def format_progress(done_rows, position, total_rows, elapsed):
+    """진행 막대 한 줄 (시트 행 위치 기준 비율 + 저장한 행 수 + 행/초 + 남은 시간)"""
+    ratio = min(1.0, position / total_rows) if total_rows else 1.0
+    filled = int(PROGRESS_WIDTH * ratio)
+    rate = done_rows / elapsed if elapsed > 0 else 0.0
+    remaining = elapsed * (1 - ratio) / ratio if ratio > 0 else 0.0
+    return (f"   ⏩ [{'█' * filled}{'░' * (PROGRESS_WIDTH - filled)}] {ratio:4.0%} · "
+            f"{done_rows}행 · {rate:.0f}행/초 · 남은 시간 약 {remaining:.0f}초")
+
+# 부트스트랩 (소스 하나)
+def bootstrap_source(args, config, connector, namespace=None):
+    """시트 전체를 청크 단위로 읽어 묶음 저장하고 증분 동기화용 상태 파일 작성 -> 실패 수
+
+    이미 상태에 있는 행(중단된 부트스트랩에서 저장한 행)은 건너뛰므로 다시 실행하면 이어서 진행한다.
+    """
+    if namespace:
+        print(f"\n📚 소스: {namespace}")
+
+    config = dict(config)
+    # 새 행은 묶음으로 저장 (write_mode를 지정하지 않았으면 upsert)
+    config.setdefault('write_mode', 'upsert')
+    backend = args.backend or config.get('sbdb_backend', 'subprocess')
+
+    store = incremental.open_state_store(config, args.state_backend, namespace)
+    sync_state = store.load()
+
+    if sync_state['last_sync'] and not args.force:
+        print(f"❌ 이미 동기화한 상태가 있습니다 (마지막 동기화: {sync_state['last_sync']}).")
+        print("   증분 동기화를 사용하세요: python sync_google_sheet_incremental.py")
+        print("   (그래도 부트스트랩하려면 --force)")
+        store.close()
+        sys.exit(1)
+    if sync_state['synced_rows']:
+        print(f"   ♻️ 저장된 행 {len(sync_state['synced_rows'])}개는 건너뛰고 이어서 진행합니다.")
+
+    metrics = RunMetrics()
+    metrics.report_path = incremental.report_path_for(store)
+    metrics.info.update(mode='bootstrap', backend=backend)
+    if namespace:
+        metrics.info['source'] = namespace
+
+    scheme = get_scheme(config.get('hash_scheme'))
+    if not sync_state['synced_rows']:
+        sync_state['hash_scheme'] = scheme.name
+
+    print("\n🔗 구글 시트 연결 중...")
+    with metrics.span('connect'):
+        worksheet = connector.worksheet(config)
+    print(f"   시트 이름: {worksheet.title}")
+
+    # 읽기 전에 수정 시각을 기록 (부트스트랩 도중 수정된 행은 다음 증분 동기화에서 반영)
+    modified_time = None
+    if config.get('fetch_mode', 'full') in ('modified', 'delta'):
+        modified_time = incremental.get_sheet_modified_time(connector, config['sheet_id'])
+
+    chunk_size = args.chunk_size or config.get('chunk_size') or DEFAULT_BOOTSTRAP_CHUNK_SIZE
+    workers = args.workers or config.get('workers', 1)
+    total_rows = max(worksheet.row_count - 2, 0)
+    print(f"\n📥 {total_rows}행을 {chunk_size}행 단위로 저장합니다 "
+          f"(worker {workers}개, 저장 방식 {config['write_mode']}, sbdb 백엔드 {backend})")
+
+    chunks = metrics.timed_iter('fetch', incremental.iter_sheet_chunks(
+        worksheet, config.get('fetch_columns'), 3, chunk_size,
+        config.get('required_column_index', 1), scheme.name,
+        retry=create_retry_policy(config), metrics=metrics
+    ))
+
+    sink = None
+    headers = None
+    last_row = None
+    record_count = 0
+    saved = 0
+    success_count = 0
+    fail_count = 0
+    seen_hashes = set()
+    started = time.perf_counter()
+
+    try:
+        for chunk_index, (records, headers, chunk_last_row) in enumerate(chunks, start=1):
+            if records:
+                with metrics.span('diff'):
+                    changes = incremental.detect_changes(
+                        records, headers, sync_state, config.get('embedding_columns'),
+                        index_offset=record_count, detect_deletes=False, seen_hashes=seen_hashes
+                    )
+                with metrics.span('render'):
+                    incremental.render_changes(changes, headers)
+                    incremental.record_same_renders(changes, headers, store)
+                record_count += len(records)
+                last_row = chunk_last_row or last_row
+
+                if changes['new'] or changes['updated']:
+                    sink = sink or incremental.open_sink(config, backend, args.embedder)
+                    success, fail = incremental.process_changes(
+                        changes, headers, config, args, sink, store, metrics, verbose=False
+                    )
+                    success_count += success
+                    fail_count += fail
+                    saved += success
+
+            position = min(chunk_index * chunk_size, total_rows)
+            print(format_progress(saved, position, total_rows, time.perf_counter() - started))
+    finally:
+        if sink:
+            sink.close()
+
+    metrics.info.update(rows=record_count, success=success_count, failed=fail_count)
+
+    if not record_count:
+        print("⚠️  데이터가 없습니다.")
+        metrics.info['status'] = 'no_data'
+        store.close()
+        metrics.write()
+        return 0
+
+    # 증분 동기화가 이어서 쓸 상태 (탭 캐시, 행 수, 추출 위치, 재시도 대기열)
+    incremental.prune_retry_queue(sync_state, seen_hashes)
+    sync_state['sheet_cache'] = sheet_cache(config, worksheet, headers)
+    sync_state['last_sync'] = datetime.now().isoformat()
+    sync_state['total_rows'] = record_count
+    if fail_count == 0:
+        incremental.record_fetch_position(sync_state, modified_time, last_row, record_count)
+    # sbdb 백엔드별 / 작업별 평균 지연 시간 (증분 동기화 --plan 예상 시간)
+    metrics.merge_latency_history(sync_state.setdefault('latency_history', {}).setdefault(backend, {}))
+    with metrics.span('save_state'):
+        store.save()
+    store.close()
+
+    metrics.info['status'] = 'partial' if fail_count else 'ok'
+    metrics.info['retry_queue'] = len(sync_state.get('retry_queue') or {})
+    metrics.write()
+
+    elapsed = time.perf_counter() - started
+    print("\n" + "=" * 60)
+    print("📊 부트스트랩 완료")
+    print("=" * 60)
+    print(f"   📝 전체: {record_count}개 행 ({elapsed:.1f}초, {record_count / elapsed:.0f}행/초)")
+    print(f"   ✅ 저장: {success_count}개")
+    print(f"   ❌ 실패: {fail_count}개" +
+          (" (재시도 대기열에 기록, 증분 동기화에서 다시 처리)" if fail_count else ""))
+    print(f"   📂 상태 파일: {getattr(store, 'state_path', None) or store.db_path}")
+    print(f"   📈 실행 보고서: {metrics.report_path}")
+    print("=" * 60)
+    return fail_count
+
+# 부트스트랩
+def bootstrap(args):
+    """증분 동기화 설정(저장소 루트 config.json)으로 소스마다 부트스트랩"""
+    print("\n📝 설정 파일 로드 중...")
+    config = incremental.load_config()
+    connector = SheetConnector(config)
+    sources = source_configs(config)
+
+    if sources is None:
+        failed = bootstrap_source(args, config, connector)
+    else:
+        if args.source:
+            sources = [source for source in sources if source['name'] == args.source]
+            if not sources:
+                print(f"❌ 소스를 찾을 수 없습니다: {args.source}")
+                sys.exit(1)
+        failed = sum(bootstrap_source(args, source, connector, source['name']) for source in sources)
+
+    if failed:
+        sys.exit(1)
+
+# 명령행 인수
+def parse_args():
+    """명령행 인수 파싱"""
+    parser = argparse.ArgumentParser(description='Google Sheets → sbdb 동기화')
+    parser.add_argument('--test', action='store_true', help='처음 5개 행만 저장')
+    parser.add_argument('--bootstrap', action='store_true',
+                        help='청크 단위 전체 저장 + 증분 동기화용 sync_state.json 작성')
+    parser.add_argument('--force', action='store_true',
+                        help='--bootstrap: 이미 동기화한 상태가 있어도 실행')
+    parser.add_argument('--source', help='--bootstrap: sources 중 이 소스만 실행')
+    parser.add_argument('--chunk-size', type=int,
+                        help=f'--bootstrap: 청크 행 수 (기본: config.json의 chunk_size 또는 '
+                             f'{DEFAULT_BOOTSTRAP_CHUNK_SIZE})')
+    parser.add_argument('--workers', type=int,
+                        help='--bootstrap: 동시에 처리할 worker 수 (기본: config.json의 workers 또는 1)')
+    parser.add_argument('--rate-limit', type=float,
+                        help='--bootstrap: 초당 최대 sbdb 호출 수 (기본: config.json의 rate_limit)')
+    parser.add_argument('--backend', choices=['subprocess', 'worker', 'direct'],
+                        help='--bootstrap: sbdb 백엔드 (기본: config.json의 sbdb_backend 또는 subprocess)')
+    parser.add_argument('--state-backend', choices=STATE_BACKENDS,
+                        help='--bootstrap: 상태 저장 방식 (기본: config.json의 state_backend 또는 json)')
+    parser.add_argument('--embedding-batch-size', type=int,
+                        help='--bootstrap: 임베딩 요청 1회당 문서 수 (기본: config.json의 embedding_batch_size)')
+    parser.add_argument('--embedder', choices=['openai', 'local'],
+                        help='--bootstrap: 임베딩 백엔드 (기본: config.json의 embedding_backend 또는 openai)')
+    return parser.parse_args()
+
 # 메인 함수
 def main():
     """메인 실행 함수"""
+    args = parse_args()
+
     print("=" * 60)
     print("🚀 Google Sheets → sbdb 동기화 시작")
     print("=" * 60)
 
+    if args.bootstrap:
+        bootstrap(args)
+        return
+
     # 명령행 인수 확인
-    test_mode = "--test" in sys.argv
+    test_mode = args.test
 
     # 설정 로드
     print("\n📝 설정 파일 로드 중...")
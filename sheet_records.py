@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Sheet Records Module
+구글 시트 헤더 정리 + 행 -> 레코드 변환 (증분/전체 동기화 스크립트 공용)
+
+헤더 행은 한 번만 HeaderLayout으로 컴파일하고(원본 헤더 행 기준 캐시),
+각 데이터 행은 operator.itemgetter로 필요한 컬럼만 꺼내 튜플로 보관한다.
+행마다 dict를 만들지 않고 헤더 목록은 모든 레코드가 공유한다.
+
+행 해시(부서명-용역명)와 체크섬은 레코드마다 처음 필요할 때 한 번만 계산한다.
+해시 방식(row_hashing)은 레이아웃에 묶이며, 헤더별 인코딩 조각은
+레이아웃을 만들 때 한 번만 준비한다.
+"""
+
+from collections.abc import Mapping
+from functools import lru_cache
+from operator import itemgetter
+
+from row_hashing import get_scheme
+
+
+class HeaderLayout:
+    """정리된 헤더 목록과 원본 컬럼 위치 (모든 레코드가 공유)"""
+
+    __slots__ = ('headers', 'header_indices', 'positions', 'width', '_getter',
+                 'scheme', 'prepared')
+
+    def __init__(self, raw_headers, scheme=None):
+        headers = []
+        header_indices = []
+        seen = set()
+
+        for idx, header in enumerate(raw_headers):
+            # 빈 헤더는 건너뛰기
+            if not header or header.strip() == '':
+                continue
+
+            # 중복 헤더 처리 (번호 추가)
+            original_header = header.strip()
+            unique_header = original_header
+            counter = 1
+            while unique_header in seen:
+                unique_header = f"{original_header}_{counter}"
+                counter += 1
+
+            headers.append(unique_header)
+            header_indices.append(idx)
+            seen.add(unique_header)
+
+        self.headers = headers
+        self.header_indices = header_indices
+        self.positions = {header: pos for pos, header in enumerate(headers)}
+        self.width = header_indices[-1] + 1 if header_indices else 0
+
+        # 해시 방식 + 체크섬용 헤더 인코딩 조각
+        self.scheme = scheme or get_scheme()
+        self.prepared = self.scheme.prepare(headers)
+
+        if len(header_indices) == 1:
+            single = header_indices[0]
+            self._getter = lambda row: (row[single],)
+        elif header_indices:
+            self._getter = itemgetter(*header_indices)
+        else:
+            self._getter = lambda row: ()
+
+    def project(self, row):
+        """시트 행 -> 헤더 순서의 값 튜플 (짧은 행은 빈 문자열로 채움)"""
+        if len(row) < self.width:
+            row = list(row) + [""] * (self.width - len(row))
+        return self._getter(row)
+
+
+# 헤더 레이아웃 캐시
+@lru_cache(maxsize=32)
+def _cached_layout(raw_headers, scheme_name):
+    return HeaderLayout(raw_headers, get_scheme(scheme_name))
+
+
+def get_layout(raw_headers, scheme_name=None):
+    """원본 헤더 행으로 HeaderLayout 조회 (같은 헤더 행 + 해시 방식이면 캐시 재사용)"""
+    return _cached_layout(tuple(raw_headers), scheme_name or get_scheme().name)
+
+
+class SheetRecord(Mapping):
+    """한 행의 값 튜플 + 공유 레이아웃 (dict처럼 헤더 이름으로 조회)"""
+
+    __slots__ = ('layout', 'values_tuple', '_row_hash', '_checksum')
+
+    def __init__(self, layout, values):
+        self.layout = layout
+        self.values_tuple = values
+        self._row_hash = None
+        self._checksum = None
+
+    @property
+    def row_hash(self):
+        """행 고유 ID (부서명 + 용역명, 처음 조회할 때 한 번만 계산)"""
+        if self._row_hash is None:
+            self._row_hash = self.layout.scheme.row_hash(self.values_tuple)
+        return self._row_hash
+
+    @property
+    def checksum(self):
+        """행 내용 체크섬 (헤더 이름순, 처음 조회할 때 한 번만 계산)"""
+        if self._checksum is None:
+            layout = self.layout
+            self._checksum = layout.scheme.checksum(layout.prepared, self.values_tuple)
+        return self._checksum
+
+    def column_checksums(self):
+        """컬럼마다 값의 짧은 체크섬 -> 헤더 순서의 체크섬 목록"""
+        return list(map(self.layout.scheme.column_checksum, self.values_tuple))
+
+    def __getitem__(self, header):
+        return self.values_tuple[self.layout.positions[header]]
+
+    def get(self, header, default=None):
+        pos = self.layout.positions.get(header)
+        return default if pos is None else self.values_tuple[pos]
+
+    def __iter__(self):
+        return iter(self.layout.headers)
+
+    def __len__(self):
+        return len(self.values_tuple)
+
+    def __contains__(self, header):
+        return header in self.layout.positions
+
+    def items(self):
+        return zip(self.layout.headers, self.values_tuple)
+
+    def values(self):
+        return self.values_tuple
+
+    def __repr__(self):
+        return f"SheetRecord({dict(self.items())!r})"
+
+
+# 데이터 행 변환
+def build_records(rows, first_row, layout, required_index=None):
+    """시트 행 목록 -> (레코드 목록, 마지막 데이터 행 번호)
+
+    빈 행은 건너뛰고, required_index가 주어지면 그 위치(헤더 기준)의 값이
+    비어 있는 행도 건너뛴다. (예: 용역명 컬럼 = 1)
+    """
+    project = layout.project
+    check_required = required_index is not None and required_index < len(layout.headers)
+
+    records = []
+    last_row = None
+    for row_number, row in enumerate(rows, start=first_row):
+        if not any(cell.strip() for cell in row if cell):
+            continue
+
+        values = project(row)
+
+        if check_required and not values[required_index].strip():
+            continue
+
+        records.append(SheetRecord(layout, values))
+        last_row = row_number
+
+    return records, last_row
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Sheet Sources Module
+여러 시트 / 탭(소스)을 한 프로세스에서 동기화하기 위한 연결 공유 + 소스 설정
+
+- SheetConnector: Service Account 인증은 한 번만 하고, gspread client(HTTP 세션)와
+  열어 둔 스프레드시트 / 탭 목록을 모든 소스가 함께 쓴다.
+- prefetch: 같은 스프레드시트를 쓰는 소스들의 값을 values_batch_get 한 번으로 읽는다.
+- source_configs: config.json의 sources 목록을 소스별 설정(최상위 설정 + 소스 설정)으로 펼친다.
+- CachedWorksheet: sync_state에 캐시한 탭 이름 / ID로 값 범위만 요청한다.
+  (스프레드시트 / 탭 목록 메타데이터 조회 대신 탭 ID / 이름만 받는 요청 1번으로 캐시를 확인)
+"""
+
+import re
+import sys
+import threading
+from pathlib import Path
+from urllib.parse import quote
+
+from resilience import create_retry_policy
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets.readonly',
+    'https://www.googleapis.com/auth/drive.readonly'
+]
+
+# 소스 이름은 상태 / 보고서 파일 이름에 들어가므로 파일 이름에 쓸 수 있는 문자만 허용
+_SOURCE_NAME = re.compile(r"^[\w.-]+$")
+
+
+class SheetConnector:
+    """여러 소스가 공유하는 구글 시트 연결 (인증된 client 1개 + 스프레드시트 / 탭 캐시)"""
+
+    def __init__(self, config):
+        self.config = config
+        # 429 / 5xx / 연결 오류는 backoff 후 재시도
+        self.retry = create_retry_policy(config)
+        self.client = None
+        self.spreadsheets = {}
+        self.tabs = {}
+        self.tab_props = {}
+        self.lock = threading.Lock()
+
+    def authorize(self):
+        """Service Account로 인증 (처음 한 번만) -> gspread client"""
+        with self.lock:
+            if self.client is not None:
+                return self.client
+
+            # 시트에 연결할 때만 필요 (벤치마크 등 오프라인 실행에서는 설치되지 않아도 됨)
+            import gspread
+            from google.oauth2.service_account import Credentials
+
+            service_account_file = Path(__file__).parent / self.config['service_account_file']
+
+            if not service_account_file.exists():
+                print("❌ Service Account JSON 파일을 찾을 수 없습니다.")
+                print(f"   경로: {service_account_file}")
+                sys.exit(1)
+
+            creds = Credentials.from_service_account_file(
+                str(service_account_file),
+                scopes=SCOPES
+            )
+            self.client = gspread.authorize(creds)
+            return self.client
+
+    def spreadsheet(self, sheet_id):
+        """스프레드시트 열기 (같은 ID는 한 번만 요청)"""
+        client = self.authorize()
+        with self.lock:
+            if sheet_id not in self.spreadsheets:
+                self.spreadsheets[sheet_id] = self.retry.call(client.open_by_key, sheet_id)
+            return self.spreadsheets[sheet_id]
+
+    def worksheets(self, sheet_id):
+        """스프레드시트의 탭 목록 (같은 ID는 한 번만 요청)"""
+        spreadsheet = self.spreadsheet(sheet_id)
+        with self.lock:
+            if sheet_id not in self.tabs:
+                self.tabs[sheet_id] = self.retry.call(spreadsheet.worksheets)
+            return self.tabs[sheet_id]
+
+    def worksheet(self, config):
+        """설정(sheet_id / gid)의 탭 -> gspread Worksheet (gid가 없거나 찾지 못하면 첫 번째 탭)"""
+        if config.get('gid'):
+            for worksheet in self.worksheets(config['sheet_id']):
+                if str(worksheet.id) == str(config['gid']):
+                    return worksheet
+            print(f"⚠️  GID {config['gid']}를 찾을 수 없어서 첫 번째 시트를 사용합니다.")
+
+        return self.spreadsheet(config['sheet_id']).sheet1
+
+    def tab_properties(self, sheet_id):
+        """탭 (ID, 이름) 목록 (탭 순서) -> spreadsheets.get 요청 1번에 탭 속성만 받음 (같은 ID는 한 번만)"""
+        client = self.authorize()
+        with self.lock:
+            if sheet_id not in self.tab_props:
+                from gspread.urls import SPREADSHEET_URL
+                # gspread 6.x는 http_client, 5.x는 client 자체가 인증된 HTTP 세션으로 요청
+                request = getattr(client, 'http_client', client).request
+                response = self.retry.call(request, 'get', SPREADSHEET_URL % sheet_id,
+                                           params={'fields': 'sheets.properties(sheetId,title)'})
+                self.tab_props[sheet_id] = [(str(sheet['properties']['sheetId']), sheet['properties']['title'])
+                                            for sheet in response.json().get('sheets', [])]
+            return self.tab_props[sheet_id]
+
+    def tab(self, config):
+        """설정(sheet_id / gid)의 탭 (ID, 이름) (gid가 없으면 첫 번째 탭, gid의 탭이 없으면 None)"""
+        tabs = self.tab_properties(config['sheet_id'])
+        if config.get('gid'):
+            return next((tab for tab in tabs if tab[0] == str(config['gid'])), None)
+        return tabs[0] if tabs else None
+
+    def _tab_title(self, config):
+        # gid의 탭이 없으면 worksheet()처럼 경고 후 첫 번째 탭
+        tab = self.tab(config)
+        return tab[1] if tab is not None else self.worksheet(config).title
+
+    def cached_worksheet(self, config, cache):
+        """캐시가 설정(sheet_id / gid)과 맞고 캐시한 탭 ID가 지금도 그 탭이면 CachedWorksheet,
+        아니면 탭을 찾아 gspread Worksheet
+
+        탭 이름이 바뀌어도 ID로 확인하므로, 다른 탭이 예전 이름을 쓰게 되어도 그 탭을 읽지 않는다.
+        """
+        if cache_matches(cache, config):
+            tab = self.tab(config)
+            if tab is not None and tab[0] == str(cache['id']):
+                # 이름이 바뀌었으면 지금 이름으로 읽음
+                return CachedWorksheet(self, config, dict(cache, title=tab[1]))
+            print("⚠️  캐시한 탭이 설정의 탭과 달라 탭을 다시 찾습니다.")
+        return self.worksheet(config)
+
+    def modified_time(self, sheet_id):
+        """Drive files.get(fields=modifiedTime) 요청 1번 -> 스프레드시트 수정 시각 (스프레드시트 메타데이터를 읽지 않음)"""
+        client = self.authorize()
+        from gspread.urls import DRIVE_FILES_API_V3_URL
+        # gspread 6.x는 http_client, 5.x는 client 자체가 인증된 HTTP 세션으로 요청
+        request = getattr(client, 'http_client', client).request
+        response = self.retry.call(request, 'get', f"{DRIVE_FILES_API_V3_URL}/{sheet_id}",
+                                   params={'fields': 'modifiedTime', 'supportsAllDrives': True})
+        return response.json()['modifiedTime']
+
+    def values_get(self, sheet_id, cell_range):
+        """값 범위 요청 1번 -> 행 목록 (스프레드시트 메타데이터를 읽지 않음)"""
+        client = self.authorize()
+        http_client = getattr(client, 'http_client', None)
+        if http_client is not None:
+            # gspread 6.x
+            response = http_client.values_get(sheet_id, cell_range)
+        else:
+            # gspread 5.x
+            from gspread.urls import SPREADSHEET_VALUES_URL
+            response = client.request(
+                'get', SPREADSHEET_VALUES_URL % (sheet_id, quote(cell_range, safe=''))
+            ).json()
+        return response.get('values', [])
+
+    def values_batch_get(self, sheet_id, ranges):
+        """여러 값 범위를 요청 1번으로 -> [행 목록, ...] (스프레드시트 메타데이터를 읽지 않음)"""
+        client = self.authorize()
+        http_client = getattr(client, 'http_client', None)
+        if http_client is not None:
+            # gspread 6.x
+            response = http_client.values_batch_get(sheet_id, ranges)
+        else:
+            # gspread 5.x
+            from gspread.urls import SPREADSHEET_VALUES_BATCH_URL
+            response = client.request(
+                'get', SPREADSHEET_VALUES_BATCH_URL % sheet_id, params={'ranges': ranges}
+            ).json()
+        return [value_range.get('values', []) for value_range in response.get('valueRanges', [])]
+
+    def prefetch(self, configs):
+        """같은 스프레드시트를 쓰는 소스들의 값을 한 번에 읽기 -> {소스 이름: 시트 값}
+
+        스프레드시트마다 values_batch_get 요청 1번으로 모든 탭을 읽는다. 탭 이름은 소스들의 탭 캐시 확인과
+        같은 탭 속성 요청(tab_properties)으로 찾으므로, 스프레드시트 / 탭 목록 메타데이터는 조회하지 않는다.
+        소스가 하나뿐인 스프레드시트는 건너뛰고, 실패하면 경고만 출력한다.
+        (그 소스들은 각자 시트를 읽는다)
+        """
+        groups = {}
+        for config in configs:
+            groups.setdefault(config['sheet_id'], []).append(config)
+
+        prefetched = {}
+        for sheet_id, group in groups.items():
+            if len(group) < 2:
+                continue
+
+            try:
+                ranges = [a1_range(self._tab_title(config), config.get('fetch_columns')) for config in group]
+                values = self.retry.call(self.values_batch_get, sheet_id, ranges)
+            except Exception as e:
+                print(f"⚠️  일괄 읽기 실패 ({sheet_id}): {e} (소스별로 읽습니다)")
+                continue
+
+            for config, rows in zip(group, values):
+                prefetched[config['name']] = rows
+            print(f"📥 {sheet_id}: 탭 {len(group)}개를 한 번에 읽었습니다.")
+
+        return prefetched
+
+
+class CachedWorksheet:
+    """캐시한 탭 이름 / ID로 만든 worksheet (get / batch_get / get_all_values만 지원)
+
+    값 범위만 요청하므로 스프레드시트 / 탭 목록 메타데이터 조회가 없다.
+    탭 이름이 바뀌었거나 탭이 없어져 범위 요청이 실패하면 탭을 다시 찾아 그 탭으로 요청한다.
+    row_count는 캐시하지 않고 필요할 때 실제 탭에서 읽는다 (행이 늘었을 수 있으므로).
+    """
+
+    def __init__(self, connector, config, cache):
+        self.connector = connector
+        self.config = config
+        self.sheet_id = config['sheet_id']
+        self.title = cache['title']
+        self.id = cache['id']
+        self.resolved = None
+
+    def _resolve(self):
+        """메타데이터로 실제 탭 찾기 (캐시 무효화)"""
+        if self.resolved is None:
+            self.resolved = self.connector.worksheet(self.config)
+            self.title = self.resolved.title
+            self.id = self.resolved.id
+        return self.resolved
+
+    @property
+    def row_count(self):
+        return self._resolve().row_count
+
+    def _request(self, cached_call, resolved_call):
+        if self.resolved is None:
+            try:
+                return cached_call()
+            except Exception as e:
+                if not is_range_error(e):
+                    raise
+                print(f"⚠️  캐시한 탭 '{self.title}'을 읽지 못해 탭을 다시 찾습니다: {e}")
+                self._resolve()
+        return resolved_call()
+
+    def get(self, cell_range):
+        return self._request(
+            lambda: self.connector.values_get(self.sheet_id, a1_range(self.title, cell_range=cell_range)),
+            lambda: self.resolved.get(cell_range)
+        )
+
+    def batch_get(self, ranges):
+        return self._request(
+            lambda: self.connector.values_batch_get(
+                self.sheet_id, [a1_range(self.title, cell_range=cell_range) for cell_range in ranges]
+            ),
+            lambda: self.resolved.batch_get(ranges)
+        )
+
+    def get_all_values(self):
+        return self._request(
+            lambda: self.connector.values_get(self.sheet_id, a1_range(self.title)),
+            lambda: self.resolved.get_all_values()
+        )
+
+
+# 범위 오류 확인
+def is_range_error(error):
+    """탭 이름이 바뀌었거나 탭이 없어 범위를 해석하지 못한 오류인지 (400 / 404)"""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) in (400, 404)
+
+
+# 탭 캐시 확인
+def cache_matches(cache, config):
+    """sync_state의 탭 캐시가 설정의 sheet_id / gid와 같은지"""
+    return bool(cache) and cache.get('sheet_id') == config['sheet_id'] and \
+        str(cache.get('gid') or '') == str(config.get('gid') or '')
+
+
+# 탭 캐시
+def sheet_cache(config, worksheet, headers):
+    """sync_state에 저장할 탭 정보 (설정의 sheet_id / gid + 찾은 탭 이름 / ID + 헤더)"""
+    return {
+        'sheet_id': config['sheet_id'],
+        'gid': str(config.get('gid') or ''),
+        'title': worksheet.title,
+        'id': worksheet.id,
+        'headers': list(headers),
+    }
+
+
+# 탭 A1 범위
+def a1_range(title, columns=None, cell_range=None):
+    """탭 이름 + 컬럼 범위 -> "'탭'!A1:Z" (cell_range가 주어지면 "'탭'!범위", 둘 다 없으면 탭 전체)"""
+    sheet = "'" + title.replace("'", "''") + "'"
+    if cell_range:
+        return f"{sheet}!{cell_range}"
+    if columns:
+        first_col, last_col = columns.split(':')
+        return f"{sheet}!{first_col}1:{last_col}"
+    return sheet
+
+
+# 소스별 설정
+def source_configs(config):
+    """config.json의 sources 목록 -> 소스별 설정 목록 (sources가 없으면 None)
+
+    각 소스는 최상위 설정을 이어받고 자기 키(sheet_id / gid / fetch_columns 등)로 덮어쓴다.
+    tags는 최상위 tags 뒤에 소스 tags와 소스 이름을 붙여, 소스마다 문서를 구분할 수 있게 한다.
+    """
+    sources = config.get('sources')
+    if not sources:
+        return None
+
+    base = {key: value for key, value in config.items() if key != 'sources'}
+    names = set()
+    result = []
+
+    for source in sources:
+        name = source.get('name')
+        if not name or not _SOURCE_NAME.match(name):
+            print(f"❌ 소스 이름이 없거나 파일 이름에 쓸 수 없습니다: {name!r}")
+            sys.exit(1)
+        if name in names:
+            print(f"❌ 소스 이름이 중복되었습니다: {name}")
+            sys.exit(1)
+        names.add(name)
+
+        merged = dict(base)
+        merged.update(source)
+        if not merged.get('sheet_id'):
+            print(f"❌ 소스 '{name}'에 sheet_id가 없습니다.")
+            sys.exit(1)
+        merged['tags'] = base.get('tags', []) + source.get('tags', []) + [name]
+        merged['source_tag'] = name
+        result.append(merged)
+
+    return result
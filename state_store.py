@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Sync State Store Module
+동기화 상태 저장소 (json: sync_state.json + 추가 전용 journal / sqlite: sync_state.db)
+
+json: 적용된 변경은 journal에 한 줄씩 즉시 기록(fsync)하고, journal이 상태 행 수
+      (최소 compact_every줄)만큼 쌓였을 때와 실행 종료 시 sync_state.json으로 압축(compaction)한다.
+      압축 한 번의 비용이 그동안 쌓인 journal 줄 수를 넘지 않으므로 첫 동기화도 행 수에 비례한다.
+      실행이 중간에 중단되어도 다음 실행은 journal을 재생하여
+      이미 생성된 문서 ID를 그대로 이어받는다.
+sqlite: 행 상태를 인덱스가 있는 테이블에 두고 변경된 행만 트랜잭션으로 기록한다.
+        전체 synced_rows를 메모리에 올리지 않고 행 해시로 조회한다.
+        커밋은 WAL 파일(sync_state.db-wal)에 먼저 쌓이므로, 중단된 실행의 상태를 옮길 때는
+        .db-wal도 함께 옮겨야 한다. (정상 종료 시에는 close에서 .db로 합치고 WAL을 비움)
+
+사용법 (기존 JSON 상태를 SQLite로 옮기기):
+    python state_store.py migrate [sync_state.json] [sync_state.db]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from collections.abc import MutableMapping
+from pathlib import Path
+
+DEFAULT_COMPACT_EVERY = 100
+
+
+# 빈 동기화 상태
+def empty_state():
+    """첫 동기화용 빈 상태"""
+    return {
+        "last_sync": None,
+        "synced_rows": {},
+        "total_rows": 0
+    }
+
+
+# 상태 파일 원자적 저장
+def write_json_atomic(path, data):
+    """임시 파일에 쓴 뒤 교체하여 중간에 중단되어도 기존 파일이 깨지지 않게 저장"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+
+class JsonStateStore:
+    """sync_state.json + journal 기반 상태 저장소"""
+
+    def __init__(self, state_path, journal_path=None, compact_every=DEFAULT_COMPACT_EVERY):
+        self.state_path = Path(state_path)
+        self.journal_path = Path(journal_path) if journal_path else \
+            self.state_path.with_suffix('.journal')
+        self.compact_every = compact_every
+        self.state = None
+        self.pending = 0
+        self.recovered = 0
+        self._journal = None
+
+    def load(self):
+        """sync_state.json을 읽고 남아 있는 journal을 재생 -> 상태"""
+        if self.state_path.exists():
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        else:
+            self.state = empty_state()
+
+        self.recovered = self._replay()
+        self.pending = self.recovered
+        return self.state
+
+    def _replay(self):
+        if not self.journal_path.exists():
+            return 0
+
+        count = 0
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 기록 중 중단된 마지막 줄은 무시
+                    break
+                self._apply(entry)
+                count += 1
+        return count
+
+    def _apply(self, entry):
+        rows = self.state['synced_rows']
+        if entry['op'] == 'put':
+            rows[entry['hash']] = entry['row']
+        elif entry['op'] == 'del':
+            rows.pop(entry['hash'], None)
+        elif entry['op'] == 'rekey':
+            rows.pop(entry['old'], None)
+            rows[entry['hash']] = entry['row']
+        elif entry['op'] == 'clear':
+            rows.clear()
+
+    def _append(self, *entries):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+        # 여러 줄을 한 번에 쓰고 fsync는 한 번만
+        self._journal.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+        for entry in entries:
+            self._apply(entry)
+        self.pending += len(entries)
+        # 상태 전체를 다시 쓰므로 journal이 상태 크기만큼 쌓였을 때만 압축 (중단되어도 journal 재생으로 복구)
+        if self.compact_every and self.pending >= max(self.compact_every, len(self.state['synced_rows'])):
+            self.compact()
+
+    def put_row(self, row_hash, row):
+        """행 상태 저장 (journal에 즉시 기록)"""
+        self._append({'op': 'put', 'hash': row_hash, 'row': row})
+
+    def delete_row(self, row_hash):
+        """행 상태 삭제 (journal에 즉시 기록)"""
+        self._append({'op': 'del', 'hash': row_hash})
+
+    def put_rows(self, rows):
+        """(행 해시, 행 상태) 목록 저장 (journal에 한 번에 기록)"""
+        entries = [{'op': 'put', 'hash': row_hash, 'row': row} for row_hash, row in rows]
+        if entries:
+            self._append(*entries)
+
+    def clear_rows(self):
+        """모든 행 상태 삭제 (sbdb 문서 목록으로 다시 만들 때)"""
+        self._append({'op': 'clear'})
+
+    def rekey_rows(self, moves):
+        """(이전 해시, 새 해시, 행 상태) 목록을 새 키로 옮기기 (해시 방식 마이그레이션)"""
+        self._append(*({'op': 'rekey', 'old': old_hash, 'hash': new_hash, 'row': row}
+                       for old_hash, new_hash, row in moves))
+
+    def compact(self):
+        """현재 상태를 sync_state.json에 원자적으로 쓰고 journal 비우기"""
+        write_json_atomic(self.state_path, self.state)
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+
+        self.pending = 0
+
+    def save(self):
+        """실행 종료 시 상태 저장"""
+        self.compact()
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+class SqliteRowMap(MutableMapping):
+    """synced_rows를 SQLite 테이블로 제공하는 dict 호환 매핑 (행 해시로 조회)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getitem__(self, row_hash):
+        found = self.conn.execute(
+            "SELECT data FROM rows WHERE hash = ?", (row_hash,)
+        ).fetchone()
+        if found is None:
+            raise KeyError(row_hash)
+        return json.loads(found[0])
+
+    def __contains__(self, row_hash):
+        return self.conn.execute(
+            "SELECT 1 FROM rows WHERE hash = ?", (row_hash,)
+        ).fetchone() is not None
+
+    def __setitem__(self, row_hash, row):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO rows (hash, doc_id, checksum, data) VALUES (?, ?, ?, ?)",
+            (row_hash, row.get('doc_id'), row.get('checksum'), json.dumps(row, ensure_ascii=False))
+        )
+
+    def __delitem__(self, row_hash):
+        cursor = self.conn.execute("DELETE FROM rows WHERE hash = ?", (row_hash,))
+        if cursor.rowcount == 0:
+            raise KeyError(row_hash)
+
+    def __iter__(self):
+        for (row_hash,) in self.conn.execute("SELECT hash FROM rows"):
+            yield row_hash
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def items(self):
+        for row_hash, data in self.conn.execute("SELECT hash, data FROM rows"):
+            yield row_hash, json.loads(data)
+
+    def find_by_doc_id(self, doc_id):
+        """문서 ID로 행 조회 -> (행 해시, 행 상태) 또는 None"""
+        found = self.conn.execute(
+            "SELECT hash, data FROM rows WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        return (found[0], json.loads(found[1])) if found else None
+
+
+class SqliteStateStore:
+    """SQLite 기반 상태 저장소 (변경된 행만 기록)
+
+    read_only면 파일을 읽기 전용으로 열고(파일이 없으면 빈 메모리 DB) 테이블 생성 / WAL 체크포인트를 하지 않는다.
+    (--plan처럼 상태를 바꾸지 않는 실행용)
+    """
+
+    def __init__(self, db_path, read_only=False):
+        self.db_path = Path(db_path)
+        self.read_only = read_only
+        self.state = None
+        self.recovered = 0
+        if not read_only:
+            self.conn = sqlite3.connect(str(self.db_path))
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+        elif self.db_path.exists():
+            self.conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            # 상태 파일이 없으면 빈 상태 (파일을 만들지 않음)
+            self.conn = sqlite3.connect(":memory:")
+            self._create_tables()
+
+    def _create_tables(self):
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                hash TEXT PRIMARY KEY,
+                doc_id TEXT,
+                checksum TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_rows_doc_id ON rows (doc_id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self.conn.commit()
+
+    def load(self):
+        """메타 정보만 읽고 synced_rows는 SQLite 매핑으로 연결 -> 상태"""
+        self.state = empty_state()
+        for key, value in self.conn.execute("SELECT key, value FROM meta"):
+            self.state[key] = json.loads(value)
+        self.state['synced_rows'] = SqliteRowMap(self.conn)
+        return self.state
+
+    def put_row(self, row_hash, row):
+        """행 상태 저장 (즉시 커밋)"""
+        with self.conn:
+            self.state['synced_rows'][row_hash] = row
+
+    def delete_row(self, row_hash):
+        """행 상태 삭제 (즉시 커밋)"""
+        with self.conn:
+            self.state['synced_rows'].pop(row_hash, None)
+
+    def put_rows(self, rows):
+        """(행 해시, 행 상태) 목록을 한 트랜잭션으로 저장"""
+        self.import_rows(rows)
+
+    def clear_rows(self):
+        """모든 행 상태 삭제 (sbdb 문서 목록으로 다시 만들 때)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM rows")
+
+    def rekey_rows(self, moves):
+        """(이전 해시, 새 해시, 행 상태) 목록을 한 트랜잭션으로 새 키로 옮기기"""
+        rows = self.state['synced_rows']
+        with self.conn:
+            for old_hash, new_hash, row in moves:
+                rows.pop(old_hash, None)
+                rows[new_hash] = row
+
+    def import_rows(self, rows):
+        """여러 행을 한 트랜잭션으로 저장"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rows (hash, doc_id, checksum, data) VALUES (?, ?, ?, ?)",
+                ((row_hash, row.get('doc_id'), row.get('checksum'), json.dumps(row, ensure_ascii=False))
+                 for row_hash, row in rows)
+            )
+
+    def compact(self):
+        pass
+
+    def save(self):
+        """메타 정보(last_sync 등) 저장"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                ((key, json.dumps(value, ensure_ascii=False))
+                 for key, value in self.state.items() if key != 'synced_rows')
+            )
+
+    def close(self):
+        """WAL의 커밋을 .db로 합친 뒤 닫기 (.db 파일만으로 완전한 상태, read_only면 그냥 닫기)"""
+        if not self.read_only:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
+
+
+STATE_BACKENDS = ('json', 'sqlite')
+
+
+# JSON 상태 -> SQLite 마이그레이션
+def migrate_json_to_sqlite(json_path, db_path):
+    """sync_state.json(+journal)을 SQLite 상태 저장소로 가져오기 -> 가져온 행 수"""
+    source = JsonStateStore(json_path, compact_every=0)
+    state = source.load()
+    source.close()
+
+    target = SqliteStateStore(db_path)
+    target.load()
+    target.import_rows(state['synced_rows'].items())
+    for key, value in state.items():
+        if key != 'synced_rows':
+            target.state[key] = value
+    target.save()
+    target.close()
+
+    return len(state['synced_rows'])
+
+
+def main():
+    base_dir = Path(__file__).parent
+    args = sys.argv[1:]
+
+    if not args or args[0] != 'migrate':
+        print("사용법: python state_store.py migrate [sync_state.json] [sync_state.db]")
+        sys.exit(1)
+
+    json_path = Path(args[1]) if len(args) > 1 else base_dir / "sync_state.json"
+    db_path = Path(args[2]) if len(args) > 2 else base_dir / "sync_state.db"
+
+    if not json_path.exists():
+        print(f"❌ 상태 파일을 찾을 수 없습니다: {json_path}")
+        sys.exit(1)
+
+    count = migrate_json_to_sqlite(json_path, db_path)
+    print(f"✅ {count}개 행을 {db_path}로 가져왔습니다.")
+
+
+if __name__ == "__main__":
+    main()
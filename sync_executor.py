@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Sync Executor Module
+변경 사항을 제한된 worker pool에서 병렬 처리 (행 단위 순서 보장 + 속도 제한)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class RateLimiter:
+    """초당 호출 수 제한 (token bucket, 여러 worker가 공유)"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 1개를 얻을 때까지 대기"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+# 같은 키의 작업을 순서대로 실행
+def _run_chain(chain, rate_limiter):
+    results = []
+    for task, func in chain:
+        if rate_limiter:
+            rate_limiter.acquire()
+        try:
+            results.append((task, func()))
+        except Exception as e:
+            results.append((task, e))
+    return results
+
+
+# 키 단위 순서를 지키며 병렬 실행
+def run_keyed_tasks(tasks, workers=1, rate_limiter=None):
+    """(key, task, func) 목록을 실행하고 (task, 결과)를 완료 순서대로 반환
+
+    같은 key(행 해시)의 작업은 제출 순서대로 하나의 worker에서 실행되고,
+    서로 다른 key는 최대 workers개까지 동시에 실행된다.
+    func에서 발생한 예외는 결과 자리에 예외 객체로 전달된다.
+    결과는 호출한 스레드에서만 소비하므로 상태 병합에 별도 잠금이 필요 없다.
+    """
+    chains = {}
+    for key, task, func in tasks:
+        chains.setdefault(key, []).append((task, func))
+
+    if workers <= 1:
+        for chain in chains.values():
+            yield from _run_chain(chain, rate_limiter)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_chain, chain, rate_limiter)
+                   for chain in chains.values()]
+        for future in as_completed(futures):
+            yield from future.result()
@@ -4,16 +4,29 @@ Google Sheets to sbdb Incremental Sync Script
 구글 시트 데이터를 증분 업데이트로 sbdb에 저장하는 스크립트
 """
 
-import gspread
-from google.oauth2.service_account import Credentials
-import subprocess
+import argparse
 import json
 import sys
 import io
 import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 
+from document_render import CATEGORY_TAG, build_document, build_title, render_item
+from embedding import DEFAULT_BATCH_SIZE, create_embedder, embed_contents
+from reconcile import DocumentIndex, matched_row, orphan_rows
+from resilience import create_retry_policy
+from run_metrics import REPORT_FILE, RunMetrics, maybe_span
+from sheet_sources import CachedWorksheet, SheetConnector, cache_matches, sheet_cache, source_configs
+from sbdb_sink import DEFAULT_DELETE_BATCH_SIZE, DEFAULT_UPSERT_BATCH_SIZE, SINK_BACKENDS, create_sink
+from row_hashing import LEGACY_SCHEME, get_scheme, migrate_state_hashes
+from sheet_records import SheetRecord, build_records, get_layout
+from state_store import DEFAULT_COMPACT_EVERY, STATE_BACKENDS, JsonStateStore, SqliteStateStore, write_json_atomic
+from sync_plan import PLAN_FILE, SyncPlan, estimate_plan, plan_report, plan_warnings, print_plan
+from sync_executor import RateLimiter, run_keyed_tasks
+
 # Windows console UTF-8 encoding fix
 if sys.platform == 'win32':
     try:
@@ -35,32 +48,38 @@ def load_config():
     with open(config_path, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-# 동기화 상태 로드
-def load_sync_state():
-    """sync_state.json에서 이전 동기화 상태 읽기"""
-    state_path = Path(__file__).parent / "sync_state.json"
+# 동기화 상태 저장소 열기
+def open_state_store(config, backend=None, namespace=None, read_only=False):
+    """설정(state_backend)에 맞는 상태 저장소 생성 (json: sync_state.json + journal, sqlite: sync_state.db)
 
-    if not state_path.exists():
-        return {
-            "last_sync": None,
-            "synced_rows": {},
-            "total_rows": 0
-        }
+    namespace가 주어지면 소스별 파일(sync_state.<namespace>.json / .db)을 쓴다.
+    read_only면 SQLite 파일을 만들거나 바꾸지 않는다. (json은 읽기만 해서는 파일을 쓰지 않음)
+    """
+    backend = backend or config.get('state_backend', 'json')
+    name = f"sync_state.{namespace}" if namespace else "sync_state"
 
-    with open(state_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    if backend == 'sqlite':
+        return SqliteStateStore(Path(__file__).parent / f"{name}.db", read_only=read_only)
 
-# 동기화 상태 저장
-def save_sync_state(state):
-    """sync_state.json에 동기화 상태 저장"""
-    state_path = Path(__file__).parent / "sync_state.json"
+    state_path = Path(__file__).parent / f"{name}.json"
+    return JsonStateStore(state_path, compact_every=config.get('state_compact_every', DEFAULT_COMPACT_EVERY))
 
-    with open(state_path, 'w', encoding='utf-8') as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+# 실행 보고서 경로
+def report_path_for(store, filename=REPORT_FILE):
+    """상태 파일과 같은 폴더의 sync_report.json (소스별 상태면 sync_report.<소스>.json)"""
+    state_path = Path(getattr(store, 'state_path', None) or store.db_path)
+    namespace = state_path.stem.partition('.')[2]
+    if not namespace:
+        return state_path.parent / filename
+    report = Path(filename)
+    return state_path.parent / f"{report.stem}.{namespace}{report.suffix}"
 
 # 행 해시 생성 (고유 ID)
 def generate_row_hash(row, headers):
-    """행의 고유 ID 생성 (부서명 + 용역명)"""
+    """행의 고유 ID 생성 (부서명 + 용역명, SheetRecord는 레이아웃의 해시 방식 / dict는 기존 md5)"""
+    if isinstance(row, SheetRecord):
+        return row.row_hash
+
     # 첫 두 컬럼(부서명, 용역명)으로 고유 ID 생성
     if len(headers) >= 2:
         key = f"{row.get(headers[0], '')}-{row.get(headers[1], '')}"
@@ -72,105 +91,161 @@ def generate_row_hash(row, headers):
 
 # 체크섬 생성 (내용 변경 감지)
 def generate_checksum(row):
-    """행 내용의 체크섬 생성"""
+    """행 내용의 체크섬 생성 (SheetRecord는 레이아웃의 해시 방식 / dict는 기존 md5)"""
+    if isinstance(row, SheetRecord):
+        return row.checksum
+
     content = json.dumps(row, sort_keys=True, ensure_ascii=False)
     return hashlib.md5(content.encode('utf-8')).hexdigest()
 
-# 구글 시트 연결
-def connect_to_sheet(config):
-    """Service Account로 구글 시트에 연결"""
-    service_account_file = Path(__file__).parent / config['service_account_file']
+# 컬럼별 체크섬 생성 (변경된 컬럼 확인)
+def generate_column_checksums(row):
+    """컬럼마다 값의 짧은 체크섬 생성 -> 헤더 순서의 체크섬 목록 (컬럼 이름은 저장하지 않음)"""
+    if isinstance(row, SheetRecord):
+        return row.column_checksums()
+
+    return [hashlib.md5(str(value).encode('utf-8')).hexdigest()[:12] for value in row.values()]
+
+# 변경된 컬럼 목록
+def diff_columns(old_checksums, new_checksums, headers, previous_headers=None):
+    """이전/현재 컬럼 체크섬 비교 -> 값이 바뀐 컬럼 목록 (알 수 없으면 None)
+
+    체크섬 목록은 헤더 순서이므로 위치로 비교하고 이름은 headers에서 붙인다.
+    previous_headers(체크섬을 저장할 때의 헤더)가 없거나 지금 헤더와 다르면 (이름 변경 / 순서 변경 /
+    컬럼 추가·삭제) 위치가 같은 컬럼끼리 비교할 수 없고 문서의 컬럼 이름도 바뀌므로 알 수 없다.
+    이전 형식({컬럼명: 체크섬})의 상태는 이름으로 비교한다.
+    """
+    if isinstance(old_checksums, dict):
+        new_checksums = dict(zip(headers, new_checksums))
+        columns = set(old_checksums) | set(new_checksums)
+        return sorted(c for c in columns if old_checksums.get(c) != new_checksums.get(c))
+
+    if previous_headers is None or list(previous_headers) != list(headers):
+        return None
+    if len(old_checksums) != len(new_checksums):
+        return None
+    return [header for header, old, new in zip(headers, old_checksums, new_checksums) if old != new]
 
-    if not service_account_file.exists():
-        print(f"❌ Service Account JSON 파일을 찾을 수 없습니다.")
-        print(f"   경로: {service_account_file}")
-        sys.exit(1)
-
-    scopes = [
-        'https://www.googleapis.com/auth/spreadsheets.readonly',
-        'https://www.googleapis.com/auth/drive.readonly'
-    ]
+# 구글 시트 연결
+def connect_to_sheet(config, connector=None, cache=None):
+    """Service Account로 구글 시트에 연결 (connector가 주어지면 인증 / 스프레드시트를 공유)
 
+    cache: sync_state에 저장한 탭 정보. 설정과 맞으면 탭 목록 조회 없이 캐시한 탭 이름으로 읽는다.
+    """
     try:
-        creds = Credentials.from_service_account_file(
-            str(service_account_file),
-            scopes=scopes
-        )
-
-        client = gspread.authorize(creds)
-        spreadsheet = client.open_by_key(config['sheet_id'])
-
-        if 'gid' in config and config['gid']:
-            for worksheet in spreadsheet.worksheets():
-                if str(worksheet.id) == str(config['gid']):
-                    return worksheet
-            print(f"⚠️  GID {config['gid']}를 찾을 수 없어서 첫 번째 시트를 사용합니다.")
-
-        return spreadsheet.sheet1
+        return (connector or SheetConnector(config)).cached_worksheet(config, cache)
 
     except Exception as e:
         print(f"❌ 구글 시트 연결 실패: {e}")
         sys.exit(1)
 
-# 데이터 추출
-def fetch_sheet_data(worksheet):
-    """구글 시트에서 데이터 추출"""
+# 시트 수정 시각 조회
+def get_sheet_modified_time(connector, sheet_id):
+    """Drive의 스프레드시트 modifiedTime 조회 (files.get 1번, 실패하면 None)"""
     try:
-        all_values = worksheet.get_all_values()
+        return connector.modified_time(sheet_id)
+    except Exception as e:
+        print(f"⚠️  시트 수정 시각 조회 실패: {e}")
+        return None
+
+# A1 범위 생성
+def sheet_range(worksheet, columns, first_row, last_row=None):
+    """컬럼 범위(예: "A:Z")와 행 번호로 A1 표기 범위 생성"""
+    if columns:
+        first_col, last_col = columns.split(':')
+        return f"{first_col}{first_row}:{last_col}{last_row or ''}"
+    return f"{first_row}:{last_row or worksheet.row_count}"
+
+# 시트 API 호출
+def read_sheet(retry, func, *args):
+    """시트 읽기 호출 (retry가 있으면 429/5xx/연결 오류에서 backoff 후 재시도)"""
+    return retry.call(func, *args) if retry else func(*args)
 
-        if not all_values or len(all_values) < 3:
-            print("⚠️  데이터가 충분하지 않습니다.")
-            return [], []
+# 데이터 추출
+def fetch_sheet_data(worksheet, columns=None, start_row=None, required_index=1, hash_scheme=None,
+                     retry=None, metrics=None, prefetched=None):
+    """구글 시트에서 데이터 추출 -> (행 목록, 헤더, 마지막 데이터 행 번호)
+
+    columns: 가져올 컬럼 범위 (예: "A:Z", 없으면 전체 컬럼)
+    start_row: 이 시트 행부터만 가져오기 (없으면 전체 행)
+    required_index: 이 컬럼(헤더 기준 위치)이 비어 있는 행은 건너뜀 (기본: 용역명)
+    hash_scheme: 레코드의 행 해시/체크섬 방식 이름 (없으면 기본값)
+    retry: 시트 읽기 재시도 정책 (없으면 재시도 안 함)
+    metrics: 행 변환 시간을 parse 단계로 기록할 RunMetrics (선택)
+    prefetched: 여러 소스를 한 번에 읽어 둔 시트 값 (주어지면 시트를 다시 읽지 않음)
+    """
+    try:
+        if start_row:
+            # 헤더 행 + start_row 이후 행만 요청 (batch_get 한 번)
+            header_rows, data_rows = read_sheet(retry, worksheet.batch_get, [
+                sheet_range(worksheet, columns, 2, 2),
+                sheet_range(worksheet, columns, start_row),
+            ])
+            raw_headers = (header_rows or [[]])[0]
+            first_row = start_row
+        else:
+            if prefetched is not None:
+                all_values = prefetched
+            elif columns:
+                all_values = read_sheet(retry, worksheet.get, sheet_range(worksheet, columns, 1))
+            else:
+                all_values = read_sheet(retry, worksheet.get_all_values)
 
-        # 두 번째 행을 헤더로 사용
-        raw_headers = all_values[1]
+            if not all_values or len(all_values) < 3:
+                print("⚠️  데이터가 충분하지 않습니다.")
+                return [], [], None
 
-        # 빈 헤더 처리
-        headers = []
-        header_indices = []
-        seen = set()
+            # 두 번째 행을 헤더로 사용
+            raw_headers = all_values[1]
+            data_rows = all_values[2:]
+            first_row = 3
 
-        for idx, header in enumerate(raw_headers):
-            if not header or header.strip() == '':
-                continue
+        with maybe_span(metrics, 'parse'):
+            layout = get_layout(raw_headers, hash_scheme)
+            headers = layout.headers
+            all_records, last_row = build_records(data_rows, first_row, layout, required_index)
 
-            original_header = header.strip()
-            unique_header = original_header
-            counter = 1
-            while unique_header in seen:
-                unique_header = f"{original_header}_{counter}"
-                counter += 1
-
-            headers.append(unique_header)
-            header_indices.append(idx)
-            seen.add(unique_header)
-
-        # 데이터 행 변환
-        all_records = []
-        for row in all_values[2:]:
-            if not any(cell.strip() for cell in row if cell):
-                continue
+        if start_row:
+            print(f"📊 {start_row}행 이후 데이터: {len(all_records)}개 행")
+        else:
+            print(f"📊 전체 데이터: {len(all_records)}개 행")
+        print(f"📋 컬럼 ({len(headers)}개): {', '.join(headers[:5])}" +
+              (f", ..." if len(headers) > 5 else ""))
 
-            record = {}
-            for header, idx in zip(headers, header_indices):
-                if idx < len(row):
-                    record[header] = row[idx]
-                else:
-                    record[header] = ""
+        return all_records, headers, last_row
 
-            # 용역명(두 번째 컬럼)이 비어있으면 건너뛰기
-            if len(headers) > 1:
-                project_name = record.get(headers[1], "").strip()
-                if not project_name:
-                    continue
+    except Exception as e:
+        print(f"❌ 데이터 추출 실패: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
 
-            all_records.append(record)
+# 청크 단위 데이터 추출
+def iter_sheet_chunks(worksheet, columns, start_row, chunk_size, required_index=1, hash_scheme=None,
+                      retry=None, metrics=None):
+    """시트를 chunk_size행씩 나누어 읽으며 (행 목록, 헤더, 마지막 데이터 행 번호)를 차례로 반환
 
-        print(f"📊 전체 데이터: {len(all_records)}개 행")
+    한 번에 한 청크만 메모리에 두므로 시트 크기와 관계없이 메모리 사용량이 일정하고,
+    첫 청크를 처리하는 동안 나머지 행은 아직 읽지 않은 상태다.
+    """
+    try:
+        raw_headers = (read_sheet(retry, worksheet.get, sheet_range(worksheet, columns, 2, 2)) or [[]])[0]
+        layout = get_layout(raw_headers, hash_scheme)
+        headers = layout.headers
         print(f"📋 컬럼 ({len(headers)}개): {', '.join(headers[:5])}" +
               (f", ..." if len(headers) > 5 else ""))
 
-        return all_records, headers
+        total_rows = worksheet.row_count
+        row = start_row
+        while row <= total_rows:
+            end = min(row + chunk_size - 1, total_rows)
+            values = read_sheet(retry, worksheet.get, sheet_range(worksheet, columns, row, end))
+            with maybe_span(metrics, 'parse'):
+                records, last_row = build_records(values, row, layout, required_index)
+            print(f"📦 {row}~{end}행: {len(records)}개 행")
+
+            yield records, headers, last_row
+            row = end + 1
 
     except Exception as e:
         print(f"❌ 데이터 추출 실패: {e}")
@@ -179,229 +254,520 @@ def fetch_sheet_data(worksheet):
         sys.exit(1)
 
 # 변경 사항 감지
-def detect_changes(current_data, headers, sync_state):
-    """현재 데이터와 이전 상태 비교하여 변경 사항 감지"""
+def detect_changes(current_data, headers, sync_state, embedding_columns=None,
+                   index_offset=0, detect_deletes=True, seen_hashes=None):
+    """현재 데이터와 이전 상태 비교하여 변경 사항 감지
+
+    embedding_columns가 주어지면, 그 컬럼들이 바뀌지 않은 수정 행은
+    임베딩을 다시 만들지 않도록 reembed=False로 표시한다.
+    (이전 상태에 컬럼 체크섬이 없거나 헤더가 지난 실행(sheet_cache)과 달라졌으면 변경 컬럼을 알 수 없으므로 항상 재생성)
+    delta 추출이나 청크 처리처럼 시트 일부만 읽은 경우 index_offset으로 행 번호를 맞추고
+    detect_deletes=False로 삭제 감지를 건너뛴다. seen_hashes가 주어지면 현재 행 해시를
+    여기에 모아 두었다가 마지막에 find_deleted_rows로 삭제를 감지한다.
+    """
     changes = {
         'new': [],       # 새로 추가된 행
         'updated': [],   # 내용이 변경된 행
         'deleted': [],   # 삭제된 행
-        'unchanged': 0   # 변경 없는 행
+        'unchanged': 0,  # 변경 없는 행
+        'same_render': []  # 체크섬은 바뀌었지만 문서가 같은 행 (render_changes가 채움)
     }
 
-    current_hashes = set()
+    current_hashes = seen_hashes if seen_hashes is not None else set()
+    # 지난 실행의 헤더 (컬럼 체크섬 목록의 위치별 컬럼 이름)
+    previous_headers = (sync_state.get('sheet_cache') or {}).get('headers')
 
-    for idx, row in enumerate(current_data):
+    for idx, row in enumerate(current_data, start=index_offset):
         row_hash = generate_row_hash(row, headers)
         checksum = generate_checksum(row)
         current_hashes.add(row_hash)
 
-        if row_hash not in sync_state['synced_rows']:
+        old_row = sync_state['synced_rows'].get(row_hash)
+
+        if old_row is None:
             # 새 행
             changes['new'].append({
                 'index': idx + 1,
                 'hash': row_hash,
                 'checksum': checksum,
-                'data': row
+                'column_checksums': generate_column_checksums(row),
+                'data': row,
+                'reembed': True
             })
         else:
             # 기존 행 - 내용 변경 확인
-            old_checksum = sync_state['synced_rows'][row_hash]['checksum']
-            if checksum != old_checksum:
+            if checksum != old_row['checksum']:
+                column_checksums = generate_column_checksums(row)
+
+                if 'column_checksums' in old_row:
+                    changed_columns = diff_columns(old_row['column_checksums'], column_checksums, headers,
+                                                   previous_headers)
+                else:
+                    changed_columns = None
+                reembed = (changed_columns is None or embedding_columns is None or
+                           any(c in embedding_columns for c in changed_columns))
+
                 changes['updated'].append({
                     'index': idx + 1,
                     'hash': row_hash,
                     'checksum': checksum,
+                    'column_checksums': column_checksums,
+                    'changed_columns': changed_columns,
                     'data': row,
-                    'doc_id': sync_state['synced_rows'][row_hash]['doc_id']
+                    'doc_id': old_row['doc_id'],
+                    'previous_render': old_row.get('render_hash'),
+                    'reembed': reembed
                 })
             else:
                 changes['unchanged'] += 1
 
     # 삭제된 행 감지
+    if detect_deletes:
+        changes['deleted'] = find_deleted_rows(sync_state, current_hashes)
+
+    return changes
+
+# 삭제된 행 감지
+def find_deleted_rows(sync_state, current_hashes):
+    """이전 상태에는 있지만 현재 시트에 없는 행 목록"""
+    deleted = []
     for old_hash, old_data in sync_state['synced_rows'].items():
         if old_hash not in current_hashes:
-            changes['deleted'].append({
+            deleted.append({
                 'hash': old_hash,
                 'title': old_data['title'],
                 'doc_id': old_data['doc_id']
             })
+    return deleted
 
-    return changes
+# 문서 렌더링
+def render_changes(changes, headers):
+    """새/수정 행의 문서를 한 번씩 렌더링하고, 렌더링 결과가 지난번 저장한 문서와 같은
+    수정 행은 changes['same_render']로 옮기기 (sbdb에 쓰지 않고 상태만 갱신)"""
+    for item in changes['new']:
+        render_item(item, headers)
+
+    updated = []
+    for item in changes['updated']:
+        render_item(item, headers)
+        if item['render_hash'] == item.get('previous_render'):
+            changes['same_render'].append(item)
+        else:
+            updated.append(item)
+    changes['updated'] = updated
+
+# 문서가 같은 행 기록
+def record_same_renders(changes, headers, store):
+    """문서가 그대로인 수정 행의 체크섬만 상태에 기록 (sbdb 호출 없음)"""
+    rows = []
+    for item in changes['same_render']:
+        row = dict(store.state['synced_rows'][item['hash']])
+        row['row_number'] = item['index']
+        row['checksum'] = item['checksum']
+        row['column_checksums'] = item['column_checksums']
+        rows.append((item['hash'], row))
+        update_retry_queue(store.state, 'updated', item, None)
+    store.put_rows(rows)
+
+# 상태 파일용 행 제목
+def state_title(row_data, headers, index):
+    """synced_rows에 기록하는 짧은 제목 (첫 번째 컬럼 + 행 번호)"""
+    title_field = headers[0] if headers else "항목"
+    return f"{row_data.get(title_field, '항목')} - #{index}"
+
+# 문서 metadata
+def row_metadata(item):
+    """문서에 함께 저장하는 행 해시/체크섬 (--reconcile에서 문서와 행을 연결)"""
+    return {'row_hash': item['hash'], 'checksum': item['checksum']}
 
 # sbdb에 문서 저장
-def save_to_sbdb(row_data, headers, config, index):
-    """한 행의 데이터를 sbdb에 저장"""
-    # 부서명 (첫 번째 컬럼)
-    department = row_data.get(headers[0], "").strip() if len(headers) > 0 else ""
-    # 용역명 (두 번째 컬럼)
-    project_name = row_data.get(headers[1], "").strip() if len(headers) > 1 else ""
-
-    # 타이틀 생성: [입찰참여] 카테고리 + 부서명 + 용역명 (50자 제한)
-    if department and project_name:
-        title_base = f"{department} - {project_name}"
-    elif department:
-        title_base = department
-    elif project_name:
-        title_base = project_name
-    else:
-        title_base = "입찰정보"
+def save_to_sbdb(row_data, headers, config, index, sink, embedding=None, metadata=None, document=None):
+    """한 행의 데이터를 sbdb에 저장 (document: 미리 렌더링한 (제목, 내용))"""
+    title, content = document or build_document(row_data, headers, index)
 
-    # 용역명이 너무 길면 50자로 자르기
-    if len(title_base) > 50:
-        title_base = title_base[:47] + "..."
+    today = datetime.now().strftime("%Y.%m.%d")
+    tags = config.get('tags', []) + [today, CATEGORY_TAG]
 
-    title = f"[입찰참여] {title_base} (#{index})"
+    return sink.save(title, content, tags, embedding=embedding, metadata=metadata)
 
-    content_lines = [f"# {title}", ""]
+# sbdb 문서 업데이트
+def update_sbdb_document(doc_id, row_data, headers, config, index, sink, embedding=None,
+                         regenerate_embedding=True, metadata=None, document=None):
+    """sbdb의 기존 문서 업데이트 (regenerate_embedding=False면 임베딩 유지, document: 미리 렌더링한 (제목, 내용))"""
+    title, content = document or build_document(row_data, headers, index)
 
-    for header in headers:
-        value = row_data.get(header, "")
-        if value != "" and value is not None:
-            content_lines.append(f"- **{header}**: {value}")
+    return sink.update(doc_id, title, content, embedding=embedding,
+                       regenerate_embedding=regenerate_embedding, metadata=metadata)
 
-    content = "\n".join(content_lines)
+# 임베딩 미리 생성
+def precompute_embeddings(changes, headers, embedder, batch_size):
+    """임베딩이 필요한 새/수정 행의 문서 내용을 배치로 임베딩하여 item['embedding']에 저장 -> 요청 수"""
+    items = [item for item in changes['new'] + changes['updated'] if item['reembed']]
+    if not items:
+        return 0
 
-    today = datetime.now().strftime("%Y.%m.%d")
-    tags = config.get('tags', []) + [today, "입찰참여"]
-    tags_str = ",".join(tags)
+    contents = [render_item(item, headers)[1] for item in items]
+    embeddings = embed_contents(embedder, contents, batch_size)
 
-    sbdb_script = r"C:\Users\hjj\.claude\skills\sbdb\scripts\save_document.py"
+    for item, vector in zip(items, embeddings):
+        item['embedding'] = vector
 
-    cmd = [
-        "python",
-        sbdb_script,
-        "--content", content,
-        "--title", title,
-        "--tags", tags_str,
-        "--db-name", config.get('sbdb_db_name', 'company'),
-        "--type", "text"
-    ]
+    return -(-len(contents) // batch_size)
 
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
-        )
+# sbdb 문서 일괄 upsert
+def upsert_sbdb_documents(items, headers, config, sink, batch_size=None):
+    """새/수정 행을 행 해시 기준으로 한 번에 저장 -> {행 해시: (성공 여부, 문서 ID, 오류)}
 
-        if result.returncode == 0:
-            # 문서 ID 추출 (출력에서)
-            doc_id = extract_doc_id(result.stdout)
-            return True, doc_id, None
-        else:
-            return False, None, result.stderr
+    sbdb에 같은 행 해시의 문서가 있으면 수정, 없으면 새로 만든다.
+    (재시도해도 문서가 중복되지 않음)
+    """
+    today = datetime.now().strftime("%Y.%m.%d")
+    tags = config.get('tags', []) + [today, CATEGORY_TAG]
+
+    documents = []
+    for item in items:
+        title, content = render_item(item, headers)
+        documents.append({
+            'row_hash': item['hash'],
+            'doc_id': item.get('doc_id'),
+            'title': title,
+            'content': content,
+            'tags': tags,
+            'metadata': row_metadata(item),
+            'embedding': item.get('embedding'),
+            'regenerate_embedding': item['reembed'],
+        })
+
+    return sink.upsert_many(documents, batch_size)
+
+# upsert 결과를 행별 결과로 변환
+def upsert_outcome(item, result):
+    """행 하나의 upsert 결과 -> (종류, 행, 결과) (결과는 save/update 결과와 같은 모양)"""
+    success, doc_id, error = result.get(item['hash'], (False, None, "upsert 결과 없음"))
+
+    if 'doc_id' not in item:
+        return 'new', item, (success, doc_id, error)
+
+    # sbdb에서 찾은 문서 ID가 상태와 다르면 sbdb 쪽을 따름
+    if success and doc_id:
+        item['doc_id'] = doc_id
+    return 'updated', item, (success, error)
+
+# sbdb 문서 일괄 삭제
+def delete_sbdb_documents(doc_ids, sink, batch_size=None):
+    """sbdb에서 여러 문서를 한 번에 삭제 -> {실패한 문서 ID: 오류}"""
+    return sink.delete_many(doc_ids, batch_size)
+
+# 재시도 대기열 갱신
+def update_retry_queue(sync_state, kind, item, error):
+    """실패한 행은 재시도 대기열(sync_state의 retry_queue)에 넣고, 성공한 행은 뺀다"""
+    if error is None:
+        (sync_state.get('retry_queue') or {}).pop(item['hash'], None)
+        return
 
-    except Exception as e:
-        return False, None, str(e)
+    queue = sync_state.setdefault('retry_queue', {})
+    previous = queue.get(item['hash']) or {}
+    queue[item['hash']] = {
+        'op': kind,
+        'row_number': item.get('index'),
+        'doc_id': item.get('doc_id'),
+        'attempts': previous.get('attempts', 0) + 1,
+        'error': str(error).strip()[:200],
+        'last_attempt': datetime.now().isoformat(),
+    }
 
-# sbdb 문서 업데이트
-def update_sbdb_document(doc_id, row_data, headers, config, index):
-    """sbdb의 기존 문서 업데이트"""
-    # 부서명 (첫 번째 컬럼)
-    department = row_data.get(headers[0], "").strip() if len(headers) > 0 else ""
-    # 용역명 (두 번째 컬럼)
-    project_name = row_data.get(headers[1], "").strip() if len(headers) > 1 else ""
-
-    # 타이틀 생성: [입찰참여] 카테고리 + 부서명 + 용역명 (50자 제한)
-    if department and project_name:
-        title_base = f"{department} - {project_name}"
-    elif department:
-        title_base = department
-    elif project_name:
-        title_base = project_name
-    else:
-        title_base = "입찰정보"
+# 재시도 대기열 정리
+def prune_retry_queue(sync_state, seen_hashes):
+    """시트에도 상태에도 없는 행(실패 후 시트에서 지워진 새 행)을 대기열에서 제거"""
+    queue = sync_state.get('retry_queue') or {}
+    for row_hash in [h for h in queue if h not in seen_hashes and h not in sync_state['synced_rows']]:
+        del queue[row_hash]
 
-    # 용역명이 너무 길면 50자로 자르기
-    if len(title_base) > 50:
-        title_base = title_base[:47] + "..."
+# 행 하나의 결과 반영
+def record_result(kind, item, result, headers, store, processed, total_changes, verbose=True):
+    """save/update 결과를 상태 저장소에 기록하고 출력 -> 오류 (성공하면 None, verbose=False면 실패만 출력)"""
+    if isinstance(result, Exception):
+        print(f"   ❌ [{processed}/{total_changes}] 처리 실패: {result}")
+        return result
 
-    title = f"[입찰참여] {title_base} (#{index})"
+    if kind == 'new':
+        # 새 행 추가
+        success, doc_id, error = result
 
-    content_lines = [f"# {title}", ""]
+        if success and doc_id:
+            title = state_title(item['data'], headers, item['index'])
 
-    for header in headers:
-        value = row_data.get(header, "")
-        if value != "" and value is not None:
-            content_lines.append(f"- **{header}**: {value}")
+            # 상태 업데이트
+            store.put_row(item['hash'], {
+                'row_number': item['index'],
+                'title': title,
+                'doc_id': doc_id,
+                'checksum': item['checksum'],
+                'column_checksums': item['column_checksums'],
+                'render_hash': item.get('render_hash')
+            })
 
-    content = "\n".join(content_lines)
+            if verbose:
+                print(f"   ✅ [{processed}/{total_changes}] 새 행 추가: {title[:50]}...")
+            return None
 
-    sbdb_script = r"C:\Users\hjj\.claude\skills\sbdb\scripts\update_document.py"
+        print(f"   ❌ [{processed}/{total_changes}] 추가 실패: {error}")
+        return error or "문서 ID 없음"
 
-    cmd = [
-        "python",
-        sbdb_script,
-        doc_id,
-        "--content", content,
-        "--title", title,
-        "--regenerate-embedding"
-    ]
+    # 기존 행 업데이트
+    success, error = result
+
+    if success:
+        title = state_title(item['data'], headers, item['index'])
+
+        # 상태 업데이트
+        row = dict(store.state['synced_rows'][item['hash']])
+        row['checksum'] = item['checksum']
+        row['column_checksums'] = item['column_checksums']
+        row['title'] = title
+        row['doc_id'] = item['doc_id']
+        row['render_hash'] = item.get('render_hash')
+        store.put_row(item['hash'], row)
+
+        if verbose:
+            mark = "🔄" if item['reembed'] else "📝"
+            print(f"   {mark} [{processed}/{total_changes}] 업데이트: {title[:50]}...")
+        return None
+
+    print(f"   ❌ [{processed}/{total_changes}] 업데이트 실패: {error}")
+    return error or "업데이트 실패"
+
+# 변경 사항 적용
+def apply_changes(changes, headers, config, sink, store, workers=1, rate_limit=None, metrics=None,
+                  verbose=True):
+    """새/수정/삭제 행을 sbdb에 반영하고 상태 저장소 갱신 -> (성공 수, 실패 수)
+
+    sbdb 호출은 worker pool에서 실행하고, 결과 병합(상태 저장소 기록)은
+    호출한 스레드에서만 수행한다. 성공한 변경은 즉시 journal에 기록된다.
+    metrics가 주어지면 sbdb 호출마다 지연 시간을 작업별(save / update / upsert / delete)로 기록한다.
+    verbose=False면 행별 성공 로그를 생략하고 실패만 출력한다.
+    """
+    timed = metrics.timed if metrics else (lambda operation, func: func)
 
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
-        )
+    total_changes = len(changes['new']) + len(changes['updated']) + len(changes['deleted'])
 
-        return result.returncode == 0, result.stderr if result.returncode != 0 else None
+    tasks = []
+    if config.get('write_mode', 'split') == 'upsert':
+        # 새/수정 행을 upsert_batch_size개씩 묶어 행 해시 기준으로 요청
+        upsert_batch_size = config.get('upsert_batch_size', DEFAULT_UPSERT_BATCH_SIZE)
+        upserts = changes['new'] + changes['updated']
+        for start in range(0, len(upserts), upsert_batch_size):
+            batch = upserts[start:start + upsert_batch_size]
+            tasks.append((('upserted', start), ('upserted', batch),
+                          timed('upsert', partial(upsert_sbdb_documents, batch, headers, config, sink,
+                                                  upsert_batch_size))))
+    else:
+        for item in changes['new']:
+            tasks.append((item['hash'], ('new', item),
+                          timed('save', partial(save_to_sbdb, item['data'], headers, config, item['index'], sink,
+                                                embedding=item.get('embedding'), metadata=row_metadata(item),
+                                                document=render_item(item, headers)))))
+        for item in changes['updated']:
+            tasks.append((item['hash'], ('updated', item),
+                          timed('update', partial(update_sbdb_document, item['doc_id'], item['data'], headers, config,
+                                                  item['index'], sink, embedding=item.get('embedding'),
+                                                  regenerate_embedding=item['reembed'],
+                                                  metadata=row_metadata(item),
+                                                  document=render_item(item, headers)))))
+
+    # 삭제는 delete_batch_size개씩 묶어 요청 (삭제된 행은 새/수정 행과 키가 겹치지 않음)
+    delete_batch_size = config.get('delete_batch_size', DEFAULT_DELETE_BATCH_SIZE)
+    deleted = changes['deleted']
+    for start in range(0, len(deleted), delete_batch_size):
+        batch = deleted[start:start + delete_batch_size]
+        tasks.append((('deleted', start), ('deleted', batch),
+                      timed('delete', partial(delete_sbdb_documents, [item['doc_id'] for item in batch], sink,
+                                              delete_batch_size))))
+
+    rate_limiter = RateLimiter(rate_limit) if rate_limit else None
 
-    except Exception as e:
-        return False, str(e)
+    success_count = 0
+    fail_count = 0
+    processed = 0
 
-# sbdb 문서 삭제
-def delete_sbdb_document(doc_id):
-    """sbdb에서 문서 삭제"""
-    sbdb_script = r"C:\Users\hjj\.claude\skills\sbdb\scripts\delete_document.py"
+    for (kind, item), result in run_keyed_tasks(tasks, workers, rate_limiter):
+        if kind == 'deleted':
+            # 삭제된 행 제거 (묶음 단위 결과를 행별로 반영)
+            for row in item:
+                processed += 1
+                error = result if isinstance(result, Exception) else result.get(row['doc_id'])
+                if error is None:
+                    success_count += 1
+                    store.delete_row(row['hash'])
+                    if verbose:
+                        print(f"   🗑️ [{processed}/{total_changes}] 삭제: {row['title'][:50]}...")
+                else:
+                    fail_count += 1
+                    print(f"   ❌ [{processed}/{total_changes}] 삭제 실패: {error}")
+                update_retry_queue(store.state, 'deleted', row, error)
+            continue
+
+        if kind == 'upserted':
+            # 묶음 upsert 결과를 행별 save/update 결과로 풀어서 반영
+            if isinstance(result, Exception):
+                outcomes = [('updated' if 'doc_id' in row else 'new', row, result) for row in item]
+            else:
+                outcomes = [upsert_outcome(row, result) for row in item]
+        else:
+            outcomes = [(kind, item, result)]
 
-    cmd = [
-        "python",
-        sbdb_script,
-        doc_id,
-        "--confirm"
-    ]
+        for kind, item, result in outcomes:
+            processed += 1
+            error = record_result(kind, item, result, headers, store, processed, total_changes, verbose)
+            if error is None:
+                success_count += 1
+            else:
+                fail_count += 1
+            update_retry_queue(store.state, kind, item, error)
 
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
-        )
+    return success_count, fail_count
 
-        return result.returncode == 0
+# 변경 사항 개수 출력
+def print_change_counts(changes):
+    """감지된 새/수정/변경 없음 행 개수 출력"""
+    metadata_only = sum(1 for item in changes['updated'] if not item['reembed'])
 
+    print(f"   ✨ 새 행: {len(changes['new'])}개")
+    print(f"   🔄 수정된 행: {len(changes['updated'])}개" +
+          (f" (임베딩 유지: {metadata_only}개)" if metadata_only else ""))
+    print(f"   ⏭️ 변경 없음: {changes['unchanged']}개")
+    if changes.get('same_render'):
+        print(f"   📝 문서 동일 (쓰기 생략): {len(changes['same_render'])}개")
+
+# sbdb 백엔드 열기
+def open_sink(config, backend, embedder=None):
+    """sbdb 백엔드 생성 (실패하면 종료, embedder: --embedder로 고른 임베딩 백엔드)"""
+    try:
+        return create_sink(config, backend, embedder)
     except Exception as e:
-        return False
+        print(f"❌ sbdb 백엔드 초기화 실패: {e}")
+        sys.exit(1)
 
-# 문서 ID 추출
-def extract_doc_id(output):
-    """save_document.py 출력에서 문서 ID 추출"""
-    import re
-    match = re.search(r'ID:\s*([a-f0-9-]+)', output)
-    if match:
-        return match.group(1)
-    return None
+# 변경 사항 처리
+def process_changes(changes, headers, config, args, sink, store, metrics=None, verbose=True):
+    """임베딩을 배치로 만든 뒤 변경 사항을 sbdb에 반영 -> (성공 수, 실패 수) (verbose=False면 행별 성공 로그 생략)"""
+    total_changes = len(changes['new']) + len(changes['updated']) + len(changes['deleted'])
+    print(f"\n💾 변경 사항 처리 중... (총 {total_changes}개)")
 
-# 메인 함수
-def main():
-    """메인 실행 함수"""
-    print("=" * 60)
-    print("🔄 Google Sheets → sbdb 증분 동기화")
-    print("=" * 60)
+    # 임베딩 배치 생성 (미리 계산한 임베딩을 받는 백엔드만)
+    if sink.accepts_embeddings and any(item['reembed'] for item in changes['new'] + changes['updated']):
+        batch_size = args.embedding_batch_size or config.get('embedding_batch_size', DEFAULT_BATCH_SIZE)
+        try:
+            embedder = create_embedder(config, args.embedder)
+            if metrics:
+                # 임베딩 요청마다 지연 시간 기록 (--plan 예상 시간)
+                embedder.embed_batch = metrics.timed('embed', embedder.embed_batch)
+            with maybe_span(metrics, 'embed'):
+                requests_made = precompute_embeddings(changes, headers, embedder, batch_size)
+            embedder.close()
+            embedded = sum(1 for item in changes['new'] + changes['updated'] if item['reembed'])
+            print(f"   🧠 임베딩 생성: {embedded}개 문서, "
+                  f"요청 {requests_made}회 (배치 크기 {batch_size})")
+        except Exception as e:
+            # 실패하면 문서별로 임베딩 생성
+            print(f"   ⚠️  배치 임베딩 실패, 문서별로 생성합니다: {e}")
+
+    workers = args.workers or config.get('workers', 1)
+    rate_limit = args.rate_limit or config.get('rate_limit')
+    if workers > 1 or rate_limit:
+        print(f"   ⚙️ worker: {workers}개, 속도 제한: {f'{rate_limit}/초' if rate_limit else '없음'}")
+
+    with maybe_span(metrics, 'write'):
+        return apply_changes(
+            changes, headers, config, sink, store,
+            workers=workers, rate_limit=rate_limit, metrics=metrics, verbose=verbose
+        )
 
-    # 설정 로드
-    print("\n📝 설정 파일 로드 중...")
-    config = load_config()
+# sbdb 문서와 행 연결 (--reconcile)
+def reconcile_rows(current_data, headers, doc_index, store, index_offset=0):
+    """현재 행마다 sbdb 문서를 찾아 synced_rows 항목을 다시 만들기 -> 연결된 행 수"""
+    synced_rows = store.state['synced_rows']
+    rows = {}
+
+    for idx, row in enumerate(current_data, start=index_offset):
+        row_hash = generate_row_hash(row, headers)
+        # 같은 행 해시가 여러 번 나오면 첫 행만 연결 (나머지 문서는 중복으로 삭제)
+        if row_hash in rows or row_hash in synced_rows:
+            continue
+
+        doc = doc_index.claim(row_hash, build_title(row, headers, idx + 1))
+        if doc is None:
+            continue
+
+        rows[row_hash] = matched_row(doc, idx + 1, state_title(row, headers, idx + 1),
+                                     generate_checksum(row), generate_column_checksums(row))
+
+    store.put_rows(rows.items())
+    return len(rows)
+
+# 추출 위치 기록
+def record_fetch_position(sync_state, modified_time, last_row, record_count):
+    """다음 실행을 위해 시트 수정 시각과 delta 워터마크 저장"""
+    if modified_time:
+        sync_state['sheet_modified_time'] = modified_time
+    if last_row:
+        # 마지막으로 반영한 데이터 행 다음부터 다시 읽음
+        sync_state['fetch_watermark'] = {'row': last_row + 1, 'records': record_count}
+
+# 명령행 인수
+def parse_args():
+    """명령행 인수 파싱"""
+    parser = argparse.ArgumentParser(description='Google Sheets → sbdb 증분 동기화')
+    parser.add_argument('--backend', choices=['subprocess', 'worker', 'direct'],
+                        help='sbdb 백엔드 (기본: config.json의 sbdb_backend 또는 subprocess)')
+    parser.add_argument('--state-backend', choices=STATE_BACKENDS,
+                        help='상태 저장 방식 (기본: config.json의 state_backend 또는 json)')
+    parser.add_argument('--fetch-mode', choices=['full', 'modified', 'delta'],
+                        help='시트 추출 방식 (기본: config.json의 fetch_mode 또는 full)')
+    parser.add_argument('--full', action='store_true',
+                        help='수정 시각/워터마크를 무시하고 전체 행을 추출')
+    parser.add_argument('--reconcile', action='store_true',
+                        help='sbdb 문서 목록으로 동기화 상태를 다시 만든 뒤 실제 변경만 반영 (전체 행 추출)')
+    parser.add_argument('--chunk-size', type=int,
+                        help='시트를 이 행 수만큼씩 읽으며 바로 처리 (기본: config.json의 chunk_size, 없으면 한 번에 전체)')
+    parser.add_argument('--workers', type=int,
+                        help='동시에 처리할 worker 수 (기본: config.json의 workers 또는 1)')
+    parser.add_argument('--rate-limit', type=float,
+                        help='초당 최대 sbdb 호출 수 (기본: config.json의 rate_limit, 없으면 제한 없음)')
+    parser.add_argument('--embedding-batch-size', type=int,
+                        help=f'임베딩 요청 1회당 문서 수 (기본: config.json의 embedding_batch_size 또는 {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--embedder', choices=['openai', 'local'],
+                        help='임베딩 백엔드 (기본: config.json의 embedding_backend 또는 openai, local은 테스트용)')
+    parser.add_argument('--plan', action='store_true',
+                        help='sbdb에 쓰지 않고 추가/수정/삭제할 행과 예상 시간/비용만 출력 (전체 행 추출, 상태 파일 유지)')
+    parser.add_argument('--plan-limit', type=int, default=20,
+                        help='--plan: 종류마다 출력할 작업 수 (전체 목록은 sync_plan.json, 기본: 20)')
+    return parser.parse_args()
+
+# 메인 함수
+def run_sync(args, config, metrics, connector=None, namespace=None, prefetched=None):
+    """소스 하나 동기화 (단계별 시간 / 결과는 metrics에 기록)
+
+    namespace: 소스 이름 (소스별 상태 파일 / 보고서를 씀, 없으면 기본 sync_state)
+    prefetched: 여러 소스를 한 번에 읽어 둔 시트 값 (전체 행을 읽는 경우에만 사용)
+    """
+    if namespace:
+        print(f"\n📚 소스: {namespace}")
     print(f"   시트 ID: {config['sheet_id']}")
     print(f"   DB 이름: {config.get('sbdb_db_name', 'company')}")
+    backend = args.backend or config.get('sbdb_backend', 'subprocess')
+    print(f"   sbdb 백엔드: {backend}")
 
     # 동기화 상태 로드
     print("\n📂 이전 동기화 상태 로드 중...")
-    sync_state = load_sync_state()
+    with metrics.span('load_state'):
+        store = open_state_store(config, args.state_backend, namespace)
+        sync_state = store.load()
+    metrics.report_path = report_path_for(store)
+    metrics.info['backend'] = backend
+
+    if store.recovered:
+        print(f"   ♻️ 중단된 이전 실행의 변경 {store.recovered}개를 journal에서 복구했습니다.")
 
     if sync_state['last_sync']:
         last_sync_time = datetime.fromisoformat(sync_state['last_sync'])
@@ -415,111 +781,403 @@ def main():
     else:
         print("   ✨ 첫 동기화입니다!")
 
+    retry_queue = sync_state.get('retry_queue') or {}
+    if retry_queue:
+        print(f"   🔁 지난 실행에서 실패한 행: {len(retry_queue)}개 (이번 실행에서 다시 처리)")
+
     # 구글 시트 연결
     print("\n🔗 구글 시트 연결 중...")
-    worksheet = connect_to_sheet(config)
-    print(f"   시트 이름: {worksheet.title}")
-
-    # 데이터 추출
-    print("\n📥 데이터 추출 중...")
-    current_data, headers = fetch_sheet_data(worksheet)
+    connector = connector or SheetConnector(config)
+    with metrics.span('connect'):
+        worksheet = connect_to_sheet(config, connector, sync_state.get('sheet_cache'))
+    print(f"   시트 이름: {worksheet.title}" +
+          (" (캐시한 탭 정보 사용)" if isinstance(worksheet, CachedWorksheet) else ""))
+
+    # 시트 수정 여부 확인 (modified / delta 모드)
+    fetch_mode = args.fetch_mode or config.get('fetch_mode', 'full')
+    modified_time = None
+    metrics.info['fetch_mode'] = fetch_mode
+
+    if fetch_mode in ('modified', 'delta'):
+        modified_time = get_sheet_modified_time(connector, config['sheet_id'])
+        # 재시도할 행이 남아 있으면 시트가 그대로여도 실행
+        if (not args.full and not args.reconcile and not retry_queue and modified_time
+                and modified_time == sync_state.get('sheet_modified_time')):
+            print(f"\n✅ 시트가 마지막 동기화 이후 수정되지 않았습니다 ({modified_time}). 동기화를 건너뜁니다.")
+            metrics.info['status'] = 'skipped'
+            if store.recovered:
+                store.save()
+            store.close()
+            return
+
+    # 해시 방식 확인 (바뀌었으면 이번 실행에서 전체 행을 읽으며 상태를 새 키로 옮김)
+    try:
+        scheme = get_scheme(config.get('hash_scheme'))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
-    if not current_data:
-        print("⚠️  데이터가 없습니다.")
+    if not sync_state['synced_rows']:
+        sync_state['hash_scheme'] = scheme.name
+    state_scheme = get_scheme(sync_state.get('hash_scheme', LEGACY_SCHEME))
+    migrating = state_scheme.name != scheme.name
+    if migrating:
+        print(f"\n🔑 해시 방식 변경: {state_scheme.name} → {scheme.name} (전체 행을 읽으며 상태를 옮깁니다)")
+
+    # delta 모드: 저장된 워터마크 이후 행만 추출
+    watermark = sync_state.get('fetch_watermark')
+    delta = (fetch_mode == 'delta' and watermark and not args.full
+             and not migrating and not args.reconcile)
+    start_row = watermark['row'] if delta else None
+    index_offset = watermark['records'] if delta else 0
+
+    # 데이터 추출 (chunk_size가 있으면 청크 단위로 읽으며 바로 처리)
+    columns = config.get('fetch_columns')
+    required_index = config.get('required_column_index', 1)
+    chunk_size = args.chunk_size or config.get('chunk_size')
+    sheet_retry = create_retry_policy(config)
+
+    if chunk_size:
+        print(f"\n📥 데이터를 {chunk_size}행 단위로 추출하며 처리합니다...")
+        chunks = metrics.timed_iter('fetch', iter_sheet_chunks(
+            worksheet, columns, start_row or 3, chunk_size, required_index, scheme.name,
+            retry=sheet_retry, metrics=metrics
+        ))
+    else:
+        print("\n📥 데이터 추출 중...")
+        with metrics.span('fetch'):
+            chunks = [fetch_sheet_data(worksheet, columns, start_row, required_index, scheme.name,
+                                       retry=sheet_retry, metrics=metrics,
+                                       prefetched=None if start_row else prefetched)]
+
+    embedding_columns = config.get('embedding_columns')
+    totals = {'new': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    success_count = 0
+    fail_count = 0
+    seen_hashes = set()
+    record_count = index_offset
+    last_row = None
+    sink = None
+    doc_index = None
+    sheet_headers = None
+
+    # reconcile: 카테고리 태그의 sbdb 문서를 한 번에 조회해 행 해시/제목으로 색인
+    if args.reconcile:
+        sink = open_sink(config, backend, args.embedder)
+        print(f"\n🧭 sbdb 문서 목록 조회 중... ('{CATEGORY_TAG}' 태그)")
+        try:
+            documents = sink.iter_documents(CATEGORY_TAG)
+            # 여러 소스를 동기화하면 이 소스의 태그(소스 이름)가 붙은 문서만 연결
+            if config.get('source_tag'):
+                documents = (doc for doc in documents if config['source_tag'] in (doc.get('tags') or []))
+            doc_index = DocumentIndex(documents)
+        except Exception as e:
+            print(f"❌ 문서 목록 조회 실패: {e}")
+            sys.exit(1)
+        print(f"   문서 {len(doc_index)}개 (행 해시 {len(doc_index.by_hash)}개)")
+        # sbdb 문서로 상태를 새로 만들므로 해시 방식 변환은 필요 없음
+        migrating = False
+
+    for current_data, headers, chunk_last_row in chunks:
+        sheet_headers = headers
+        if not current_data:
+            continue
+
+        if doc_index is not None:
+            # 시트를 읽은 뒤에만 기존 상태를 비움 (읽기 실패로 상태를 잃지 않도록)
+            if record_count == index_offset:
+                store.clear_rows()
+                sync_state['hash_scheme'] = scheme.name
+            matched = reconcile_rows(current_data, headers, doc_index, store, record_count)
+            print(f"   🧭 문서 연결: {matched}/{len(current_data)}개 행")
+
+        if migrating:
+            moved = migrate_state_hashes(current_data, store, state_scheme, scheme)
+            print(f"   🔑 상태 키 변환: {moved}개 행")
+
+        # 변경 사항 감지
+        print("\n🔍 변경 사항 감지 중...")
+        with metrics.span('diff'):
+            changes = detect_changes(current_data, headers, sync_state, embedding_columns,
+                                     index_offset=record_count, detect_deletes=False,
+                                     seen_hashes=seen_hashes)
+        with metrics.span('render'):
+            render_changes(changes, headers)
+            record_same_renders(changes, headers, store)
+        record_count += len(current_data)
+        last_row = chunk_last_row
+        print_change_counts(changes)
+
+        for key in totals:
+            totals[key] += changes[key] if key == 'unchanged' else len(changes[key])
+        totals['unchanged'] += len(changes['same_render'])
+
+        if changes['new'] or changes['updated']:
+            sink = sink or open_sink(config, backend, args.embedder)
+            success, fail = process_changes(changes, headers, config, args, sink, store, metrics)
+            success_count += success
+            fail_count += fail
+
+    # 찾은 탭 이름 / ID와 헤더를 캐시 (다음 실행은 탭 목록 조회 없이 바로 값 범위 요청)
+    if sheet_headers:
+        cache = sync_state.get('sheet_cache')
+        if cache_matches(cache, config) and cache.get('headers') and cache['headers'] != list(sheet_headers):
+            print("\n📋 헤더가 바뀌었습니다. 체크섬이 달라져 기존 행이 수정으로 처리될 수 있습니다.")
+        sync_state['sheet_cache'] = sheet_cache(config, worksheet, sheet_headers)
+
+    if record_count == index_offset:
+        if delta:
+            print("✅ 새로 추가된 행이 없습니다.")
+            record_fetch_position(sync_state, modified_time, watermark['row'] - 1, index_offset)
+            store.save()
+        else:
+            # 시트를 읽지 못했을 때 모든 문서를 삭제하지 않도록 여기서 중단
+            print("⚠️  데이터가 없습니다.")
+        metrics.info['status'] = 'no_data'
+        store.close()
         return
 
-    # 변경 사항 감지
-    print("\n🔍 변경 사항 감지 중...")
-    changes = detect_changes(current_data, headers, sync_state)
-
-    print(f"   ✨ 새 행: {len(changes['new'])}개")
-    print(f"   🔄 수정된 행: {len(changes['updated'])}개")
-    print(f"   🗑️ 삭제된 행: {len(changes['deleted'])}개")
-    print(f"   ⏭️ 변경 없음: {changes['unchanged']}개")
-
-    total_changes = len(changes['new']) + len(changes['updated']) + len(changes['deleted'])
+    # 시트 전체를 읽었으므로 해시 방식 마이그레이션 완료
+    if migrating:
+        sync_state['hash_scheme'] = scheme.name
+
+    # reconcile: 어느 행과도 연결되지 않은 문서(중복/삭제된 행)는 삭제 대상으로 등록
+    if doc_index is not None:
+        orphans = orphan_rows(doc_index.remaining())
+        store.put_rows(orphans)
+        print(f"\n🧭 연결되지 않은 문서: {len(orphans)}개")
+
+    # 삭제된 행 감지 (시트 전체를 읽은 경우만)
+    if not delta:
+        with metrics.span('diff'):
+            deleted = find_deleted_rows(sync_state, seen_hashes)
+        print(f"\n🗑️ 삭제된 행: {len(deleted)}개")
+        totals['deleted'] = len(deleted)
+
+        if deleted:
+            sink = sink or open_sink(config, backend, args.embedder)
+            success, fail = process_changes(
+                {'new': [], 'updated': [], 'deleted': deleted, 'unchanged': 0, 'same_render': []},
+                [], config, args, sink, store, metrics
+            )
+            success_count += success
+            fail_count += fail
+
+        prune_retry_queue(sync_state, seen_hashes)
+
+    total_changes = totals['new'] + totals['updated'] + totals['deleted']
+    metrics.info.update(rows=record_count - index_offset, changes=dict(totals),
+                        success=success_count, failed=fail_count)
 
     if total_changes == 0:
         print("\n✅ 변경 사항이 없습니다. 동기화를 건너뜁니다.")
+        metrics.info['status'] = 'no_changes'
+        if sink:
+            sink.close()
+        record_fetch_position(sync_state, modified_time, last_row, record_count)
+        with metrics.span('save_state'):
+            store.save()
+        store.close()
         return
 
-    # 변경 사항 처리
-    print(f"\n💾 변경 사항 처리 중... (총 {total_changes}개)")
+    if sink:
+        sink.close()
 
-    success_count = 0
-    fail_count = 0
-    processed = 0
+    # 동기화 상태 저장
+    sync_state['last_sync'] = datetime.now().isoformat()
+    sync_state['total_rows'] = record_count
+    # 실패한 행은 다음 실행에서 다시 읽도록 워터마크를 옮기지 않음
+    if fail_count == 0:
+        record_fetch_position(sync_state, modified_time, last_row, record_count)
+    # sbdb 백엔드별 / 작업별 평균 지연 시간 누적 (--plan 예상 시간)
+    metrics.merge_latency_history(sync_state.setdefault('latency_history', {}).setdefault(backend, {}))
+    with metrics.span('save_state'):
+        store.save()
+    store.close()
+    metrics.info['status'] = 'partial' if fail_count else 'ok'
+    metrics.info['retry_queue'] = len(sync_state.get('retry_queue') or {})
 
-    # 새 행 추가
-    for item in changes['new']:
-        processed += 1
-        success, doc_id, error = save_to_sbdb(item['data'], headers, config, item['index'])
+    # 결과 요약
+    print("\n" + "=" * 60)
+    print("📊 증분 동기화 완료")
+    print("=" * 60)
+    print(f"   ✨ 추가: {totals['new']}개")
+    print(f"   🔄 수정: {totals['updated']}개")
+    print(f"   🗑️ 삭제: {totals['deleted']}개")
+    print(f"   ⏭️ 건너뛰기: {totals['unchanged']}개")
+    print(f"   ✅ 성공: {success_count}개")
+    print(f"   ❌ 실패: {fail_count}개")
+    if sync_state.get('retry_queue'):
+        print(f"   🔁 재시도 대기: {len(sync_state['retry_queue'])}개 (다음 실행에서 다시 처리)")
+    print("=" * 60)
 
-        if success and doc_id:
-            success_count += 1
-            title_field = headers[0] if headers else "항목"
-            title = f"{item['data'].get(title_field, '항목')} - #{item['index']}"
 
-            # 상태 업데이트
-            sync_state['synced_rows'][item['hash']] = {
-                'row_number': item['index'],
-                'title': title,
-                'doc_id': doc_id,
-                'checksum': item['checksum']
-            }
+# 동기화 계획 (--plan)
+def plan_sync(args, config, connector=None, namespace=None):
+    """시트 전체를 읽어 다음 동기화가 할 작업과 예상 시간 / 비용 출력 + sync_plan.json 저장
+
+    sbdb는 호출하지 않고 상태 파일도 바꾸지 않는다. 해시 방식이 바뀌었으면 상태와 같은 방식으로 비교한다.
+    (실제 실행은 상태 키를 새 방식으로 옮긴 뒤 같은 결과로 비교)
+    """
+    if namespace:
+        print(f"\n📚 소스: {namespace}")
+    backend = args.backend or config.get('sbdb_backend', 'subprocess')
+    if backend not in SINK_BACKENDS:
+        print(f"❌ 알 수 없는 sbdb 백엔드: {backend}")
+        sys.exit(1)
+
+    store = open_state_store(config, args.state_backend, namespace, read_only=True)
+    sync_state = store.load()
 
-            print(f"   ✅ [{processed}/{total_changes}] 새 행 추가: {title[:50]}...")
+    try:
+        scheme = get_scheme(sync_state.get('hash_scheme', LEGACY_SCHEME) if sync_state['synced_rows']
+                            else config.get('hash_scheme'))
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    try:
+        print("\n🔗 구글 시트 연결 중...")
+        worksheet = connect_to_sheet(config, connector, sync_state.get('sheet_cache'))
+        print(f"   시트 이름: {worksheet.title}")
+
+        columns = config.get('fetch_columns')
+        required_index = config.get('required_column_index', 1)
+        chunk_size = args.chunk_size or config.get('chunk_size')
+        sheet_retry = create_retry_policy(config)
+
+        print("\n📥 데이터 추출 중...")
+        if chunk_size:
+            chunks = iter_sheet_chunks(worksheet, columns, 3, chunk_size, required_index, scheme.name,
+                                       retry=sheet_retry)
         else:
-            fail_count += 1
-            print(f"   ❌ [{processed}/{total_changes}] 추가 실패: {error}")
+            chunks = [fetch_sheet_data(worksheet, columns, None, required_index, scheme.name, retry=sheet_retry)]
 
-    # 기존 행 업데이트
-    for item in changes['updated']:
-        processed += 1
-        success, error = update_sbdb_document(item['doc_id'], item['data'], headers, config, item['index'])
+        plan = SyncPlan()
+        seen_hashes = set()
+        record_count = 0
+        sheet_headers = None
 
-        if success:
-            success_count += 1
-            title_field = headers[0] if headers else "항목"
-            title = f"{item['data'].get(title_field, '항목')} - #{item['index']}"
+        for current_data, headers, _ in chunks:
+            sheet_headers = headers
+            if not current_data:
+                continue
+            changes = detect_changes(current_data, headers, sync_state, config.get('embedding_columns'),
+                                     index_offset=record_count, detect_deletes=False, seen_hashes=seen_hashes)
+            render_changes(changes, headers)
+            plan.add_changes(changes, headers)
+            record_count += len(current_data)
+
+        if not record_count:
+            # 실제 실행도 데이터가 없으면 삭제하지 않고 중단
+            print("⚠️  데이터가 없습니다.")
+            return
+
+        plan.add_deletes(find_deleted_rows(sync_state, seen_hashes))
+
+        cache = sync_state.get('sheet_cache')
+        previous_headers = cache.get('headers') if cache_matches(cache, config) else None
+        warnings = plan_warnings(plan, previous_headers, sheet_headers)
+        if args.embedding_batch_size:
+            config = dict(config, embedding_batch_size=args.embedding_batch_size)
+        estimate = estimate_plan(
+            plan, config, (sync_state.get('latency_history') or {}).get(backend) or {},
+            SINK_BACKENDS[backend].accepts_embeddings,
+            workers=args.workers or config.get('workers', 1),
+            rate_limit=args.rate_limit or config.get('rate_limit')
+        )
 
-            # 상태 업데이트
-            sync_state['synced_rows'][item['hash']]['checksum'] = item['checksum']
-            sync_state['synced_rows'][item['hash']]['title'] = title
+        print_plan(plan, estimate, warnings, args.plan_limit)
 
-            print(f"   🔄 [{processed}/{total_changes}] 업데이트: {title[:50]}...")
-        else:
-            fail_count += 1
-            print(f"   ❌ [{processed}/{total_changes}] 업데이트 실패: {error}")
-
-    # 삭제된 행 제거
-    for item in changes['deleted']:
-        processed += 1
-        success = delete_sbdb_document(item['doc_id'])
-
-        if success:
-            success_count += 1
-            del sync_state['synced_rows'][item['hash']]
-            print(f"   🗑️ [{processed}/{total_changes}] 삭제: {item['title'][:50]}...")
-        else:
-            fail_count += 1
-            print(f"   ❌ [{processed}/{total_changes}] 삭제 실패")
+        plan_path = report_path_for(store, PLAN_FILE)
+        write_json_atomic(plan_path, plan_report(plan, estimate, warnings))
+        print(f"📄 전체 계획: {plan_path}")
+    finally:
+        store.close()
 
-    # 동기화 상태 저장
-    sync_state['last_sync'] = datetime.now().isoformat()
-    sync_state['total_rows'] = len(current_data)
-    save_sync_state(sync_state)
+# 소스 하나 실행
+def run_source(args, config, connector, namespace=None, prefetched=None):
+    """run_sync 실행 + 실행 보고서 저장 (실패한 실행도 기록)"""
+    metrics = RunMetrics()
+    if namespace:
+        metrics.info['source'] = namespace
+
+    try:
+        run_sync(args, config, metrics, connector, namespace, prefetched)
+    except BaseException as e:
+        if not (isinstance(e, SystemExit) and not e.code):
+            metrics.info['status'] = 'failed'
+        raise
+    finally:
+        # 상태 파일과 같은 폴더에 실행 보고서 저장
+        if metrics.report_path:
+            metrics.write()
+            print(f"📈 실행 보고서: {metrics.report_path}")
+
+# 여러 소스 실행
+def sync_sources(args, config, sources, connector):
+    """sources의 소스들을 동시에 동기화 (인증 / 스프레드시트 공유) -> 실패한 소스 이름 목록"""
+    # 전체 행을 한 번에 읽는 소스는 스프레드시트별로 묶어 한 번에 읽기
+    full_fetch = [source for source in sources
+                  if not (args.chunk_size or source.get('chunk_size'))
+                  and (args.full or args.reconcile
+                       or (args.fetch_mode or source.get('fetch_mode', 'full')) == 'full')]
+    prefetched = connector.prefetch(full_fetch)
+
+    workers = config.get('source_workers') or len(sources)
+    print(f"\n📚 소스 {len(sources)}개 동기화 (동시 {workers}개)")
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_source, args, source, connector, source['name'], prefetched.get(source['name'])):
+                source['name']
+            for source in sources
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+            except SystemExit as e:
+                if e.code:
+                    failed.append(name)
+            except Exception as e:
+                print(f"❌ 소스 '{name}' 동기화 실패: {e}")
+                failed.append(name)
+
+    return failed
+
+def main():
+    """메인 실행 함수"""
+    args = parse_args()
 
-    # 결과 요약
-    print("\n" + "=" * 60)
-    print("📊 증분 동기화 완료")
     print("=" * 60)
-    print(f"   ✨ 추가: {len(changes['new'])}개")
-    print(f"   🔄 수정: {len(changes['updated'])}개")
-    print(f"   🗑️ 삭제: {len(changes['deleted'])}개")
-    print(f"   ⏭️ 건너뛰기: {changes['unchanged']}개")
-    print(f"   ✅ 성공: {success_count}개")
-    print(f"   ❌ 실패: {fail_count}개")
+    print("🔄 Google Sheets → sbdb 증분 동기화")
+    print("=" * 60)
+
+    # 설정 로드
+    print("\n📝 설정 파일 로드 중...")
+    config = load_config()
+    connector = SheetConnector(config)
+    sources = source_configs(config)
+
+    if args.plan:
+        for source in sources or [config]:
+            plan_sync(args, source, connector, source['name'] if sources else None)
+        return
+
+    if sources is None:
+        run_source(args, config, connector)
+        return
+
+    failed = sync_sources(args, config, sources, connector)
+
+    print("\n" + "=" * 60)
+    print(f"📚 소스 {len(sources)}개 중 {len(sources) - len(failed)}개 완료")
+    if failed:
+        print(f"   ❌ 실패한 소스: {', '.join(sorted(failed))}")
+        print("=" * 60)
+        sys.exit(1)
     print("=" * 60)
 
 if __name__ == "__main__":
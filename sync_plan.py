@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Sync Plan Module
+--plan: sbdb에 쓰지 않고 다음 동기화가 할 작업(추가 / 수정 / 삭제 / 임베딩)과 예상 시간 / 비용 계산
+
+예상 시간은 sync_state의 latency_history(지난 실행들의 sbdb 백엔드별 / 작업별 평균 지연 시간)로,
+임베딩 비용은 문서 길이로 어림한 토큰 수와 embedding_price_per_million_tokens로 계산한다.
+수정 행이 많거나 헤더가 바뀌었으면 (헤더 이름 변경으로 모든 체크섬이 바뀐 경우 등) 경고한다.
+"""
+
+import math
+from collections import Counter
+
+from document_render import render_item
+from embedding import DEFAULT_BATCH_SIZE
+from sbdb_sink import DEFAULT_DELETE_BATCH_SIZE, DEFAULT_UPSERT_BATCH_SIZE
+
+PLAN_FILE = "sync_plan.json"
+
+# text-embedding-3-small 가격 (USD / 100만 토큰)
+DEFAULT_EMBEDDING_PRICE = 0.02
+
+# 토큰 수 어림값: UTF-8 바이트 3개당 1토큰 (한글 1자 ≈ 1토큰, 영문은 실제보다 조금 많게 잡힘)
+BYTES_PER_TOKEN = 3
+
+# 비교한 행 중 수정 행 비율이 이보다 크면 경고
+RUNAWAY_RATIO = 0.5
+
+
+class SyncPlan:
+    """청크별 변경 사항을 모아 만든 동기화 계획 (행 데이터 / 문서 내용은 보관하지 않음)"""
+
+    def __init__(self):
+        self.inserts = []
+        self.updates = []
+        self.deletes = []
+        self.same_render = 0
+        self.unchanged = 0
+        self.embeddings = 0
+        self.embedding_bytes = 0
+        self.changed_columns = Counter()
+
+    @property
+    def rows(self):
+        return len(self.inserts) + len(self.updates) + self.same_render + self.unchanged
+
+    def _embed(self, content):
+        self.embeddings += 1
+        self.embedding_bytes += len(content.encode('utf-8'))
+
+    def add_changes(self, changes, headers):
+        """render_changes까지 마친 변경 사항(새 / 수정 / 문서 동일 / 변경 없음) 추가"""
+        for item in changes['new']:
+            title, content = render_item(item, headers)
+            self.inserts.append({'row_number': item['index'], 'row_hash': item['hash'], 'title': title})
+            self._embed(content)
+
+        for item in changes['updated']:
+            title, content = render_item(item, headers)
+            self.updates.append({
+                'row_number': item['index'],
+                'row_hash': item['hash'],
+                'doc_id': item['doc_id'],
+                'title': title,
+                'changed_columns': item['changed_columns'],
+                'reembed': item['reembed'],
+            })
+            self.changed_columns.update(item['changed_columns'] or [])
+            if item['reembed']:
+                self._embed(content)
+
+        self.same_render += len(changes['same_render'])
+        self.unchanged += changes['unchanged']
+
+    def add_deletes(self, deleted):
+        """find_deleted_rows 결과 추가"""
+        self.deletes.extend({'row_hash': item['hash'], 'doc_id': item['doc_id'], 'title': item['title']}
+                            for item in deleted)
+
+    def operation_calls(self, config, accepts_embeddings):
+        """sbdb / 임베딩 호출 횟수 {작업: 횟수} (apply_changes / process_changes와 같은 묶음 크기)"""
+        calls = {}
+        if config.get('write_mode', 'split') == 'upsert':
+            batch_size = config.get('upsert_batch_size', DEFAULT_UPSERT_BATCH_SIZE)
+            calls['upsert'] = math.ceil((len(self.inserts) + len(self.updates)) / batch_size)
+        else:
+            calls['save'] = len(self.inserts)
+            calls['update'] = len(self.updates)
+        calls['delete'] = math.ceil(len(self.deletes) / config.get('delete_batch_size', DEFAULT_DELETE_BATCH_SIZE))
+        # 미리 계산한 임베딩을 받는 백엔드만 임베딩을 따로 요청 (그 밖에는 저장 / 수정 호출에 포함)
+        if accepts_embeddings:
+            calls['embed'] = math.ceil(self.embeddings / config.get('embedding_batch_size', DEFAULT_BATCH_SIZE))
+        return {operation: count for operation, count in calls.items() if count}
+
+
+# 예상 시간 / 비용
+def estimate_plan(plan, config, history, accepts_embeddings, workers=1, rate_limit=None):
+    """작업별 호출 횟수 x 지난 실행의 평균 지연 시간 -> 예상 시간 / 임베딩 토큰 / 비용
+
+    sbdb 호출은 worker 수만큼 나눠 실행되고(rate_limit이 있으면 그보다 빠를 수 없음),
+    임베딩은 저장 전에 배치로 차례로 만든다. 기록이 없는 작업은 missing에 넣고 시간에서 뺀다.
+    """
+    operations = {}
+    missing = []
+    write_seconds = 0.0
+    write_calls = 0
+    embed_seconds = 0.0
+
+    for operation, calls in plan.operation_calls(config, accepts_embeddings).items():
+        entry = history.get(operation)
+        seconds = calls * entry['mean_ms'] / 1000 if entry else None
+        operations[operation] = {'calls': calls, 'mean_ms': entry['mean_ms'] if entry else None,
+                                 'seconds': round(seconds, 2) if seconds is not None else None}
+        if operation != 'embed':
+            write_calls += calls
+        if seconds is None:
+            missing.append(operation)
+        elif operation == 'embed':
+            embed_seconds += seconds
+        else:
+            write_seconds += seconds
+
+    write_seconds /= max(1, workers)
+    if rate_limit:
+        write_seconds = max(write_seconds, write_calls / rate_limit)
+
+    tokens = math.ceil(plan.embedding_bytes / BYTES_PER_TOKEN)
+    price = config.get('embedding_price_per_million_tokens', DEFAULT_EMBEDDING_PRICE)
+
+    return {
+        'operations': operations,
+        'missing_history': missing,
+        'workers': workers,
+        'rate_limit': rate_limit,
+        'seconds': round(embed_seconds + write_seconds, 2),
+        'embedding_tokens': tokens,
+        'embedding_cost_usd': round(tokens * price / 1_000_000, 4),
+    }
+
+
+# 경고
+def plan_warnings(plan, previous_headers=None, headers=None):
+    """의심스러운 계획에 대한 경고 목록 (수정 행 비율이 큼 / 헤더가 바뀜 / 모든 행 삭제)"""
+    warnings = []
+
+    if previous_headers and headers and list(previous_headers) != list(headers):
+        removed = [h for h in previous_headers if h not in headers]
+        added = [h for h in headers if h not in previous_headers]
+        detail = ", ".join(filter(None, [
+            f"없어진 컬럼: {', '.join(removed)}" if removed else "",
+            f"새 컬럼: {', '.join(added)}" if added else "",
+        ])) or "컬럼 순서 변경"
+        warnings.append(f"헤더가 바뀌었습니다 ({detail}). 체크섬이 달라져 기존 행이 모두 수정될 수 있습니다.")
+
+    compared = len(plan.updates) + plan.same_render + plan.unchanged
+    if compared and len(plan.updates) / compared > RUNAWAY_RATIO:
+        top = ", ".join(f"{column}({count}행)" for column, count in plan.changed_columns.most_common(3))
+        warnings.append(f"기존 행의 {len(plan.updates) / compared:.0%}가 수정됩니다." +
+                        (f" 가장 많이 바뀐 컬럼: {top}" if top else ""))
+
+    if plan.deletes and not compared:
+        warnings.append(f"기존 행과 일치하는 행이 없어 문서 {len(plan.deletes)}개가 모두 삭제됩니다. "
+                        "(해시 방식 / 첫 두 컬럼이 바뀌었는지 확인)")
+
+    return warnings
+
+
+# 계획 보고서
+def plan_report(plan, estimate, warnings):
+    """sync_plan.json에 저장할 전체 계획"""
+    return {
+        'rows': plan.rows,
+        'counts': {
+            'insert': len(plan.inserts),
+            'update': len(plan.updates),
+            'delete': len(plan.deletes),
+            'same_render': plan.same_render,
+            'unchanged': plan.unchanged,
+            'embeddings': plan.embeddings,
+        },
+        'changed_columns': dict(plan.changed_columns.most_common()),
+        'estimate': estimate,
+        'warnings': warnings,
+        'inserts': plan.inserts,
+        'updates': plan.updates,
+        'deletes': plan.deletes,
+    }
+
+
+# 계획 출력
+def print_plan(plan, estimate, warnings, limit=20):
+    """계획 요약 + 작업 목록(종류마다 처음 limit개) + 예상 시간 / 비용 출력"""
+    keep = sum(1 for item in plan.updates if not item['reembed'])
+
+    print("\n" + "=" * 60)
+    print("📋 동기화 계획 (sbdb / 상태 파일은 바꾸지 않음)")
+    print("=" * 60)
+    print(f"   📊 비교한 행: {plan.rows}개")
+    print(f"   ✨ 추가: {len(plan.inserts)}개")
+    print(f"   🔄 수정: {len(plan.updates)}개" + (f" (임베딩 유지: {keep}개)" if keep else ""))
+    print(f"   🗑️ 삭제: {len(plan.deletes)}개")
+    if plan.same_render:
+        print(f"   📝 문서 동일 (쓰기 생략): {plan.same_render}개")
+    print(f"   ⏭️ 변경 없음: {plan.unchanged}개")
+    print(f"   🧠 임베딩 생성: {plan.embeddings}개 문서")
+
+    sections = (
+        ("✨ 추가", plan.inserts, lambda item: f"#{item['row_number']} {item['title']}"),
+        ("🔄 수정", plan.updates, lambda item: f"#{item['row_number']} {item['title']} — 바뀐 컬럼: " +
+            (", ".join(item['changed_columns']) if item['changed_columns'] is not None else "알 수 없음") +
+            ("" if item['reembed'] else " (임베딩 유지)")),
+        ("🗑️ 삭제", plan.deletes, lambda item: f"{item['title']} ({item['doc_id']})"),
+    )
+    for label, items, describe in sections:
+        if not items:
+            continue
+        print(f"\n{label} ({len(items)}개" + (f", 처음 {limit}개" if len(items) > limit else "") + ")")
+        for item in items[:limit]:
+            print(f"   {describe(item)}")
+
+    print(f"\n⏱️ 예상 (지난 실행의 작업별 평균 지연 시간, worker {estimate['workers']}개" +
+          (f", 초당 {estimate['rate_limit']}회" if estimate['rate_limit'] else "") + ")")
+    for operation, entry in estimate['operations'].items():
+        if entry['mean_ms'] is None:
+            print(f"   {operation}: {entry['calls']}회 × 기록 없음")
+        else:
+            print(f"   {operation}: {entry['calls']}회 × {entry['mean_ms']:.0f}ms = {entry['seconds']:.1f}초")
+    print(f"   ⏱️ 예상 소요 시간: 약 {estimate['seconds']:.0f}초" +
+          (f" (지연 시간 기록 없음: {', '.join(estimate['missing_history'])})"
+           if estimate['missing_history'] else ""))
+    print(f"   💰 임베딩: 약 {estimate['embedding_tokens']:,} 토큰 ≈ ${estimate['embedding_cost_usd']:.4f}")
+
+    for warning in warnings:
+        print(f"\n⚠️  {warning}")
+    print("=" * 60)
@@ -0,0 +1,79 @@
+"""
+변경 감지 테스트
+수정 행의 바뀐 컬럼 / 임베딩 재생성 판정 (헤더가 바뀌면 바뀐 컬럼을 알 수 없으므로 재생성)
+"""
+
+import sync_google_sheet_incremental as sync
+from row_hashing import DEFAULT_SCHEME
+from sheet_records import build_records, get_layout
+from state_store import empty_state
+
+HEADERS = ["부서명", "용역명", "금액", "비고"]
+ROW = ["교통과", "신호 정비", "1000", ""]
+
+# 비고만 바뀌면 임베딩 유지
+EMBEDDING_COLUMNS = ["부서명", "용역명", "금액"]
+
+
+def records(rows, headers=HEADERS):
+    return build_records(rows, 3, get_layout(headers, DEFAULT_SCHEME))[0]
+
+
+def synced_state(headers=HEADERS, rows=(ROW,), cache_headers=True):
+    """지난 실행이 headers로 rows를 동기화한 상태"""
+    state = empty_state()
+    for number, record in enumerate(records(list(rows), headers), start=1):
+        state['synced_rows'][record.row_hash] = {
+            'row_number': number,
+            'title': record["용역명"] if "용역명" in headers else "",
+            'doc_id': f"doc-{number}",
+            'checksum': record.checksum,
+            'column_checksums': record.column_checksums(),
+        }
+    if cache_headers:
+        state['sheet_cache'] = {'sheet_id': "S", 'gid': "", 'title': "2024", 'id': 0, 'headers': list(headers)}
+    return state
+
+
+def updated_item(state, rows, headers=HEADERS):
+    changes = sync.detect_changes(records(rows, headers), headers, state, EMBEDDING_COLUMNS)
+    assert len(changes['updated']) == 1
+    return changes['updated'][0]
+
+
+def test_changed_column_outside_embedding_columns_keeps_embedding():
+    item = updated_item(synced_state(), [["교통과", "신호 정비", "1000", "취소"]])
+    assert item['changed_columns'] == ["비고"]
+    assert not item['reembed']
+
+
+def test_changed_embedding_column_reembeds():
+    item = updated_item(synced_state(), [["교통과", "신호 정비", "1500", ""]])
+    assert item['changed_columns'] == ["금액"]
+    assert item['reembed']
+
+
+def test_renamed_header_reembeds():
+    """컬럼 수가 같아도 헤더 이름이 바뀌면 문서의 컬럼 이름이 바뀌므로 재생성"""
+    renamed = ["부서명", "용역명", "예산", "비고"]
+    item = updated_item(synced_state(), [ROW], renamed)
+    assert item['changed_columns'] is None
+    assert item['reembed']
+
+
+def test_reordered_columns_reembed():
+    """값이 같은 두 컬럼의 순서가 바뀌면 위치별 체크섬은 비고만 달라 보여도 문서가 바뀌므로 재생성"""
+    headers = ["부서명", "용역명", "금액", "비고", "예산"]
+    state = synced_state(headers, [["교통과", "신호 정비", "1000", "", "1000"]])
+    reordered = ["부서명", "용역명", "예산", "비고", "금액"]
+    item = updated_item(state, [["교통과", "신호 정비", "1000", "취소", "1000"]], reordered)
+    assert item['changed_columns'] is None
+    assert item['reembed']
+
+
+def test_unknown_previous_headers_reembed():
+    """지난 실행의 헤더가 상태에 없으면 위치별 비교를 믿을 수 없으므로 재생성"""
+    state = synced_state(cache_headers=False)
+    item = updated_item(state, [["교통과", "신호 정비", "1000", "취소"]])
+    assert item['changed_columns'] is None
+    assert item['reembed']
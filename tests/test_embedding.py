@@ -0,0 +1,106 @@
+"""
+배치 임베딩 테스트
+LocalEmbedder로 배치 수 / 문서별 벡터 연결 / 배치 실패 시 문서별 생성 확인
+"""
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+import sync_google_sheet_incremental as sync
+from document_render import render_item
+from embedding import LocalEmbedder, embed_contents
+from row_hashing import DEFAULT_SCHEME
+from sheet_records import build_records, get_layout
+from state_store import JsonStateStore, empty_state
+
+HEADERS = ["부서명", "용역명", "금액", "비고"]
+ROWS = [[f"부서{i}", f"용역{i}", str(i * 100), ""] for i in range(7)]
+
+
+def vector(content):
+    """문서 하나만 따로 임베딩한 벡터 (배치와 같아야 함)"""
+    return LocalEmbedder().embed_batch([content])[0]
+
+
+def new_changes(rows=ROWS):
+    records, _ = build_records(rows, 3, get_layout(HEADERS, DEFAULT_SCHEME))
+    return sync.detect_changes(records, HEADERS, empty_state())
+
+
+class FailingEmbedder(LocalEmbedder):
+    """fail_on번째 배치 요청에서 실패하는 임베더"""
+
+    def __init__(self, fail_on):
+        super().__init__()
+        self.fail_on = fail_on
+
+    def embed_batch(self, texts):
+        if self.calls + 1 == self.fail_on:
+            self.calls += 1
+            raise RuntimeError("embedding batch failed")
+        return super().embed_batch(texts)
+
+
+class RecordingSink:
+    """미리 계산한 임베딩을 받는 가짜 sbdb 백엔드 (DirectSink처럼 임베딩이 없으면 문서마다 생성)"""
+
+    name = "recording"
+    accepts_embeddings = True
+
+    def __init__(self):
+        self.embedder = LocalEmbedder()
+        self.saved = []
+
+    def save(self, title, content, tags, embedding=None, metadata=None):
+        precomputed = embedding is not None
+        if not precomputed:
+            embedding = self.embedder.embed_batch([content])[0]
+        self.saved.append((content, embedding, precomputed))
+        return True, f"doc-{len(self.saved)}", None
+
+
+@pytest.mark.parametrize("count, batch_size", [(7, 3), (6, 3), (1, 100), (0, 3)])
+def test_embed_contents_batches(count, batch_size):
+    """N개 문서는 ceil(N / batch_size)번 요청하고, 벡터는 문서 순서대로 돌아옴"""
+    embedder = LocalEmbedder()
+    contents = [f"문서 {i}" for i in range(count)]
+
+    embeddings = embed_contents(embedder, contents, batch_size)
+
+    assert embedder.calls == math.ceil(count / batch_size)
+    assert embeddings == [vector(content) for content in contents]
+
+
+def test_precompute_embeddings_assigns_vectors_to_items():
+    """임베딩이 필요한 행에만 자기 문서 내용의 벡터가 붙고, 요청 수를 돌려줌"""
+    changes = new_changes()
+    changes['updated'] = [dict(changes['new'].pop(), doc_id="doc-x", reembed=False)]
+    embedder = LocalEmbedder()
+
+    requests_made = sync.precompute_embeddings(changes, HEADERS, embedder, batch_size=4)
+
+    assert requests_made == embedder.calls == 2
+    for item in changes['new']:
+        assert item['embedding'] == vector(render_item(item, HEADERS)[1])
+    assert 'embedding' not in changes['updated'][0]
+
+
+def test_failed_batch_falls_back_to_per_document_embedding(tmp_path, monkeypatch):
+    """배치 임베딩이 실패하면 미리 계산한 임베딩 없이 저장하여 백엔드가 문서마다 생성"""
+    monkeypatch.setattr(sync, 'create_embedder', lambda config, backend=None: FailingEmbedder(fail_on=2))
+    changes = new_changes()
+    store = JsonStateStore(tmp_path / "sync_state.json")
+    store.load()
+    sink = RecordingSink()
+    args = SimpleNamespace(embedding_batch_size=3, embedder='local', workers=None, rate_limit=None)
+
+    success, fail = sync.process_changes(changes, HEADERS, {'tags': []}, args, sink, store, verbose=False)
+    store.close()
+
+    assert (success, fail) == (len(ROWS), 0)
+    assert all('embedding' not in item for item in changes['new'])
+    assert sink.embedder.calls == len(ROWS)
+    contents = [render_item(item, HEADERS)[1] for item in changes['new']]
+    assert sorted(sink.saved) == sorted((content, vector(content), False) for content in contents)
@@ -0,0 +1,61 @@
+"""
+재시도 분류 테스트
+sbdb 스크립트 출력의 속도 제한 / 일시 오류 판정 (HTTP 상태 문맥의 숫자만 상태 코드로 봄)
+"""
+
+import subprocess
+
+import pytest
+
+from resilience import process_failure, process_throttle_failure
+
+
+def failed(stderr, stdout=""):
+    return subprocess.CompletedProcess(["python", "save_document.py"], 1, stdout, stderr)
+
+
+def traceback(line):
+    return ("Traceback (most recent call last):\n"
+            f'  File "save_document.py", line {line}, in <module>\n'
+            "    doc_id = response['id']\n"
+            "KeyError: 'id'\n")
+
+
+@pytest.mark.parametrize("line", [429, 500, 502, 503, 504])
+def test_traceback_line_number_is_not_retryable(line):
+    """traceback의 줄 번호는 상태 코드가 아님 (스크립트 오류는 재시도 / 속도 제한 대기 없음)"""
+    result = failed(traceback(line))
+    assert process_failure(result) is None
+    assert process_throttle_failure(result) is None
+
+
+@pytest.mark.parametrize("output", [
+    "❌ 저장 실패: HTTP 429",
+    "HTTPError: 429 Client Error: Too Many Requests for url: https://x.supabase.co/rest/v1/documents",
+    "openai.RateLimitError: Error code: 429 - {'error': {'code': 'rate_limit_exceeded'}}",
+    '{"code": 429, "message": "slow down"}',
+    "status_code=429",
+])
+def test_throttle_output(output):
+    assert process_failure(failed(output)) == (True, None)
+    assert process_throttle_failure(failed(output)) == (True, None)
+
+
+@pytest.mark.parametrize("output", [
+    "❌ 오류: HTTP 503",
+    "HTTP/1.1 502 Bad Gateway",
+    "urllib.error.HTTPError: HTTP Error 500: Internal Server Error",
+    "status: 504",
+    "requests.exceptions.ReadTimeout: Read timed out.",
+    "ConnectionResetError: [Errno 104] Connection reset by peer",
+])
+def test_transient_output(output):
+    """일시 오류는 재시도하지만 속도 제한은 아님 (새 문서 저장은 재시도하지 않음)"""
+    assert process_failure(failed(output)) == (False, None)
+    assert process_throttle_failure(failed(output)) is None
+
+
+def test_success_is_not_failure():
+    result = subprocess.CompletedProcess(["python"], 0, "HTTP 429", "")
+    assert process_failure(result) is None
+    assert process_throttle_failure(result) is None
@@ -0,0 +1,143 @@
+"""
+해시 방식 마이그레이션 회귀 테스트
+기존(md5) 방식으로 만든 sync_state를 기본 방식(blake2b) 키로 옮기는 경로 확인
+"""
+
+import pytest
+
+import sync_google_sheet_incremental as sync
+from row_hashing import DEFAULT_SCHEME, LEGACY_SCHEME, get_scheme, migrate_state_hashes
+from sheet_records import build_records, get_layout
+from state_store import JsonStateStore, SqliteStateStore
+
+HEADERS = ["부서명", "용역명", "금액", "비고"]
+
+ROWS = [
+    ["교통과", "신호 정비", "1000", ""],
+    ["도로과", "포장 보수", "2000", "긴급"],
+    # 하이픈 때문에 md5 방식에서는 두 행의 ID가 같음 ("가-나-다")
+    ["가-나", "다", "300", ""],
+    ["가", "나-다", "400", ""],
+]
+
+
+def open_store(backend, directory):
+    if backend == 'sqlite':
+        return SqliteStateStore(directory / "sync_state.db")
+    return JsonStateStore(directory / "sync_state.json")
+
+
+def baseline_state(store, rows):
+    """기존 스크립트처럼 dict 행 + md5로 상태 만들기 (같은 ID는 나중 행이 덮어씀)"""
+    for number, values in enumerate(rows, start=1):
+        row = dict(zip(HEADERS, values))
+        store.put_row(sync.generate_row_hash(row, HEADERS), {
+            'row_number': number,
+            'title': f"{values[0]} - #{number}",
+            'doc_id': f"doc-{number}",
+            'checksum': sync.generate_checksum(row),
+        })
+
+
+def current_records(rows):
+    records, _ = build_records(rows, 3, get_layout(HEADERS, DEFAULT_SCHEME))
+    return records
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    store = open_store(request.param, tmp_path)
+    store.load()
+    yield store
+    store.close()
+
+
+def test_legacy_scheme_matches_baseline_dict_hashing():
+    """md5 방식의 레코드 해시/체크섬이 기존 dict 행 계산과 같음"""
+    records, _ = build_records(ROWS, 3, get_layout(HEADERS, LEGACY_SCHEME))
+    for record, values in zip(records, ROWS):
+        row = dict(zip(HEADERS, values))
+        assert record.row_hash == sync.generate_row_hash(row, HEADERS)
+        assert record.checksum == sync.generate_checksum(row)
+
+
+def test_migrate_moves_rows_to_new_keys(store):
+    """그대로인 행은 새 체크섬으로, 바뀐 행은 체크섬 없이 새 키로 옮김 (문서 ID 유지)"""
+    baseline_state(store, ROWS[:2])
+    changed = [ROWS[0], ["도로과", "포장 보수", "2500", "긴급"]]
+    records = current_records(changed)
+
+    moved = migrate_state_hashes(records, store, get_scheme(LEGACY_SCHEME), get_scheme(DEFAULT_SCHEME))
+
+    rows = store.state['synced_rows']
+    assert moved == 2
+    assert len(rows) == 2
+    same, edited = (rows[record.row_hash] for record in records)
+    assert same['doc_id'] == "doc-1"
+    assert same['checksum'] == records[0].checksum
+    assert same['column_checksums'] == records[0].column_checksums()
+    assert edited['doc_id'] == "doc-2"
+    assert edited['checksum'] is None
+    assert 'column_checksums' not in edited
+
+    changes = sync.detect_changes(records, HEADERS, store.state)
+    assert changes['unchanged'] == 1
+    assert [item['doc_id'] for item in changes['updated']] == ["doc-2"]
+    assert changes['updated'][0]['reembed']
+    assert changes['new'] == [] and changes['deleted'] == []
+
+
+def test_migrate_collision_claims_old_entry_once(store):
+    """md5 ID가 겹친 두 행 중 첫 행만 기존 문서를 이어받고 나머지는 새 행"""
+    baseline_state(store, ROWS[2:])
+    records = current_records(ROWS[2:])
+    assert records[0].row_hash != records[1].row_hash
+
+    moved = migrate_state_hashes(records, store, get_scheme(LEGACY_SCHEME), get_scheme(DEFAULT_SCHEME))
+
+    rows = store.state['synced_rows']
+    assert moved == 1
+    assert set(rows) == {records[0].row_hash}
+    # 기존 상태에는 나중 행의 체크섬이 남아 있으므로 첫 행은 수정으로 처리됨
+    assert rows[records[0].row_hash]['checksum'] is None
+
+    changes = sync.detect_changes(records, HEADERS, store.state)
+    assert [item['hash'] for item in changes['new']] == [records[1].row_hash]
+    assert [item['doc_id'] for item in changes['updated']] == ["doc-2"]
+
+
+def test_migrate_keeps_rows_missing_from_sheet(store):
+    """시트에 없는 기존 항목은 그대로 두어 삭제 감지에서 처리"""
+    baseline_state(store, ROWS[:2])
+    records = current_records(ROWS[:1])
+
+    migrate_state_hashes(records, store, get_scheme(LEGACY_SCHEME), get_scheme(DEFAULT_SCHEME))
+
+    deleted = sync.find_deleted_rows(store.state, {records[0].row_hash})
+    assert [item['doc_id'] for item in deleted] == ["doc-2"]
+
+
+def test_migrated_json_state_survives_reload(tmp_path):
+    """마이그레이션 결과가 journal 재생 / 압축 후에도 같음"""
+    store = JsonStateStore(tmp_path / "sync_state.json")
+    store.load()
+    baseline_state(store, ROWS[:2])
+    store.save()
+    migrate_state_hashes(current_records(ROWS[:2]), store, get_scheme(LEGACY_SCHEME), get_scheme(DEFAULT_SCHEME))
+    expected = dict(store.state['synced_rows'])
+    store.close()
+
+    reloaded = JsonStateStore(tmp_path / "sync_state.json")
+    assert reloaded.load()['synced_rows'] == expected
+    assert reloaded.recovered == 2
+    reloaded.save()
+    reloaded.close()
+
+    assert JsonStateStore(tmp_path / "sync_state.json").load()['synced_rows'] == expected
+
+
+def test_same_scheme_is_noop(store):
+    """해시 방식이 같으면 아무것도 옮기지 않음"""
+    baseline_state(store, ROWS[:1])
+    scheme = get_scheme(LEGACY_SCHEME)
+    assert migrate_state_hashes(current_records(ROWS[:1]), store, scheme, scheme) == 0
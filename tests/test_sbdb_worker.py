@@ -0,0 +1,119 @@
+"""
+sbdb worker 테스트
+요청 ID로 응답 찾기 / worker 종료 후 다시 띄우기 / 응답 시간 초과 / 해석할 수 없는 응답
+"""
+
+import sys
+
+import pytest
+
+from resilience import process_failure, process_throttle_failure
+from sbdb_sink import WORKER_SCRIPT, WorkerClient, WorkerLost, WorkerSink
+
+FAKE_WORKER = [sys.executable, str(WORKER_SCRIPT), "--fake"]
+
+# 요청 2개를 받으면 거꾸로 응답 (응답 앞에 스크립트 출력 줄도 섞음), stdout에는 argv[0]
+REVERSED_WORKER = [sys.executable, "-c", """
+import json, sys
+batch = []
+for line in sys.stdin:
+    batch.append(json.loads(line))
+    if len(batch) == 2:
+        print("script output", flush=True)
+        for request in reversed(batch):
+            print(json.dumps({"id": request["id"], "returncode": 0, "stdout": request["argv"][0], "stderr": ""}), flush=True)
+        batch = []
+"""]
+
+# 요청을 읽기만 하고 응답하지 않음
+HANGING_WORKER = [sys.executable, "-c", "import sys\nfor line in sys.stdin: pass"]
+
+# 요청을 받으면 해석할 수 없는 응답 줄을 보내고 멈춤
+BROKEN_WORKER = [sys.executable, "-c", """
+import sys, time
+sys.stdin.readline()
+print('{"id": 1, "returncode": ', flush=True)
+time.sleep(60)
+"""]
+
+
+@pytest.fixture
+def client():
+    clients = []
+
+    def create(cmd, timeout=5):
+        clients.append(WorkerClient(cmd, timeout))
+        return clients[-1]
+
+    yield create
+    for worker_client in clients:
+        worker_client.kill()
+
+
+def test_responses_matched_by_request_id(client):
+    """worker가 순서를 바꿔 응답해도 요청마다 자기 응답을 받음"""
+    worker = client(REVERSED_WORKER)
+    first = worker.submit("a.py", ["first"])
+    second = worker.submit("b.py", ["second"])
+
+    assert first.result(timeout=5).stdout == "first"
+    assert second.result(timeout=5).stdout == "second"
+
+
+def test_worker_sink_pipelines_upserts():
+    """묶음 저장/수정 결과가 문서마다 맞게 돌아옴 (저장은 새 문서 ID, 수정은 기존 ID)"""
+    sink = WorkerSink({'sbdb_worker_processes': 2}, worker_cmd=FAKE_WORKER)
+    documents = [{'row_hash': f"h{i}", 'title': f"t{i}", 'content': "c", 'tags': ["x"],
+                  'doc_id': f"doc-{i}" if i % 2 else None} for i in range(6)]
+    try:
+        results = sink.upsert_many(documents, batch_size=4)
+    finally:
+        sink.close()
+
+    assert set(results) == {doc['row_hash'] for doc in documents}
+    for doc in documents:
+        success, doc_id, error = results[doc['row_hash']]
+        assert success and error is None
+        assert doc_id == doc['doc_id'] if doc['doc_id'] else doc_id
+
+
+def test_killed_worker_fails_pending_and_restarts(client):
+    """worker가 종료되면 응답을 기다리던 요청은 실패하고, 다음 요청 때 새 worker가 뜸"""
+    worker = client(FAKE_WORKER + ["--fake-latency-ms", "1000"])
+    pending = worker.submit("delete_document.py", ["doc-1"])
+    first_process = worker.worker.process
+    worker.kill()
+
+    with pytest.raises(WorkerLost):
+        pending.result(timeout=5)
+
+    result = worker.submit("delete_document.py", ["doc-2"]).result(timeout=5)
+    assert result.returncode == 0
+    assert worker.worker.process is not first_process
+    assert first_process.poll() is not None
+
+
+def test_timeout_kills_wedged_worker():
+    """sbdb_timeout 안에 응답이 없으면 worker를 종료하고 일시적 오류로 실패 (새 문서 저장은 재시도하지 않음)"""
+    sink = WorkerSink({'sbdb_timeout': 0.3}, worker_cmd=HANGING_WORKER)
+    client = sink.clients[0]
+
+    results = sink._invoke_batch([("delete_document.py", ["doc-1"], True),
+                                  ("delete_document.py", ["doc-2"], True)])
+
+    assert [result.returncode for result in results] == [1, 1]
+    assert all(result.transient for result in results)
+    assert all(process_failure(result) == (False, None) for result in results)
+    assert all(process_throttle_failure(result) is None for result in results)
+    assert client.worker.process.wait(timeout=5) is not None
+    sink.close()
+
+
+def test_undecodable_response_fails_pending(client):
+    """응답 줄을 해석할 수 없으면 기다리던 요청을 실패 처리하고 worker를 종료 (멈추지 않음)"""
+    worker = client(BROKEN_WORKER)
+    pending = worker.submit("delete_document.py", ["doc-1"])
+
+    with pytest.raises(WorkerLost):
+        pending.result(timeout=5)
+    assert worker.worker.process.wait(timeout=5) is not None
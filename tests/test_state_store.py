@@ -0,0 +1,126 @@
+"""
+상태 저장소 테스트
+JsonStateStore journal 재생 / 기록 중 잘린 마지막 줄 / 압축 시점
+SqliteStateStore 읽기 전용 열기 (--plan)
+"""
+
+import json
+import sqlite3
+
+import pytest
+
+from state_store import JsonStateStore, SqliteStateStore
+
+
+def row(doc_id):
+    return {'row_number': 1, 'title': doc_id, 'doc_id': doc_id, 'checksum': "c-" + doc_id}
+
+
+def open_store(tmp_path, **kwargs):
+    store = JsonStateStore(tmp_path / "sync_state.json", **kwargs)
+    store.load()
+    return store
+
+
+def test_journal_replayed_after_interrupted_run(tmp_path):
+    """압축 전에 중단되어도 다음 실행이 journal로 문서 ID를 이어받음"""
+    store = open_store(tmp_path, compact_every=0)
+    store.put_row("a", row("doc-a"))
+    store.put_rows([("b", row("doc-b")), ("c", row("doc-c"))])
+    store.delete_row("c")
+    store.rekey_rows([("b", "b2", row("doc-b"))])
+    store.close()
+    assert not (tmp_path / "sync_state.json").exists()
+
+    reloaded = open_store(tmp_path)
+    assert reloaded.state['synced_rows'] == {"a": row("doc-a"), "b2": row("doc-b")}
+    assert reloaded.recovered == 5
+    reloaded.close()
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    """기록 중 잘린 마지막 줄은 버리고 그 앞까지만 재생"""
+    store = open_store(tmp_path, compact_every=0)
+    store.put_row("a", row("doc-a"))
+    store.close()
+
+    line = json.dumps({'op': 'put', 'hash': "b", 'row': row("doc-b")}, ensure_ascii=False)
+    with open(store.journal_path, 'a', encoding='utf-8') as f:
+        f.write(line[:len(line) // 2])
+
+    reloaded = open_store(tmp_path)
+    assert reloaded.state['synced_rows'] == {"a": row("doc-a")}
+    assert reloaded.recovered == 1
+
+    # 압축하면 잘린 줄이 사라지고 다음 기록이 정상적으로 이어짐
+    reloaded.save()
+    assert not reloaded.journal_path.exists()
+    reloaded.put_row("c", row("doc-c"))
+    reloaded.close()
+    assert open_store(tmp_path).state['synced_rows'] == {"a": row("doc-a"), "c": row("doc-c")}
+
+
+def test_journal_replayed_on_top_of_compacted_state(tmp_path):
+    """압축한 상태 + 그 뒤 journal을 함께 읽음"""
+    store = open_store(tmp_path, compact_every=0)
+    store.put_row("a", row("doc-a"))
+    store.state['last_sync'] = "2026-01-01T00:00:00"
+    store.save()
+    store.put_row("a", row("doc-a2"))
+    store.close()
+
+    reloaded = open_store(tmp_path)
+    assert reloaded.state['last_sync'] == "2026-01-01T00:00:00"
+    assert reloaded.state['synced_rows'] == {"a": row("doc-a2")}
+
+
+def test_compacts_when_journal_reaches_state_size(tmp_path):
+    """journal이 상태 행 수(최소 compact_every줄)만큼 쌓였을 때만 압축"""
+    store = open_store(tmp_path, compact_every=2)
+    store.put_rows([(str(i), row(str(i))) for i in range(10)])
+    # 첫 묶음은 상태 행 수(10)만큼이므로 바로 압축
+    assert not store.journal_path.exists()
+
+    for i in range(9):
+        store.put_row(str(i), row(f"new-{i}"))
+    assert store.pending == 9
+    assert store.journal_path.exists()
+
+    store.put_row("9", row("new-9"))
+    assert store.pending == 0
+    assert not store.journal_path.exists()
+    store.close()
+
+    with open(tmp_path / "sync_state.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)['synced_rows']["9"] == row("new-9")
+
+
+def test_read_only_sqlite_does_not_create_file(tmp_path):
+    """읽기 전용이면 상태 DB가 없어도 만들지 않고 빈 상태로 읽음"""
+    store = SqliteStateStore(tmp_path / "sync_state.db", read_only=True)
+    state = store.load()
+    assert len(state['synced_rows']) == 0
+    store.close()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_read_only_sqlite_reads_without_writing(tmp_path):
+    """읽기 전용이면 기존 상태(체크포인트 전 WAL 포함)를 읽기만 하고 쓰거나 체크포인트하지 않음"""
+    db_path = tmp_path / "sync_state.db"
+    writer = SqliteStateStore(db_path)
+    writer.load()
+    writer.put_row("a", row("doc-a"))
+    writer.state['last_sync'] = "2026-01-01T00:00:00"
+    writer.save()
+
+    store = SqliteStateStore(db_path, read_only=True)
+    state = store.load()
+    assert state['synced_rows']["a"] == row("doc-a")
+    assert state['last_sync'] == "2026-01-01T00:00:00"
+    with pytest.raises(sqlite3.OperationalError):
+        store.put_row("b", row("doc-b"))
+    store.close()
+    # WAL은 체크포인트되지 않고 쓰는 쪽 연결이 그대로 사용
+    assert (tmp_path / "sync_state.db-wal").stat().st_size > 0
+    writer.close()